@@ -2,31 +2,42 @@
 API routes for employer dashboard: employees, transactions, bonuses, treasury, dashboard, settings.
 All dashboard routes require JWT authentication (admin or employer role).
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import select
 from decimal import Decimal
-from typing import List
-
+from datetime import date, datetime
+from typing import List, Optional
+import csv
+import io
+import json
+import time
+
+from query_stats import QueryFingerprints, RouteQueryStats
+import profiler
+from session_routes import SessionRoute
 from database import db
 from models import (
     Employee,
-    Transaction,
     Bonus,
     Treasury,
     CompanySettings,
     TaxSlab,
-    User,
 )
 from schemas import (
     EmployeeCreate,
     EmployeeResponse,
+    EmployeeImportResponse,
     EmployeeTaxUpdate,
     EmployeeWalletUpdate,
     TransactionCreate,
     TransactionResponse,
     BonusCreate,
     BonusResponse,
+    PayrollRunCreate,
+    PayrollRunResponse,
     TreasuryAction,
     CompanySettingsResponse,
     CompanySettingsUpdate,
@@ -35,53 +46,69 @@ from schemas import (
     BlockchainTxCreate,
     BlockchainTxUpdate,
     BlockchainTxResponse,
+    StreamBulkAction,
+    StreamBulkResponse,
 )
-from security import SecurityService
+from security import SecurityService, UserPrincipal
 from service import (
+    clamp_page_size,
     EmployeeService,
     TransactionService,
+    EmployeeReadModel,
+    TransactionReadModel,
+    LedgerReadModel,
+    PayrollRunService,
     BonusService,
     TreasuryService,
+    LedgerService,
     TaxService,
+    TaxSettingsCache,
     DashboardService,
+    DashboardCounterService,
+    ExportService,
     StreamingService,
     BlockchainTxService,
+    IdempotencyService,
 )
 
-router = APIRouter()
+router = APIRouter(route_class=SessionRoute)
 
 
 # =========================
 # EMPLOYEES
 # =========================
 
-@router.get("/employees/", response_model=List[EmployeeResponse])
+def _set_next_cursor(response: Response, next_cursor: Optional[str]) -> None:
+    # Bodies stay plain arrays for existing clients; the cursor rides in a header
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+
+# x-query-budget: SELECTs a request may issue, not counting the user lookup
+# on an auth-cache miss (see SecurityService.get_current_user)
+def _budget(queries: int) -> dict:
+    return {"x-query-budget": queries}
+
+
+@router.get("/employees/", response_model=List[EmployeeResponse], openapi_extra=_budget(1))
 def list_employees(
-    session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.require_dashboard_user),
+    response: Response,
+    limit: int = 100,
+    after: Optional[str] = None,
+    session: Session = Depends(db.get_read_db),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
 ):
-    employees = session.query(Employee).all()
-    return [
-        EmployeeResponse(
-            id=e.id,
-            name=e.name,
-            email=e.email,
-            role=e.role,
-            is_streaming=e.is_streaming or False,
-            wallet_address=e.wallet_address,
-            use_custom_tax=e.use_custom_tax or False,
-            custom_tax_rate=e.custom_tax_rate,
-            transactions=[],
-        )
-        for e in employees
-    ]
+    """One page of employees; pass the X-Next-Cursor header back as `after`."""
+    employees, next_cursor = EmployeeReadModel.page(session, clamp_page_size(limit), after)
+    _set_next_cursor(response, next_cursor)
+    return employees
 
 
 @router.post("/employees/", response_model=EmployeeResponse)
 def create_employee(
     data: EmployeeCreate,
     session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.require_dashboard_user),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
 ):
     try:
         emp = EmployeeService.create_employee(
@@ -96,65 +123,80 @@ def create_employee(
             wallet_address=emp.wallet_address,
             use_custom_tax=emp.use_custom_tax or False,
             custom_tax_rate=emp.custom_tax_rate,
-            transactions=[],
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.get("/employees/{employee_id}", response_model=EmployeeResponse)
+def _parse_import_body(content_type: str, body: bytes) -> list:
+    if "csv" in content_type:
+        try:
+            text = body.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="CSV upload must be UTF-8")
+        reader = csv.DictReader(io.StringIO(text))
+        if not reader.fieldnames or not {"name", "email"} <= {f.strip() for f in reader.fieldnames}:
+            raise HTTPException(status_code=400, detail="CSV header must include name and email")
+        return [
+            {k.strip(): v for k, v in row.items() if k and v not in (None, "")}
+            for row in reader
+        ]
+    try:
+        rows = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or text/csv")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or text/csv")
+    return rows
+
+
+@router.post("/employees/bulk", response_model=EmployeeImportResponse)
+async def bulk_create_employees(
+    request: Request,
+    session: Session = Depends(db.get_db),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
+):
+    """
+    Import employees from a JSON array of {name, email, role} objects or a
+    text/csv upload with a name,email[,role] header. Returns per-row status.
+    """
+    rows = _parse_import_body(request.headers.get("content-type", ""), await request.body())
+    started = time.perf_counter()
+    result = await run_in_threadpool(EmployeeService.bulk_create, session, rows)
+    elapsed = time.perf_counter() - started
+    result["elapsed_ms"] = round(elapsed * 1000, 2)
+    result["rows_per_second"] = round(len(rows) / elapsed, 1) if elapsed > 0 else 0.0
+    return result
+
+
+@router.get("/employees/{employee_id}", response_model=EmployeeResponse, openapi_extra=_budget(1))
 def get_employee(
     employee_id: int,
-    session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.require_dashboard_user),
+    session: Session = Depends(db.get_read_db),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
 ):
-    emp = EmployeeService.get_employee(session, employee_id)
+    """Employee record; page history through /employees/{employee_id}/transactions."""
+    emp = EmployeeReadModel.get(session, employee_id)
     if not emp:
         raise HTTPException(status_code=404, detail="Employee not found")
-    transactions = [
-        TransactionResponse(
-            id=t.id,
-            employee_id=t.employee_id,
-            amount=t.amount,
-            tax_amount=t.tax_amount,
-            description=t.description or "",
-            timestamp=t.timestamp,
-        )
-        for t in emp.transactions
-    ]
-    return EmployeeResponse(
-        id=emp.id,
-        name=emp.name,
-        email=emp.email,
-        role=emp.role,
-        is_streaming=emp.is_streaming or False,
-        wallet_address=emp.wallet_address,
-        use_custom_tax=emp.use_custom_tax or False,
-        custom_tax_rate=emp.custom_tax_rate,
-        transactions=transactions,
-    )
+    return emp
 
 
-@router.get("/employees/{employee_id}/transactions", response_model=List[TransactionResponse])
+@router.get("/employees/{employee_id}/transactions", response_model=List[TransactionResponse], openapi_extra=_budget(2))
 def get_employee_transactions(
     employee_id: int,
-    session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.require_dashboard_user),
+    response: Response,
+    limit: int = 100,
+    after: Optional[str] = None,
+    session: Session = Depends(db.get_read_db),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
 ):
-    emp = EmployeeService.get_employee(session, employee_id)
-    if not emp:
-        raise HTTPException(status_code=404, detail="Employee not found")
-    return [
-        TransactionResponse(
-            id=t.id,
-            employee_id=t.employee_id,
-            amount=t.amount,
-            tax_amount=t.tax_amount,
-            description=t.description or "",
-            timestamp=t.timestamp,
-        )
-        for t in emp.transactions
-    ]
+    """Newest-first page of an employee's transactions; pass X-Next-Cursor back as `after`."""
+    transactions, next_cursor = TransactionReadModel.page_for_employee(
+        session, employee_id, clamp_page_size(limit), after
+    )
+    _set_next_cursor(response, next_cursor)
+    return transactions
 
 
 @router.put("/employees/{employee_id}/wallet")
@@ -162,7 +204,7 @@ def update_employee_wallet(
     employee_id: int,
     data: EmployeeWalletUpdate,
     session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.require_dashboard_user),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
 ):
     """Set employee's on-chain wallet address (for CorePayroll)."""
     emp = EmployeeService.get_employee(session, employee_id)
@@ -179,13 +221,13 @@ def update_employee_tax(
     employee_id: int,
     data: EmployeeTaxUpdate,
     session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.require_dashboard_user),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
 ):
     emp = EmployeeService.get_employee(session, employee_id)
     if not emp:
         raise HTTPException(status_code=404, detail="Employee not found")
     emp.use_custom_tax = data.use_custom_tax
-    emp.custom_tax_rate = float(data.custom_tax_rate) if data.custom_tax_rate is not None else None
+    emp.custom_tax_rate = data.custom_tax_rate
     session.commit()
     session.refresh(emp)
     return {"message": "Tax updated"}
@@ -199,7 +241,7 @@ def update_employee_tax(
 def start_stream(
     employee_id: int,
     session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.require_dashboard_user),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
 ):
     return StreamingService.start_stream(session, employee_id)
 
@@ -208,7 +250,7 @@ def start_stream(
 def pause_stream(
     employee_id: int,
     session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.require_dashboard_user),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
 ):
     return StreamingService.pause_stream(session, employee_id)
 
@@ -217,16 +259,36 @@ def pause_stream(
 def cancel_stream(
     employee_id: int,
     session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.require_dashboard_user),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
 ):
     return StreamingService.cancel_stream(session, employee_id)
 
 
+@router.post("/stream/bulk", response_model=StreamBulkResponse)
+def bulk_stream_action(
+    data: StreamBulkAction,
+    session: Session = Depends(db.get_db),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
+):
+    """Start, pause or cancel streams for a list of employee ids, the employees matching a filter, or all of them."""
+    if [data.employee_ids is not None, data.filter is not None, data.all].count(True) != 1:
+        raise HTTPException(status_code=400, detail='Provide exactly one of employee_ids, filter or "all": true')
+    if data.filter is not None and data.filter.role is None:
+        raise HTTPException(status_code=400, detail='filter matches nothing specific; use "all": true to target every employee')
+    return StreamingService.bulk_set(
+        session,
+        data.action,
+        employee_ids=data.employee_ids,
+        role=data.filter.role if data.filter else None,
+        match_all=data.all,
+    )
+
+
 @router.post("/stream/status", response_model=BlockchainTxResponse)
 def upsert_stream_tx_status(
     data: BlockchainTxCreate,
     session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.require_dashboard_user),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
 ):
     tx_hash = (data.tx_hash or "").strip()
     if not tx_hash.startswith("0x"):
@@ -244,11 +306,11 @@ def upsert_stream_tx_status(
     )
 
 
-@router.get("/stream/status/{tx_hash}", response_model=BlockchainTxResponse)
+@router.get("/stream/status/{tx_hash}", response_model=BlockchainTxResponse, openapi_extra=_budget(1))
 def get_stream_tx_status(
     tx_hash: str,
-    session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.require_dashboard_user),
+    session: Session = Depends(db.get_read_db),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
 ):
     tx_hash = (tx_hash or "").strip()
     tx = BlockchainTxService.get_tx(session, tx_hash=tx_hash)
@@ -267,7 +329,7 @@ def update_stream_tx_status(
     tx_hash: str,
     data: BlockchainTxUpdate,
     session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.require_dashboard_user),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
 ):
     tx_hash = (tx_hash or "").strip()
     status_val = (data.status or "").strip()
@@ -290,27 +352,60 @@ def update_stream_tx_status(
 def create_transaction(
     data: TransactionCreate,
     session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.require_dashboard_user),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
 ):
-    try:
-        tx = TransactionService.create_transaction(
+    def pay(commit: bool = True):
+        try:
+            tx = TransactionService.create_transaction(
+                session,
+                data.employee_id,
+                data.amount,
+                data.description,
+                commit=commit,
+            )
+            return TransactionResponse(
+                id=tx.id,
+                employee_id=tx.employee_id,
+                amount=tx.amount,
+                tax_amount=tx.tax_amount,
+                description=tx.description or "",
+                timestamp=tx.timestamp,
+            )
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    return IdempotencyService.execute(
+        session, idempotency_key, current_user.email,
+        ["POST /transactions/", data],
+        pay,
+    )
+
+
+# =========================
+# PAYROLL RUNS (Bulk salary)
+# =========================
+
+@router.post("/payroll/runs", response_model=PayrollRunResponse)
+def create_payroll_run(
+    data: PayrollRunCreate,
+    session: Session = Depends(db.get_db),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
+    """Post salaries for many employees in one database transaction."""
+    return IdempotencyService.execute(
+        session, idempotency_key, current_user.email,
+        ["POST /payroll/runs", data],
+        lambda commit: PayrollRunService.run(
             session,
-            data.employee_id,
-            float(data.amount),
+            [{"employee_id": item.employee_id, "amount": item.amount} for item in data.items],
             data.description,
-        )
-        return TransactionResponse(
-            id=tx.id,
-            employee_id=tx.employee_id,
-            amount=tx.amount,
-            tax_amount=tx.tax_amount,
-            description=tx.description or "",
-            timestamp=tx.timestamp,
-        )
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+            commit=commit,
+        ),
+    )
 
 
 # =========================
@@ -322,26 +417,35 @@ def give_bonus(
     employee_id: int,
     data: BonusCreate,
     session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.require_dashboard_user),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
 ):
-    try:
-        bonus = BonusService.give_bonus(
-            session,
-            employee_id,
-            float(data.amount),
-            data.reason,
-        )
-        return BonusResponse(
-            id=bonus.id,
-            employee_id=bonus.employee_id,
-            amount=bonus.amount,
-            reason=bonus.reason or "",
-            created_at=bonus.created_at,
-        )
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    def pay(commit: bool = True):
+        try:
+            bonus = BonusService.give_bonus(
+                session,
+                employee_id,
+                data.amount,
+                data.reason,
+                commit=commit,
+            )
+            return BonusResponse(
+                id=bonus.id,
+                employee_id=bonus.employee_id,
+                amount=bonus.amount,
+                reason=bonus.reason or "",
+                created_at=bonus.created_at,
+            )
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    return IdempotencyService.execute(
+        session, idempotency_key, current_user.email,
+        [f"POST /bonuses/{employee_id}", data],
+        pay,
+    )
 
 
 # =========================
@@ -351,7 +455,7 @@ def give_bonus(
 @router.get("/treasury")
 def get_treasury(
     session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.require_dashboard_user),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
 ):
     treasury = TreasuryService.get_or_create(session)
     return {
@@ -367,80 +471,289 @@ def get_treasury(
 def deposit_treasury(
     data: TreasuryAction,
     session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.require_dashboard_user),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
 ):
-    try:
-        treasury = TreasuryService.deposit_web2(session, float(data.amount))
+    def move(commit: bool = True):
+        treasury = TreasuryService.deposit_web2(session, data.amount, commit=commit)
         return {
             "id": treasury.id,
             "total_balance": float(treasury.total_balance),
             "onchain_balance": float(treasury.onchain_balance),
         }
-    except HTTPException:
-        raise
+
+    return IdempotencyService.execute(
+        session, idempotency_key, current_user.email,
+        ["POST /treasury/deposit", data],
+        move,
+    )
 
 
 @router.post("/treasury/withdraw")
 def withdraw_treasury(
     data: TreasuryAction,
     session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.require_dashboard_user),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
 ):
-    try:
-        treasury = TreasuryService.withdraw_web2(session, float(data.amount))
+    def move(commit: bool = True):
+        treasury = TreasuryService.withdraw_web2(session, data.amount, commit=commit)
         return {
             "id": treasury.id,
             "total_balance": float(treasury.total_balance),
             "onchain_balance": float(treasury.onchain_balance),
         }
-    except HTTPException:
-        raise
+
+    return IdempotencyService.execute(
+        session, idempotency_key, current_user.email,
+        ["POST /treasury/withdraw", data],
+        move,
+    )
+
+
+@router.get("/treasury/ledger", openapi_extra=_budget(1))
+def get_treasury_ledger(
+    limit: int = 100,
+    session: Session = Depends(db.get_read_db),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
+):
+    """Most recent treasury ledger entries, newest first."""
+    limit = max(1, min(limit, 1000))
+    entries = LedgerReadModel.recent(session, limit)
+    return [
+        {
+            "id": e.id,
+            "entry_type": e.entry_type,
+            "debit_account": e.debit_account,
+            "credit_account": e.credit_account,
+            "amount": float(e.amount),
+            "employee_id": e.employee_id,
+            "description": e.description,
+            "created_at": e.created_at.isoformat() if e.created_at else None,
+        }
+        for e in entries
+    ]
+
+
+@router.get("/treasury/ledger/balance", openapi_extra=_budget(2))
+def get_treasury_ledger_balance(
+    at: Optional[datetime] = None,
+    session: Session = Depends(db.get_read_db),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
+):
+    """Treasury balance from the ledger, now or at a past point in time."""
+    result = LedgerService.balance(session, at)
+    return {
+        "balance": float(result["balance"]),
+        "as_of": result["as_of"].isoformat(),
+        "snapshot_id": result["snapshot_id"],
+    }
 
 
 # =========================
 # DASHBOARD
 # =========================
 
-@router.get("/dashboard/total-payout")
+@router.get("/dashboard/overview", openapi_extra=_budget(3))
+def dashboard_overview(
+    request: Request,
+    response: Response,
+    session: Session = Depends(db.get_read_db),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
+):
+    """
+    All employer dashboard metrics in one call. Carries a strong ETag built
+    from the counters' data version, so an unchanged dashboard costs one
+    primary-key read and a 304.
+    """
+    counters = DashboardCounterService.get(session)
+    etag = f'"dashboard-{counters.data_version or 0}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return DashboardService.overview(session, counters)
+
+
+@router.get("/dashboard/total-payout", openapi_extra=_budget(1))
 def total_payout(
-    session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.require_dashboard_user),
+    session: Session = Depends(db.get_read_db),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
 ):
     return DashboardService.total_payout(session)
 
 
-@router.get("/dashboard/total-tax")
+@router.get("/dashboard/total-tax", openapi_extra=_budget(1))
 def total_tax(
-    session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.require_dashboard_user),
+    session: Session = Depends(db.get_read_db),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
 ):
     return DashboardService.total_tax_collected(session)
 
 
-@router.get("/dashboard/active-streams")
+@router.get("/dashboard/active-streams", openapi_extra=_budget(1))
 def active_streams(
-    session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.require_dashboard_user),
+    session: Session = Depends(db.get_read_db),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
 ):
     return DashboardService.active_streams(session)
 
 
-@router.get("/dashboard/top-earners")
+@router.get("/dashboard/top-earners", openapi_extra=_budget(1))
 def top_earners(
-    session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.require_dashboard_user),
+    limit: int = 10,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    session: Session = Depends(db.get_read_db),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
 ):
-    return DashboardService.top_earners(session)
+    """Top earners by net pay; `start`/`end` are matched at month granularity."""
+    limit = max(1, min(limit, 100))
+    return DashboardService.top_earners(session, limit=limit, start=start, end=end)
 
 
-@router.get("/dashboard/monthly-summary")
+@router.get("/dashboard/monthly-summary", openapi_extra=_budget(1))
 def monthly_summary(
-    session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.require_dashboard_user),
+    session: Session = Depends(db.get_read_db),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
 ):
     return DashboardService.monthly_summary(session)
 
 
+# =========================
+# EXPORTS
+# =========================
+
+@router.get("/exports/transactions")
+def export_transactions(
+    format: str = "csv",
+    employee_id: Optional[int] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
+):
+    """
+    Full transaction export as CSV or NDJSON, streamed straight from a
+    server-side cursor. `start`/`end` are inclusive dates.
+    """
+    fmt = format.lower()
+    if fmt not in ExportService.FORMATS:
+        raise HTTPException(status_code=400, detail="format must be 'csv' or 'ndjson'")
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+
+    filename = f"transactions-{datetime.utcnow():%Y%m%d-%H%M%S}.{fmt}"
+    return StreamingResponse(
+        ExportService.stream(db.read_session, fmt, employee_id=employee_id, start=start, end=end),
+        media_type=ExportService.FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# =========================
+# DATABASE POOL
+# =========================
+
+@router.get("/admin/db/pool")
+def database_pool_stats(
+    current_user: UserPrincipal = Depends(SecurityService.require_admin),
+):
+    """Connection pool sizing data: checkout wait percentiles, connections in use, timeouts."""
+    return db.pool_stats()
+
+
+@router.get("/admin/db/queries")
+def database_query_stats(
+    current_user: UserPrincipal = Depends(SecurityService.require_admin),
+):
+    """Per-route query counts and database time over recent requests, slowest (p95) first."""
+    return RouteQueryStats.stats()
+
+
+@router.delete("/admin/db/queries")
+def reset_database_query_stats(
+    current_user: UserPrincipal = Depends(SecurityService.require_admin),
+):
+    RouteQueryStats.reset()
+    return {"message": "Reset"}
+
+
+@router.get("/admin/db/statements")
+def database_statement_stats(
+    limit: int = 20,
+    sort: str = "total",
+    current_user: UserPrincipal = Depends(SecurityService.require_admin),
+):
+    """
+    Top statement fingerprints by `sort` (total, p99, max, count, slow):
+    latency histogram summary, slow-query count and the last EXPLAIN plan.
+    """
+    try:
+        return QueryFingerprints.top(clamp_page_size(limit), sort)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@router.delete("/admin/db/statements")
+def reset_database_statement_stats(
+    current_user: UserPrincipal = Depends(SecurityService.require_admin),
+):
+    QueryFingerprints.reset()
+    return {"message": "Reset"}
+
+
+@router.post("/admin/profiles/token")
+def issue_profile_token(
+    ttl_seconds: int = 900,
+    current_user: UserPrincipal = Depends(SecurityService.require_admin),
+):
+    """
+    Signed token for the X-Profile header. Any request carrying it, from any
+    user, is profiled until it expires; fetch the result by its X-Profile-Id.
+    """
+    token, expires = profiler.issue_token(ttl_seconds)
+    return {
+        "header": "X-Profile",
+        "token": token,
+        "expires_at": datetime.utcfromtimestamp(expires).isoformat(),
+    }
+
+
+@router.get("/admin/profiles")
+def list_profiles(
+    current_user: UserPrincipal = Depends(SecurityService.require_admin),
+):
+    return profiler.ProfileStore.list()
+
+
+@router.get("/admin/profiles/{profile_id}")
+def get_profile(
+    profile_id: str,
+    format: str = "speedscope",
+    current_user: UserPrincipal = Depends(SecurityService.require_admin),
+):
+    """`speedscope` (open at speedscope.app) or `collapsed` (flamegraph.pl, inferno)."""
+    profile = profiler.ProfileStore.get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "collapsed":
+        return Response(
+            content=profiler.to_collapsed(profile),
+            media_type="text/plain",
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.collapsed.txt"'},
+        )
+    if format != "speedscope":
+        raise HTTPException(status_code=400, detail="format must be speedscope or collapsed")
+    return Response(
+        content=json.dumps(profiler.to_speedscope(profile)),
+        media_type="application/json",
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.speedscope.json"'},
+    )
+
+
 # =========================
 # SETTINGS
 # =========================
@@ -448,7 +761,7 @@ def monthly_summary(
 @router.get("/settings/company-tax", response_model=CompanySettingsResponse)
 def get_company_tax(
     session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.require_dashboard_user),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
 ):
     settings = session.query(CompanySettings).first()
     if not settings:
@@ -463,41 +776,44 @@ def get_company_tax(
 def update_company_tax(
     data: CompanySettingsUpdate,
     session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.require_dashboard_user),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
 ):
     settings = session.query(CompanySettings).first()
     if not settings:
-        settings = CompanySettings(default_tax_rate=data.default_tax_rate)
+        settings = CompanySettings(default_tax_rate=data.default_tax_rate, config_version=1)
         session.add(settings)
     else:
         settings.default_tax_rate = data.default_tax_rate
+        settings.config_version = (settings.config_version or 0) + 1
     session.commit()
     session.refresh(settings)
+    TaxSettingsCache.store(settings.default_tax_rate, settings.config_version)
     return CompanySettingsResponse(default_tax_rate=settings.default_tax_rate)
 
 
-@router.get("/settings/tax-slabs", response_model=List[TaxSlabResponse])
+@router.get("/settings/company-tax/cache-stats")
+def get_company_tax_cache_stats(
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
+):
+    """Hit/miss counters for this worker's tax settings cache."""
+    return TaxSettingsCache.stats()
+
+
+@router.get("/settings/tax-slabs", response_model=List[TaxSlabResponse], openapi_extra=_budget(1))
 def get_tax_slabs(
-    session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.require_dashboard_user),
+    session: Session = Depends(db.get_read_db),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
 ):
-    slabs = session.query(TaxSlab).all()
-    return [
-        TaxSlabResponse(
-            id=s.id,
-            min_income=s.min_income,
-            max_income=s.max_income,
-            tax_rate=s.tax_rate,
-        )
-        for s in slabs
-    ]
+    return session.execute(
+        select(TaxSlab.id, TaxSlab.min_income, TaxSlab.max_income, TaxSlab.tax_rate)
+    ).all()
 
 
 @router.post("/settings/tax-slabs", response_model=TaxSlabResponse)
 def create_tax_slab(
     data: TaxSlabCreate,
     session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.require_dashboard_user),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
 ):
     slab = TaxSlab(
         min_income=data.min_income,
@@ -505,8 +821,10 @@ def create_tax_slab(
         tax_rate=data.tax_rate,
     )
     session.add(slab)
+    TaxService.bump_config_version(session)
     session.commit()
     session.refresh(slab)
+    TaxSettingsCache.invalidate()
     return TaxSlabResponse(
         id=slab.id,
         min_income=slab.min_income,
@@ -519,13 +837,15 @@ def create_tax_slab(
 def delete_tax_slab(
     slab_id: int,
     session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.require_dashboard_user),
+    current_user: UserPrincipal = Depends(SecurityService.require_dashboard_user),
 ):
     slab = session.query(TaxSlab).filter(TaxSlab.id == slab_id).first()
     if not slab:
         raise HTTPException(status_code=404, detail="Tax slab not found")
     session.delete(slab)
+    TaxService.bump_config_version(session)
     session.commit()
+    TaxSettingsCache.invalidate()
     return {"message": "Deleted"}
 
 
@@ -533,35 +853,29 @@ def delete_tax_slab(
 # EMPLOYEE SELF-SERVICE (for Frontendemployee)
 # =========================
 
-@router.get("/me/transactions", response_model=List[TransactionResponse])
+@router.get("/me/transactions", response_model=List[TransactionResponse], openapi_extra=_budget(1))
 def get_my_transactions(
-    session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.get_current_user),
+    response: Response,
+    limit: int = 100,
+    after: Optional[str] = None,
+    session: Session = Depends(db.get_read_db),
+    current_user: UserPrincipal = Depends(SecurityService.get_current_user),
 ):
-    """Returns transactions for the employee matching current user's email."""
-    emp = session.query(Employee).filter(Employee.email == current_user.email).first()
-    if not emp:
-        return []
-    return [
-        TransactionResponse(
-            id=t.id,
-            employee_id=t.employee_id,
-            amount=t.amount,
-            tax_amount=t.tax_amount,
-            description=t.description or "",
-            timestamp=t.timestamp,
-        )
-        for t in emp.transactions
-    ]
+    """Returns a newest-first page of transactions for the employee matching current user's email."""
+    transactions, next_cursor = TransactionReadModel.page_for_email(
+        session, current_user.email, clamp_page_size(limit), after
+    )
+    _set_next_cursor(response, next_cursor)
+    return transactions
 
 
-@router.get("/me/profile")
+@router.get("/me/profile", openapi_extra=_budget(1))
 def get_my_profile(
-    session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.get_current_user),
+    session: Session = Depends(db.get_read_db),
+    current_user: UserPrincipal = Depends(SecurityService.get_current_user),
 ):
     """Returns the employee profile for the current user."""
-    emp = session.query(Employee).filter(Employee.email == current_user.email).first()
+    emp = EmployeeReadModel.profile(session, current_user.email)
     if not emp:
         return {
             "email": current_user.email,
@@ -569,12 +883,6 @@ def get_my_profile(
             "employee": None,
             "total_earned": 0,
         }
-    total_earned = (
-        session.query(func.sum(Transaction.amount))
-        .filter(Transaction.employee_id == emp.id)
-        .scalar()
-        or 0
-    )
     return {
         "email": current_user.email,
         "role": current_user.role,
@@ -586,7 +894,7 @@ def get_my_profile(
             "is_streaming": emp.is_streaming,
             "wallet_address": emp.wallet_address,
         },
-        "total_earned": float(total_earned),
+        "total_earned": float(emp.total_earned),
     }
 
 
@@ -594,7 +902,7 @@ def get_my_profile(
 def update_my_wallet(
     data: EmployeeWalletUpdate,
     session: Session = Depends(db.get_db),
-    current_user: User = Depends(SecurityService.get_current_user),
+    current_user: UserPrincipal = Depends(SecurityService.get_current_user),
 ):
     emp = session.query(Employee).filter(Employee.email == current_user.email).first()
     if not emp:
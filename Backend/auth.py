@@ -1,35 +1,52 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordRequestForm
 
 from models import User
 from schemas import UserCreate, Token
 from database import db
-from security import SecurityService
+from security import PasswordHashPool, SecurityService, UserPrincipal
 
 
 router = APIRouter()
 
 
+def _released(session: Session, query):
+    """
+    First row of `query`, then end the read so the pooled connection goes
+    back before the caller waits on the hash pool. Otherwise a login burst
+    holds every connection and starves the rest of the API.
+    """
+    row = query.first()
+    session.rollback()
+    return row
+
+
 # =========================
 # REGISTER (JSON)
 # =========================
+# Async so pbkdf2 waits in the hash pool, not on a shared threadpool thread;
+# the short database calls still go through the threadpool.
 @router.post("/register")
-def register(user: UserCreate, session: Session = Depends(db.get_db)):
+async def register(user: UserCreate, session: Session = Depends(db.get_db)):
 
-    existing = session.query(User).filter(User.email == user.email).first()
+    existing = await run_in_threadpool(_released, session, session.query(User.id).filter(User.email == user.email))
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
     new_user = User(
         email=user.email,
-        hashed_password=SecurityService.hash_password(user.password),
+        hashed_password=await SecurityService.hash_password_async(user.password),
         role=user.role
     )
 
-    session.add(new_user)
-    session.commit()
-    session.refresh(new_user)
+    def save():
+        session.add(new_user)
+        session.commit()
+        session.refresh(new_user)
+
+    await run_in_threadpool(save)
 
     return {"message": "User registered successfully"}
 
@@ -38,14 +55,18 @@ def register(user: UserCreate, session: Session = Depends(db.get_db)):
 # LOGIN (OAuth2 Form Data)
 # =========================
 @router.post("/login", response_model=Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     session: Session = Depends(db.get_db)
 ):
 
-    db_user = session.query(User).filter(User.email == form_data.username).first()
+    db_user = await run_in_threadpool(
+        _released,
+        session,
+        session.query(User.email, User.role, User.hashed_password).filter(User.email == form_data.username),
+    )
 
-    if not db_user or not SecurityService.verify_password(
+    if not db_user or not await SecurityService.verify_password_async(
         form_data.password,
         db_user.hashed_password
     ):
@@ -63,3 +84,10 @@ def login(
         "token_type": "bearer"
     }
 
+
+# =========================
+# HASH POOL METRICS
+# =========================
+@router.get("/auth/hash-stats")
+def hash_stats(current_user: UserPrincipal = Depends(SecurityService.require_admin)):
+    return PasswordHashPool.stats()
@@ -0,0 +1,9 @@
+"""
+Standalone benchmarks. Run them from the Backend directory as modules, e.g.
+
+    python -m benchmarks.login_load --help
+
+Each one either targets a server you already run (--url) or starts a
+throwaway uvicorn against --database-url (a temporary SQLite file by default)
+with the demo users seeded.
+"""
@@ -0,0 +1,200 @@
+"""
+Shared helpers for the benchmark scripts: a throwaway server, a keep-alive
+HTTP client and latency percentiles. Standard library only.
+"""
+import contextlib
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EMPLOYER = ("employer@test.com", "123456")
+EMPLOYEE = ("employee@test.com", "123456")
+ADMIN = ("admin@krackheads.com", "admin123")
+
+
+def percentiles(samples_ms: List[float]) -> dict:
+    if not samples_ms:
+        return {"count": 0, "p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    ordered = sorted(samples_ms)
+
+    def at(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 2)
+
+    return {
+        "count": len(ordered),
+        "p50_ms": at(0.50),
+        "p95_ms": at(0.95),
+        "p99_ms": at(0.99),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+class Client:
+    """One keep-alive connection; not thread-safe, so give each worker thread its own."""
+
+    def __init__(self, base_url: str, token: Optional[str] = None, timeout: float = 60.0):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.timeout = timeout
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self._conn: Optional[http.client.HTTPConnection] = None
+
+    def request(self, method: str, path: str, body=None, form: Optional[dict] = None,
+                headers: Optional[dict] = None) -> Tuple[int, float, bytes]:
+        """Returns (status, elapsed_ms, body). Connection errors count as status 0."""
+        send_headers = {**self.headers, **(headers or {})}
+        payload = None
+        if form is not None:
+            payload = urllib.parse.urlencode(form).encode()
+            send_headers["Content-Type"] = "application/x-www-form-urlencoded"
+        elif body is not None:
+            payload = json.dumps(body).encode()
+            send_headers["Content-Type"] = "application/json"
+
+        started = time.perf_counter()
+        # A reused connection may have been closed by the server's keep-alive
+        # timeout while idle; that gets one retry on a fresh connection
+        for attempt in range(2 if self._conn is not None else 1):
+            try:
+                if self._conn is None:
+                    self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+                self._conn.request(method, path, body=payload, headers=send_headers)
+                response = self._conn.getresponse()
+                data = response.read()
+                return response.status, (time.perf_counter() - started) * 1000, data
+            except (OSError, http.client.HTTPException):
+                self.close()
+        return 0, (time.perf_counter() - started) * 1000, b""
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def login(base_url: str, email: str, password: str) -> str:
+    client = Client(base_url)
+    status, _, data = client.request("POST", "/api/login", form={"username": email, "password": password})
+    client.close()
+    if status != 200:
+        raise SystemExit(f"Login as {email} failed with {status}: {data[:200]!r}")
+    return json.loads(data)["access_token"]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(base_url: str, process: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    client = Client(base_url, timeout=2.0)
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Server exited with code {process.returncode}")
+        status, _, _ = client.request("GET", "/")
+        if status:
+            client.close()
+            return
+        time.sleep(0.2)
+    raise SystemExit("Server did not start in time")
+
+
+def migrate(database_url: str, env: Optional[dict] = None) -> None:
+    subprocess.run([sys.executable, "manage.py", "migrate"], cwd=BACKEND_DIR,
+                   env={**os.environ, **(env or {}), "DATABASE_URL": database_url},
+                   check=True, stdout=subprocess.DEVNULL)
+
+
+def process_memory_kb(pid: Optional[int]) -> dict:
+    """Current and peak resident set size of `pid` from /proc (Linux only; empty elsewhere)."""
+    memory = {}
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    memory["rss_kb" if line.startswith("VmRSS") else "peak_rss_kb"] = int(line.split()[1])
+    except (OSError, TypeError):
+        pass
+    return memory
+
+
+class Server(NamedTuple):
+    url: str
+    pid: Optional[int]  # the uvicorn process (its supervisor with several workers); None for --url
+
+
+@contextlib.contextmanager
+def server(database_url: Optional[str] = None, env: Optional[dict] = None,
+           workers: int = 1) -> Iterator[Server]:
+    """
+    Migrate `database_url` (a fresh temporary SQLite file when omitted), then
+    run uvicorn on it with the demo users seeded.
+    """
+    scratch = None
+    if database_url is None:
+        scratch = tempfile.mkdtemp(prefix="bench-")
+        database_url = f"sqlite:///{os.path.join(scratch, 'bench.db')}"
+
+    port = _free_port()
+    server_env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "ENABLE_DEMO_SEED": "true",
+        **(env or {}),
+    }
+    migrate(database_url, server_env)
+
+    def start(worker_count: int) -> subprocess.Popen:
+        return subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--workers", str(worker_count), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=server_env,
+        )
+
+    def stop(process: subprocess.Popen) -> None:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    base_url = f"http://127.0.0.1:{port}"
+    process = start(1)
+    try:
+        _wait_ready(base_url, process)
+        if workers > 1:
+            # Seed with one worker first, so N workers do not race on the first-boot inserts
+            stop(process)
+            process = start(workers)
+            _wait_ready(base_url, process)
+        yield Server(base_url, process.pid)
+    finally:
+        stop(process)
+        if scratch:
+            for name in os.listdir(scratch):
+                os.remove(os.path.join(scratch, name))
+            os.rmdir(scratch)
+
+
+def target(args, env: Optional[dict] = None, workers: int = 1) -> contextlib.AbstractContextManager:
+    """The server named by --url, or a throwaway one built from --database-url and `env`."""
+    if args.url:
+        return contextlib.nullcontext(Server(args.url.rstrip("/"), None))
+    return server(args.database_url, env, workers)
+
+
+def add_target_arguments(parser) -> None:
+    parser.add_argument("--url", help="Benchmark a running server instead of starting one")
+    parser.add_argument("--database-url", help="Database for the throwaway server (default: temporary SQLite)")
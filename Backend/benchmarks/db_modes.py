@@ -0,0 +1,134 @@
+"""
+Load test: sync sessions on the threadpool against DATABASE_ASYNC=true.
+
+Starts one throwaway server per mode on its own fresh database and drives
+it with closed-loop client threads at each --concurrency level. Each
+client cycles through the dashboard and list reads, and every
+--payout-every'th request posts a 0.01 payout so the write path is in the
+mix too. Reports requests per second, latency percentiles and errors per
+mode and level, plus the async/sync ratio of each.
+
+The client threads share the machine with the server, so on a small box
+the higher levels measure the client as much as the server; point --url
+at a server elsewhere to avoid that (it is then benchmarked in whatever
+mode it runs in, and --modes is ignored).
+
+    python -m benchmarks.db_modes --concurrency 16,64,256 --duration 20
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+
+from benchmarks.common import EMPLOYER, Client, add_target_arguments, login, percentiles, target
+
+READ_PATHS = (
+    "/api/dashboard/overview",
+    "/api/employees/",
+    "/api/employees/1/transactions",
+    "/api/dashboard/top-earners",
+    "/api/treasury/ledger/balance",
+    "/api/dashboard/monthly-summary",
+)
+MODES = {"sync": "false", "async": "true"}
+
+
+def prepare(client: Client) -> None:
+    """Employees 1 and 2 streaming and enough treasury that payouts never run dry."""
+    for employee_id in (1, 2):
+        client.request("POST", f"/api/stream/start/{employee_id}")
+    status, _, data = client.request("POST", "/api/treasury/deposit", body={"amount": "1000000.00"})
+    if status != 200:
+        raise SystemExit(f"Treasury deposit failed with {status}: {data[:200]!r}")
+
+
+def run_level(base_url: str, token: str, concurrency: int, duration: float, payout_every: int) -> dict:
+    stop = threading.Event()
+    lock = threading.Lock()
+    latencies: list = []
+    outcomes: dict = {}
+
+    def worker(worker_index: int) -> None:
+        client = Client(base_url, token)
+        paths = itertools.cycle(READ_PATHS[worker_index % len(READ_PATHS):] + READ_PATHS)
+        for n in itertools.count(1):
+            if stop.is_set():
+                break
+            if payout_every and n % payout_every == 0:
+                status, elapsed_ms, _ = client.request(
+                    "POST", "/api/transactions/",
+                    body={"employee_id": 1 + worker_index % 2, "amount": "0.01", "description": "load"},
+                )
+            else:
+                status, elapsed_ms, _ = client.request("GET", next(paths))
+            with lock:
+                latencies.append(elapsed_ms)
+                outcomes[status] = outcomes.get(status, 0) + 1
+        client.close()
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests_per_second": round(outcomes.get(200, 0) / elapsed, 1),
+        "latency": percentiles(latencies),
+        "errors": {str(s): n for s, n in outcomes.items() if s != 200},
+    }
+
+
+def benchmark(args, env: dict) -> dict:
+    with target(args, env) as running:
+        token = login(running.url, *EMPLOYER)
+        setup = Client(running.url, token)
+        prepare(setup)
+        setup.close()
+
+        levels = {}
+        for concurrency in args.concurrency:
+            run_level(running.url, token, concurrency, min(args.duration, 3.0), args.payout_every)  # warm-up
+            levels[str(concurrency)] = run_level(
+                running.url, token, concurrency, args.duration, args.payout_every
+            )
+        return levels
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_target_arguments(parser)
+    parser.add_argument("--modes", default="sync,async", help="Comma-separated subset of: sync, async")
+    parser.add_argument("--concurrency", default="16,64",
+                        type=lambda value: [int(v) for v in value.split(",")],
+                        help="Comma-separated client thread counts")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per concurrency level")
+    parser.add_argument("--payout-every", type=int, default=10,
+                        help="Every Nth request of a client is a payout (0 for reads only)")
+    args = parser.parse_args()
+
+    if args.url:
+        print(json.dumps({"target": benchmark(args, {})}, indent=2))
+        return
+
+    report = {mode: benchmark(args, {"DATABASE_ASYNC": MODES[mode]}) for mode in args.modes.split(",")}
+    if "sync" in report and "async" in report:
+        report["async_vs_sync"] = {
+            level: {
+                "rps_ratio": round(report["async"][level]["requests_per_second"]
+                                   / max(report["sync"][level]["requests_per_second"], 0.1), 2),
+                "p99_ratio": round((report["async"][level]["latency"]["p99_ms"] or 0)
+                                   / max(report["sync"][level]["latency"]["p99_ms"] or 0, 0.01), 2),
+            }
+            for level in report["sync"]
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Dashboard latency while a login burst is in flight.
+
+A few reader threads poll GET /api/dashboard/overview as the employer. The
+script measures them twice: on a quiet server, then while --logins threads
+hammer POST /api/login. Password hashing runs in PasswordHashPool, so
+dashboard p99 should stay close to the quiet baseline. Logins past
+HASH_POOL_MAX_PENDING get a fast 429 instead of piling onto the threadpool.
+
+    python -m benchmarks.login_load --logins 200 --duration 15
+"""
+import argparse
+import json
+import threading
+import time
+
+from benchmarks.common import ADMIN, EMPLOYEE, EMPLOYER, Client, add_target_arguments, login, percentiles, target
+
+
+def read_dashboard(base_url: str, token: str, stop: threading.Event, samples: list, errors: list) -> None:
+    client = Client(base_url, token)
+    while not stop.is_set():
+        status, elapsed_ms, _ = client.request("GET", "/api/dashboard/overview")
+        if status == 200:
+            samples.append(elapsed_ms)
+        else:
+            errors.append(status)
+    client.close()
+
+
+def log_in_repeatedly(base_url: str, stop: threading.Event, outcomes: dict, lock: threading.Lock) -> None:
+    client = Client(base_url)
+    email, password = EMPLOYEE
+    while not stop.is_set():
+        status, _, _ = client.request("POST", "/api/login", form={"username": email, "password": password})
+        with lock:
+            outcomes[status] = outcomes.get(status, 0) + 1
+        if status == 429:
+            time.sleep(0.05)  # honour the spirit of Retry-After without stalling the burst
+    client.close()
+
+
+def measure(base_url: str, token: str, readers: int, duration: float, logins: int) -> dict:
+    stop = threading.Event()
+    samples: list = []
+    errors: list = []
+    outcomes: dict = {}
+    lock = threading.Lock()
+
+    threads = [
+        threading.Thread(target=log_in_repeatedly, args=(base_url, stop, outcomes, lock), daemon=True)
+        for _ in range(logins)
+    ]
+    for thread in threads:
+        thread.start()
+    if logins:
+        time.sleep(1.0)  # let the burst build up before sampling
+
+    threads_r = [
+        threading.Thread(target=read_dashboard, args=(base_url, token, stop, samples, errors), daemon=True)
+        for _ in range(readers)
+    ]
+    started = time.perf_counter()
+    for thread in threads_r:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads + threads_r:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    result = {"dashboard": percentiles(samples), "dashboard_errors": len(errors)}
+    if logins:
+        result["logins"] = {
+            "ok": outcomes.get(200, 0),
+            "rejected_429": outcomes.get(429, 0),
+            "other": sum(n for s, n in outcomes.items() if s not in (200, 429)),
+            "ok_per_second": round(outcomes.get(200, 0) / elapsed, 1),
+        }
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_target_arguments(parser)
+    parser.add_argument("--logins", type=int, default=200, help="Concurrent login loops during the load phase")
+    parser.add_argument("--readers", type=int, default=4, help="Concurrent dashboard readers")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per phase")
+    parser.add_argument("--hash-pool-workers", type=int,
+                        help="HASH_POOL_WORKERS for the throwaway server (0 hashes on the threadpool)")
+    args = parser.parse_args()
+
+    env = {}
+    if args.hash_pool_workers is not None:
+        env["HASH_POOL_WORKERS"] = str(args.hash_pool_workers)
+    with target(args, env) as running:
+        base_url = running.url
+        token = login(base_url, *EMPLOYER)
+        report = {
+            "quiet": measure(base_url, token, args.readers, args.duration, logins=0),
+            "during_logins": measure(base_url, token, args.readers, args.duration, logins=args.logins),
+        }
+        hash_pool = Client(base_url, login(base_url, *ADMIN))
+        status, _, data = hash_pool.request("GET", "/api/auth/hash-stats")
+        if status == 200:
+            report["hash_pool"] = json.loads(data)
+        hash_pool.close()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
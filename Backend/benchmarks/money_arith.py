@@ -0,0 +1,129 @@
+"""
+Microbenchmark: payroll arithmetic with integer cents (money.Money and the
+batch helpers) against the float/Decimal mix it replaced.
+
+The legacy path is what create_transaction did before: the Decimal request
+amount went through float(), tax was computed in float, and the results
+came back through Decimal(str(x)). The script times gross -> tax -> net ->
+column Decimal per payout for the legacy path, for Money one payout at a
+time, and for money.tax_batch/net_batch over the whole run, plus the
+tax/net step alone without the conversions at either end. It also
+counts rounding drift against an exact Decimal reference (half-up to the
+cent), per payout and in the run total.
+
+    python -m benchmarks.money_arith --payouts 100000 --rate 12.5
+"""
+import argparse
+import json
+import random
+import time
+from decimal import Decimal, ROUND_HALF_UP
+
+import money
+from money import Money
+
+CENT = Decimal("0.01")
+
+
+def legacy(amounts, rate: float):
+    out = []
+    for amount in amounts:
+        gross = float(amount)
+        tax = (gross * rate) / 100.0
+        net = gross - tax
+        out.append((Decimal(str(net)), Decimal(str(tax))))
+    return out
+
+
+def money_scalar(amounts, rate_bp: int):
+    out = []
+    for amount in amounts:
+        gross = Money.from_decimal(amount)
+        tax = gross.tax(rate_bp)
+        out.append(((gross - tax).to_decimal(), tax.to_decimal()))
+    return out
+
+
+def money_batch(amounts, rate_bp: int):
+    gross = [Money.from_decimal(amount).cents for amount in amounts]
+    tax = money.tax_batch(gross, rate_bp)
+    net = money.net_batch(gross, tax)
+    return [(Money(n).to_decimal(), Money(t).to_decimal()) for n, t in zip(net, tax)]
+
+
+def legacy_arithmetic(grosses, rate: float):
+    taxes = [(g * rate) / 100.0 for g in grosses]
+    return [g - t for g, t in zip(grosses, taxes)]
+
+
+def batch_arithmetic(gross_cents, rate_bp: int):
+    return money.net_batch(gross_cents, money.tax_batch(gross_cents, rate_bp))
+
+
+def reference(amounts, rate: Decimal):
+    out = []
+    for amount in amounts:
+        tax = (amount * rate / 100).quantize(CENT, rounding=ROUND_HALF_UP)
+        out.append((amount - tax, tax))
+    return out
+
+
+def best_of(repeats: int, fn, *args):
+    best, result = float("inf"), None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def drift(results, exact) -> dict:
+    # Numeric(12, 2) columns keep two places, so compare what would be stored
+    stored = [(n.quantize(CENT, rounding=ROUND_HALF_UP), t.quantize(CENT, rounding=ROUND_HALF_UP)) for n, t in results]
+    return {
+        "payouts_off_by_a_cent_or_more": sum(1 for s, e in zip(stored, exact) if s != e),
+        "values_needing_requantize": sum(1 for n, _ in results if n != n.quantize(CENT)),
+        "total_net_error": str(sum((n for n, _ in results), Decimal(0)) - sum((n for n, _ in exact), Decimal(0))),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payouts", type=int, default=100000)
+    parser.add_argument("--rate", default="12.5", help="Tax rate in percent")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    amounts = [Decimal(rng.randint(1, 1_000_000)).scaleb(-2) for _ in range(args.payouts)]
+    rate = Decimal(args.rate)
+    rate_bp = money.rate_to_bp(rate)
+    exact = reference(amounts, rate)
+
+    report = {"payouts": args.payouts, "rate_percent": args.rate}
+    for name, fn, rate_arg in (
+        ("legacy_float_decimal", legacy, float(rate)),
+        ("money_scalar", money_scalar, rate_bp),
+        ("money_batch", money_batch, rate_bp),
+    ):
+        seconds, results = best_of(args.repeats, fn, amounts, rate_arg)
+        report[name] = {
+            "total_ms": round(seconds * 1000, 2),
+            "ns_per_payout": round(seconds / args.payouts * 1e9),
+            **drift(results, exact),
+        }
+
+    # The tax/net step alone, on amounts already in each path's working form
+    floats = [float(amount) for amount in amounts]
+    cents = [Money.from_decimal(amount).cents for amount in amounts]
+    report["arithmetic_only_ns_per_payout"] = {
+        "legacy_float": round(best_of(args.repeats, legacy_arithmetic, floats, float(rate))[0] / args.payouts * 1e9),
+        "money_batch": round(best_of(args.repeats, batch_arithmetic, cents, rate_bp)[0] / args.payouts * 1e9),
+    }
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
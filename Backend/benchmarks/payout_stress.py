@@ -0,0 +1,141 @@
+"""
+Concurrent payout stress test for the treasury debit path.
+
+Many client threads post salary payouts (POST /api/transactions/) against a
+multi-worker server while the treasury only holds enough for part of them.
+It reports payouts per second and latency, then proves there was no drift:
+
+* the treasury fell by exactly the net of the payouts that succeeded,
+* it never went negative (failed payouts were refused, not overdrawn),
+* the ledger balance and the dashboard payout counter agree with it.
+
+Exits non-zero on any drift.
+
+    python -m benchmarks.payout_stress --workers 4 --threads 16 --payouts 2000
+"""
+import argparse
+import itertools
+import json
+import sys
+import threading
+import time
+from decimal import Decimal
+
+from benchmarks.common import EMPLOYER, Client, add_target_arguments, login, percentiles, target
+
+CENT = Decimal("0.01")
+
+
+def _money(value) -> Decimal:
+    return Decimal(str(value)).quantize(CENT)
+
+
+def _get(client: Client, path: str) -> dict:
+    status, _, data = client.request("GET", path, headers={"X-Read-Consistency": "strong"})
+    if status != 200:
+        raise SystemExit(f"GET {path} failed with {status}: {data[:200]!r}")
+    return json.loads(data)
+
+
+def snapshot(client: Client) -> dict:
+    return {
+        "treasury": _money(_get(client, "/api/treasury")["total_balance"]),
+        "ledger": _money(_get(client, "/api/treasury/ledger/balance")["balance"]),
+        "paid_counter": _money(_get(client, "/api/dashboard/total-payout")["total_paid_net"]),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_target_arguments(parser)
+    parser.add_argument("--workers", type=int, default=4, help="uvicorn workers for the throwaway server")
+    parser.add_argument("--threads", type=int, default=16, help="Concurrent client threads")
+    parser.add_argument("--payouts", type=int, default=2000, help="Payouts to attempt in total")
+    parser.add_argument("--amount", default="1.00", help="Gross amount of each payout")
+    parser.add_argument("--treasury", default="500.00",
+                        help="Treasury balance to start from, so later payouts hit insufficient funds "
+                             "('keep' leaves it unchanged)")
+    args = parser.parse_args()
+
+    # SQLite serializes writers, so contended debits would flood the slow-query log
+    with target(args, {"SLOW_QUERY_MS": "0"}, workers=args.workers) as running:
+        base_url = running.url
+        token = login(base_url, *EMPLOYER)
+        admin = Client(base_url, token)
+
+        employee_ids = [1, 2]
+        for employee_id in employee_ids:
+            admin.request("POST", f"/api/stream/start/{employee_id}")
+
+        if args.treasury != "keep":
+            excess = _money(_get(admin, "/api/treasury")["total_balance"]) - _money(args.treasury)
+            if excess > 0:
+                status, _, data = admin.request("POST", "/api/treasury/withdraw", body={"amount": str(excess)})
+                if status != 200:
+                    raise SystemExit(f"Could not set the treasury balance: {status} {data[:200]!r}")
+
+        before = snapshot(admin)
+
+        tickets = iter(range(args.payouts))
+        lock = threading.Lock()
+        latencies: list = []
+        paid_net: list = []
+        outcomes: dict = {}
+
+        def worker(worker_index: int) -> None:
+            client = Client(base_url, token)
+            targets = itertools.cycle(employee_ids[worker_index % len(employee_ids):] + employee_ids)
+            while True:
+                with lock:
+                    if next(tickets, None) is None:
+                        break
+                status, elapsed_ms, data = client.request(
+                    "POST", "/api/transactions/",
+                    body={"employee_id": next(targets), "amount": args.amount, "description": "stress"},
+                )
+                with lock:
+                    latencies.append(elapsed_ms)
+                    outcomes[status] = outcomes.get(status, 0) + 1
+                    if status == 200:
+                        paid_net.append(_money(json.loads(data)["amount"]))
+            client.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        after = snapshot(admin)
+        admin.close()
+
+    total_paid = sum(paid_net, Decimal("0.00"))
+    expected_treasury = before["treasury"] - total_paid
+    checks = {
+        "treasury_fell_by_paid_net": after["treasury"] == expected_treasury,
+        "treasury_not_negative": after["treasury"] >= 0,
+        "ledger_matches_treasury": after["ledger"] == after["treasury"],
+        "payout_counter_matches": after["paid_counter"] - before["paid_counter"] == total_paid,
+        "no_unexpected_statuses": set(outcomes) <= {200, 400},
+    }
+    report = {
+        "payouts_attempted": args.payouts,
+        "paid": outcomes.get(200, 0),
+        "refused_insufficient_funds": outcomes.get(400, 0),
+        "other_statuses": {str(s): n for s, n in outcomes.items() if s not in (200, 400)},
+        "payouts_per_second": round(len(latencies) / elapsed, 1),
+        "latency": percentiles(latencies),
+        "treasury_before": str(before["treasury"]),
+        "treasury_after": str(after["treasury"]),
+        "expected_after": str(expected_treasury),
+        "ledger_after": str(after["ledger"]),
+        "checks": checks,
+    }
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if all(checks.values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
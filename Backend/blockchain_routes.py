@@ -4,8 +4,7 @@ Blockchain config API - provides contract address and ABI to frontends.
 from fastapi import APIRouter, Depends
 
 from config import settings
-from security import SecurityService
-from models import User
+from security import SecurityService, UserPrincipal
 
 router = APIRouter()
 
@@ -30,7 +29,7 @@ CORE_PAYROLL_ABI = [
 
 @router.get("/blockchain/config")
 def get_blockchain_config(
-    current_user: User = Depends(SecurityService.get_current_user),
+    current_user: UserPrincipal = Depends(SecurityService.get_current_user),
 ):
     """Returns contract address and ABI for frontend Web3Auth + ethers integration."""
     return {
@@ -7,12 +7,51 @@ class Settings(BaseSettings):
 
     APP_ENV: str = "development"
     ENABLE_DEMO_SEED: bool = False
+    MIGRATE_ON_STARTUP: bool = False  # Outside development, startup refuses an out-of-date schema unless this is set
     DATABASE_URL: Optional[str] = None  # Optional; app can boot without a database
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 30  # pool_size + overflow should cover the ~40 threadpool workers in sync mode
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 268435456  # 256 MiB of memory-mapped I/O per connection; 0 disables
+    DATABASE_REPLICA_URLS: Optional[str] = None  # Comma-separated read replicas for dashboard/self-service reads
+    REPLICA_RETRY_SECONDS: float = 30.0  # How long a replica that failed to connect is skipped
+    READ_YOUR_WRITES_SECONDS: float = 5.0  # After a write, that client's reads stay on the primary this long
+    DATABASE_ASYNC: bool = False  # Serve API routes on an AsyncEngine (asyncpg / aiosqlite / aiomysql)
     HELA_RPC_URL: Optional[str] = None
     CONTRACT_ADDRESS: Optional[str] = None
     TAX_VAULT_ADDRESS: Optional[str] = None
     TAX_RATE: int = 10
     SECRET_KEY: str = "CHANGE-ME-IN-PRODUCTION"  # Override in Vercel env vars!
     ALLOWED_ORIGINS: Optional[str] = None  # Comma-separated list, or leave blank for "*"
+    HASH_POOL_WORKERS: int = 2  # Processes for password hashing; 0 hashes on the request threadpool
+    HASH_POOL_MAX_PENDING: int = 64  # Hash jobs queued or running before /login and /register answer 429
+    HASH_POOL_NICE: int = 10  # Added to the hash workers' niceness so request handling wins the CPU
+    AUTH_CACHE_TTL_SECONDS: float = 60.0  # How long a decoded token's user principal is trusted; 0 disables
+    AUTH_CACHE_SIZE: int = 4096
+    TAX_SETTINGS_CHECK_SECONDS: float = 5.0  # How often a worker re-checks the tax config version
+    IDEMPOTENCY_TTL_HOURS: int = 24
+    IDEMPOTENCY_CACHE_SIZE: int = 1024  # In-process LRU in front of the idempotency_keys table
+    IDEMPOTENCY_LEASE_SECONDS: int = 60  # After this an in-progress key (e.g. from a crashed worker) can be taken over
+    EXPORT_BATCH_SIZE: int = 1000  # Rows fetched per server-side cursor batch in streamed exports
+    LEDGER_SNAPSHOT_INTERVAL_SECONDS: int = 300  # 0 disables the background ledger compactor
+    QUERY_STATS_ENABLED: bool = True  # X-DB-Queries / X-DB-Time-ms headers and the per-route query summary
+    QUERY_STATS_WINDOW: int = 512  # Recent requests per route kept for the summary percentiles
+    N_PLUS_ONE_THRESHOLD: int = 10  # One statement repeated this often in a request is flagged as a likely N+1
+    LOG_N_PLUS_ONE: bool = False  # Also log each flagged statement
+    SLOW_QUERY_MS: float = 250.0  # Statements at least this slow are logged; 0 disables
+    SLOW_QUERY_EXPLAIN: bool = True  # Fetch and log the EXPLAIN plan of slow reads (sync engines only)
+    SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS: float = 300.0  # At most one EXPLAIN per fingerprint per interval
+    QUERY_FINGERPRINTS_MAX: int = 1000  # Distinct statement fingerprints with their own latency histogram
+    METRICS_DIR: Optional[str] = None  # Shared directory for per-worker metric files when running several workers
+    METRICS_FLUSH_SECONDS: float = 5.0  # How often each worker writes its metrics file
+    METRICS_TOKEN: Optional[str] = None  # Bearer token for scrapers; without it only admins can read /metrics
+    PROFILE_SAMPLE_RATE: float = 0.0  # Fraction of requests profiled without a signed X-Profile header
+    PROFILE_INTERVAL_MS: float = 5.0  # Stack sampling interval for profiled requests
+    PROFILE_MAX_CONCURRENT: int = 4  # Requests profiled at once; further ones run unprofiled
+    PROFILE_KEEP: int = 50  # Finished profiles kept for /admin/profiles
+    PROFILE_DIR: Optional[str] = None  # Store profiles here (shared by workers) instead of in memory
+    PROFILE_TOKEN_MAX_TTL_SECONDS: int = 3600
 
 settings = Settings()
@@ -1,7 +1,20 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from fastapi import HTTPException, Request
+from collections import OrderedDict
+from typing import List, Optional
 from config import settings
+from telemetry import LatencyWindow
+import metrics
+import profiler
+import query_stats
+import hashlib
+import hmac
+import itertools
+import threading
+import time
 
 
 def normalize_database_url(url: str) -> str:
@@ -11,28 +24,374 @@ def normalize_database_url(url: str) -> str:
     return url
 
 
+# Sync driver prefix -> asyncio driver used when DATABASE_ASYNC is on
+ASYNC_DRIVERS = {
+    "postgresql+psycopg2://": "postgresql+asyncpg://",
+    "postgresql://": "postgresql+asyncpg://",
+    "sqlite://": "sqlite+aiosqlite://",
+    "mysql+pymysql://": "mysql+aiomysql://",
+    "mysql://": "mysql+aiomysql://",
+}
+
+
+def async_database_url(url: str) -> str:
+    url = normalize_database_url(url)
+    for prefix, async_prefix in ASYNC_DRIVERS.items():
+        if url.startswith(prefix):
+            return async_prefix + url[len(prefix):]
+    return url
+
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def is_memory_sqlite(url: str) -> bool:
+    return is_sqlite(url) and (":memory:" in url or url.rstrip("/").endswith("sqlite:") or "mode=memory" in url)
+
+
+def configure_sqlite_connection(dbapi_connection) -> None:
+    """
+    Per-connection SQLite setup: WAL lets readers run alongside the writer,
+    synchronous=NORMAL is durable under WAL without an fsync per commit, and
+    busy_timeout makes writers wait for the lock instead of failing at once
+    with "database is locked".
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        if settings.SQLITE_MMAP_SIZE > 0:
+            cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    finally:
+        cursor.close()
+
+
+class PoolTelemetry:
+    """
+    Checkout wait times and connections in use for one engine's pool, so the
+    DB_POOL_* settings can be sized from data.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.wait = LatencyWindow()
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.in_use = 0
+        self.max_in_use = 0
+
+    def record_wait(self, elapsed_ms: float, timed_out: bool) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+        self.wait.record(elapsed_ms)
+        metrics.DB_POOL_CHECKOUT_WAIT.observe(elapsed_ms / 1000, pool=self.name)
+
+    def collect_metrics(self, pool) -> None:
+        with self._lock:
+            checkouts, timeouts, in_use = self.checkouts, self.timeouts, self.in_use
+        metrics.DB_POOL_CHECKOUTS.set_total(checkouts, pool=self.name)
+        metrics.DB_POOL_TIMEOUTS.set_total(timeouts, pool=self.name)
+        metrics.DB_POOL_IN_USE.set(in_use, pool=self.name)
+        if isinstance(pool, QueuePool):
+            metrics.DB_POOL_IDLE.set(pool.checkedin(), pool=self.name)
+            metrics.DB_POOL_SIZE.set(pool.size(), pool=self.name)
+
+    def attach(self, engine) -> None:
+        @event.listens_for(engine, "checkout")
+        def _checkout(dbapi_connection, connection_record, connection_proxy):
+            with self._lock:
+                self.in_use += 1
+                self.max_in_use = max(self.max_in_use, self.in_use)
+
+        @event.listens_for(engine, "checkin")
+        def _checkin(dbapi_connection, connection_record):
+            with self._lock:
+                self.in_use -= 1
+
+    def stats(self, pool) -> dict:
+        with self._lock:
+            stats = {
+                "pool": pool.__class__.__name__,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+            }
+        if isinstance(pool, QueuePool):
+            stats.update(size=pool.size(), idle=pool.checkedin(), overflow=pool.overflow(),
+                         max_overflow=pool._max_overflow, timeout_seconds=pool.timeout())
+        stats["checkout_wait_ms"] = self.wait.snapshot()
+        return stats
+
+
+class _TimedPoolMixin:
+    """Times every checkout, including time spent queued for a free connection."""
+
+    telemetry: PoolTelemetry = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.telemetry.record_wait((time.perf_counter() - started) * 1000, timed_out=True)
+            raise
+        self.telemetry.record_wait((time.perf_counter() - started) * 1000, timed_out=False)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.telemetry = self.telemetry
+        return pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(url: str, poolclass) -> dict:
+    options = {"pool_pre_ping": True}
+    # In-memory SQLite lives in a single connection, so it keeps SQLAlchemy's default pool
+    if not is_memory_sqlite(url):
+        options.update(
+            poolclass=poolclass,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        )
+    return options
+
+
+def instrument_engine(engine, telemetry: PoolTelemetry, url: str) -> None:
+    if isinstance(engine.pool, _TimedPoolMixin):
+        engine.pool.telemetry = telemetry
+    telemetry.attach(engine)
+    query_stats.attach(engine)
+    profiler.attach(engine)
+    if is_sqlite(url):
+        event.listen(engine, "connect", lambda dbapi_connection, record: configure_sqlite_connection(dbapi_connection))
+
+
+class ReplicaSet:
+    """
+    Read replicas behind one primary, handed out round-robin. A replica that
+    fails to connect is skipped for REPLICA_RETRY_SECONDS; when every replica
+    is down, `candidates` is empty and callers fall back to the primary.
+    """
+
+    def __init__(self, urls: List[str], session_factories: list, telemetry: List[PoolTelemetry], engines: list):
+        self.urls = urls
+        self.session_factories = session_factories
+        self.telemetry = telemetry
+        self.engines = engines
+        self._down_until = [0.0] * len(urls)
+        self._next = itertools.count()
+        self._lock = threading.Lock()
+        self.served = [0] * len(urls)
+        self.failures = [0] * len(urls)
+        self.fallbacks = 0
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    def candidates(self) -> List[int]:
+        if not self.urls:
+            return []
+        now = time.monotonic()
+        start = next(self._next) % len(self.urls)
+        order = [(start + i) % len(self.urls) for i in range(len(self.urls))]
+        return [i for i in order if self._down_until[i] <= now]
+
+    def mark_served(self, index: int) -> None:
+        with self._lock:
+            self.served[index] += 1
+
+    def mark_down(self, index: int) -> None:
+        with self._lock:
+            self.failures[index] += 1
+            self._down_until[index] = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+
+    def mark_fallback(self) -> None:
+        with self._lock:
+            self.fallbacks += 1
+
+    def stats(self, pool_of) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "fallbacks_to_primary": self.fallbacks,
+                "replicas": [
+                    {
+                        "index": i,
+                        "healthy": self._down_until[i] <= now,
+                        "served": self.served[i],
+                        "failures": self.failures[i],
+                        "pool": self.telemetry[i].stats(pool_of(self.engines[i])),
+                    }
+                    for i in range(len(self.urls))
+                ],
+            }
+
+
+class ReadPins:
+    """
+    Read-your-writes: a client that just mutated something reads from the
+    primary for READ_YOUR_WRITES_SECONDS, so replica lag never hides its own
+    write. Keyed by a digest of the Authorization header.
+
+    The pin travels with the client, since its next read may land on another
+    worker or host: a signed `<until_ms>.<hmac>` token, bound to that key, is
+    returned in the X-Primary-Until header and a `primary_until` cookie, and
+    any worker honours it when it comes back in either. A bounded in-process
+    LRU also covers clients that echo neither, on the worker that took the write.
+    """
+
+    HEADER = "x-primary-until"
+    COOKIE = "primary_until"
+    MAX_ENTRIES = 10000
+
+    def __init__(self):
+        self._until: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(authorization: Optional[str]) -> Optional[str]:
+        if not authorization:
+            return None
+        return hashlib.sha256(authorization.encode("utf-8")).hexdigest()
+
+    def pin(self, key: str) -> None:
+        if settings.READ_YOUR_WRITES_SECONDS <= 0:
+            return
+        with self._lock:
+            self._until[key] = time.monotonic() + settings.READ_YOUR_WRITES_SECONDS
+            self._until.move_to_end(key)
+            while len(self._until) > self.MAX_ENTRIES:
+                self._until.popitem(last=False)
+
+    @staticmethod
+    def _signature(key: str, until_ms: int) -> str:
+        message = f"read-pin:{until_ms}:{key}".encode("ascii")
+        return hmac.new(settings.SECRET_KEY.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+    @staticmethod
+    def issue(key: str) -> Optional[str]:
+        """Signed token pinning `key` to the primary until READ_YOUR_WRITES_SECONDS from now."""
+        if settings.READ_YOUR_WRITES_SECONDS <= 0:
+            return None
+        until_ms = int((time.time() + settings.READ_YOUR_WRITES_SECONDS) * 1000)
+        return f"{until_ms}.{ReadPins._signature(key, until_ms)}"
+
+    @staticmethod
+    def verify(key: Optional[str], token: Optional[str]) -> bool:
+        if key is None or not token:
+            return False
+        until_ms, _, signature = token.partition(".")
+        if not until_ms.isdigit() or int(until_ms) <= time.time() * 1000:
+            return False
+        return hmac.compare_digest(signature, ReadPins._signature(key, int(until_ms)))
+
+    def is_pinned(self, key: Optional[str]) -> bool:
+        if key is None:
+            return False
+        with self._lock:
+            until = self._until.get(key)
+            if until is None:
+                return False
+            if until <= time.monotonic():
+                del self._until[key]
+                return False
+            return True
+
+
 class Database:
     def __init__(self):
         self.Base = declarative_base()
         self.engine = None
         self.SessionLocal = None
+        self.async_engine = None
+        self.AsyncSessionLocal = None
+        self.pool_telemetry = PoolTelemetry("sync")
+        self.async_pool_telemetry = PoolTelemetry("async")
+        self.replicas = ReplicaSet([], [], [], [])
+        self.async_replicas = ReplicaSet([], [], [], [])
+        self.read_pins = ReadPins()
 
         if settings.DATABASE_URL:
             database_url = normalize_database_url(settings.DATABASE_URL)
-            self.engine = create_engine(
-                database_url,
-                pool_pre_ping=True
-            )
-            self.SessionLocal = sessionmaker(
-                autocommit=False,
-                autoflush=False,
-                bind=self.engine
-            )
+            self.engine, self.SessionLocal = self._build_sync(database_url, self.pool_telemetry)
+
+            replica_urls = [
+                normalize_database_url(u.strip())
+                for u in (settings.DATABASE_REPLICA_URLS or "").split(",")
+                if u.strip()
+            ]
+            self.replicas = self._build_replicas(replica_urls, self._build_sync, "sync")
+
+            if settings.DATABASE_ASYNC:
+                self.async_engine, self.AsyncSessionLocal = self._build_async(
+                    async_database_url(settings.DATABASE_URL), self.async_pool_telemetry
+                )
+                self.async_replicas = self._build_replicas(
+                    [async_database_url(u) for u in replica_urls], self._build_async, "async"
+                )
+
+    @staticmethod
+    def _build_sync(url: str, telemetry: PoolTelemetry):
+        engine = create_engine(
+            url,
+            **engine_options(url, TimedQueuePool)
+        )
+        instrument_engine(engine, telemetry, url)
+        session_factory = sessionmaker(
+            autocommit=False,
+            autoflush=False,
+            bind=engine
+        )
+        return engine, session_factory
+
+    @staticmethod
+    def _build_async(url: str, telemetry: PoolTelemetry):
+        # Imported lazily so the async drivers are only needed when the mode is on
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        engine = create_async_engine(
+            url,
+            **engine_options(url, TimedAsyncAdaptedQueuePool)
+        )
+        instrument_engine(engine.sync_engine, telemetry, url)
+        session_factory = async_sessionmaker(
+            bind=engine,
+            autoflush=False,
+            expire_on_commit=True
+        )
+        return engine, session_factory
+
+    @staticmethod
+    def _build_replicas(urls: List[str], build, name: str) -> ReplicaSet:
+        telemetry = [PoolTelemetry(f"{name}-replica-{i}") for i in range(len(urls))]
+        built = [build(url, t) for url, t in zip(urls, telemetry)]
+        return ReplicaSet(urls, [f for _, f in built], telemetry, [e for e, _ in built])
 
     @property
     def is_configured(self) -> bool:
         return self.engine is not None and self.SessionLocal is not None
 
+    @property
+    def is_async(self) -> bool:
+        return self.async_engine is not None
+
     def get_db(self):
         if not self.is_configured:
             raise HTTPException(
@@ -46,10 +405,112 @@ class Database:
         finally:
             db.close()
 
-    def create_tables(self):
+    async def get_async_db(self):
+        if not self.is_async:
+            raise HTTPException(
+                status_code=503,
+                detail="Database is not configured for this deployment."
+            )
+
+        async with self.AsyncSessionLocal() as session:
+            yield session
+
+    # ---------------------------
+    # Read routing
+    # ---------------------------
+    def reads_pinned(self, request: Optional[Request]) -> bool:
+        if request is None:
+            return False
+        if request.headers.get("x-read-consistency", "").lower() == "strong":
+            return True
+        key = ReadPins.key_for(request.headers.get("authorization"))
+        return (
+            self.read_pins.is_pinned(key)
+            or ReadPins.verify(key, request.headers.get(ReadPins.HEADER))
+            or ReadPins.verify(key, request.cookies.get(ReadPins.COOKIE))
+        )
+
+    def read_session(self, request: Optional[Request] = None) -> Session:
+        """
+        A session for read-only work: the next healthy replica, or the primary
+        when there are no replicas, all are down, or the caller is pinned.
+        The replica connection is taken eagerly so a dead one is detected here.
+        """
+        if len(self.replicas) and not self.reads_pinned(request):
+            for index in self.replicas.candidates():
+                session = self.replicas.session_factories[index]()
+                try:
+                    session.connection()
+                except DBAPIError:
+                    session.close()
+                    self.replicas.mark_down(index)
+                    continue
+                self.replicas.mark_served(index)
+                return session
+            self.replicas.mark_fallback()
+        return self.SessionLocal()
+
+    def get_read_db(self, request: Request):
         if not self.is_configured:
-            return
-        self.Base.metadata.create_all(bind=self.engine)
+            raise HTTPException(
+                status_code=503,
+                detail="Database is not configured for this deployment."
+            )
+
+        db = self.read_session(request)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_read_db(self, request: Request):
+        if not self.is_async:
+            raise HTTPException(
+                status_code=503,
+                detail="Database is not configured for this deployment."
+            )
+
+        session = None
+        if len(self.async_replicas) and not self.reads_pinned(request):
+            for index in self.async_replicas.candidates():
+                candidate = self.async_replicas.session_factories[index]()
+                try:
+                    await candidate.connection()
+                except DBAPIError:
+                    await candidate.close()
+                    self.async_replicas.mark_down(index)
+                    continue
+                self.async_replicas.mark_served(index)
+                session = candidate
+                break
+            else:
+                self.async_replicas.mark_fallback()
+
+        async with (session or self.AsyncSessionLocal()) as session:
+            yield session
+
+    def pool_stats(self) -> dict:
+        stats = {}
+        if self.engine is not None:
+            stats["sync"] = self.pool_telemetry.stats(self.engine.pool)
+        if len(self.replicas):
+            stats["sync_replicas"] = self.replicas.stats(lambda engine: engine.pool)
+        if self.async_engine is not None:
+            stats["async"] = self.async_pool_telemetry.stats(self.async_engine.sync_engine.pool)
+        if len(self.async_replicas):
+            stats["async_replicas"] = self.async_replicas.stats(lambda engine: engine.sync_engine.pool)
+        return stats
+
+    def collect_pool_metrics(self) -> None:
+        """metrics collector: copy every pool's telemetry into the db_pool_* series."""
+        if self.engine is not None:
+            self.pool_telemetry.collect_metrics(self.engine.pool)
+        for telemetry, engine in zip(self.replicas.telemetry, self.replicas.engines):
+            telemetry.collect_metrics(engine.pool)
+        if self.async_engine is not None:
+            self.async_pool_telemetry.collect_metrics(self.async_engine.sync_engine.pool)
+        for telemetry, engine in zip(self.async_replicas.telemetry, self.async_replicas.engines):
+            telemetry.collect_metrics(engine.sync_engine.pool)
 
 
 db = Database()
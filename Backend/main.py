@@ -1,9 +1,9 @@
-from decimal import Decimal
 import os
+import secrets
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from sqlalchemy.orm import Session
 
@@ -12,11 +12,24 @@ from auth import router as auth_router
 from blockchain_routes import router as blockchain_router
 from config import settings
 from database import db
-from models import CompanySettings, Employee, Treasury, User
-from security import SecurityService
+import metrics
+import migrations
+import profiler
+from models import Employee, User
+from security import PasswordHashPool, SecurityService
+from query_stats import QueryStatsMiddleware
+from session_routes import ReadYourWritesMiddleware
+from service import DashboardCounterService, LedgerService
 
 app = FastAPI()
 
+if db.is_async:
+    # Async mode: resolve the bearer token on the AsyncSession too, so
+    # authenticated routes never touch the sync engine or the threadpool
+    # (the role checks hold the raw staticmethod object from the class body, so key both)
+    for dependency in (SecurityService.get_current_user, vars(SecurityService)["get_current_user"]):
+        app.dependency_overrides[dependency] = SecurityService.get_current_user_async
+
 
 def get_allowed_origins() -> list[str]:
     raw_origins = settings.ALLOWED_ORIGINS or os.environ.get("ALLOWED_ORIGINS", "*")
@@ -32,21 +45,13 @@ app.add_middleware(
     allow_credentials=ALLOW_CREDENTIALS,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-DB-Queries", "X-DB-Time-ms", "X-Profile-Id", "X-Primary-Until"],
 )
-
-
-def ensure_wallet_address_column() -> None:
-    if not db.is_configured:
-        return
-
-    try:
-        from sqlalchemy import text
-
-        with db.engine.connect() as conn:
-            conn.execute(text("ALTER TABLE employees ADD COLUMN wallet_address VARCHAR(42)"))
-            conn.commit()
-    except Exception:
-        pass
+app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(profiler.ProfilerMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.REGISTRY.add_collector(db.collect_pool_metrics)
 
 
 def seed_demo_data(session: Session) -> None:
@@ -103,6 +108,7 @@ def seed_demo_data(session: Session) -> None:
                 is_streaming=True,
             )
         )
+        DashboardCounterService.apply(session, active_streams=1)
         session.commit()
         print("Test employee created")
 
@@ -115,49 +121,72 @@ def seed_demo_data(session: Session) -> None:
                 is_streaming=True,
             )
         )
+        DashboardCounterService.apply(session, active_streams=1)
         session.commit()
         print("Demo employee created")
 
 
 @app.on_event("startup")
 def startup() -> None:
+    metrics.MetricsFlusher.start()
+
     if not db.is_configured:
         print("Startup complete (database disabled: DATABASE_URL not set)")
         return
 
-    db.create_tables()
-    ensure_wallet_address_column()
-
-    session: Session = db.SessionLocal()
-    try:
-        if settings.ENABLE_DEMO_SEED:
+    # One query on the hot path; DDL runs out-of-band via `python manage.py migrate`
+    schema_problem = migrations.check(db.engine)
+    if schema_problem:
+        if not (settings.MIGRATE_ON_STARTUP or settings.APP_ENV == "development"):
+            raise RuntimeError(schema_problem)
+        migrations.migrate(db.engine)
+
+    # One-time rows and backfills are data migrations (0006+), not startup work
+    if settings.ENABLE_DEMO_SEED:
+        session: Session = db.SessionLocal()
+        try:
             seed_demo_data(session)
+        finally:
+            session.close()
 
-        if not session.query(Treasury).first():
-            session.add(
-                Treasury(
-                    total_balance=Decimal("100000.00"),
-                    onchain_balance=Decimal("50000.00"),
-                )
-            )
-            session.commit()
-            print("Treasury initialized")
-
-        if not session.query(CompanySettings).first():
-            session.add(CompanySettings(default_tax_rate=Decimal("10.00")))
-            session.commit()
-            print("Company settings initialized")
-    finally:
-        session.close()
+    LedgerService.start_compactor(db.SessionLocal, settings.LEDGER_SNAPSHOT_INTERVAL_SECONDS)
 
     print("Startup complete")
 
 
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    metrics.MetricsFlusher.stop()
+    PasswordHashPool.shutdown()
+    if db.is_async:
+        await db.async_engine.dispose()
+
+
 app.include_router(auth_router, prefix="/api")
 app.include_router(api_router, prefix="/api")
 app.include_router(blockchain_router, prefix="/api")
 
 
+async def require_metrics_reader(request: Request) -> None:
+    """/metrics takes METRICS_TOKEN as its bearer token, or else an admin's login token."""
+    authorization = request.headers.get("authorization", "")
+    if settings.METRICS_TOKEN and secrets.compare_digest(authorization, f"Bearer {settings.METRICS_TOKEN}"):
+        return
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(
+            status_code=401,
+            detail="Metrics require METRICS_TOKEN or an admin token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    await SecurityService.require_admin(await SecurityService.principal_for_token(token))
+
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_reader)])
+def prometheus_metrics():
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 FRONTPAGE_PATH = os.path.join(BASE_DIR, "frontpage", "dist")
 EMPLOYEE_PATH = os.path.join(BASE_DIR, "Frontendemployee", "dist")
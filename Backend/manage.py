@@ -0,0 +1,95 @@
+"""
+Maintenance commands for the backend database.
+
+Usage:
+    python manage.py migrate [--target N] [--status]
+    python manage.py rebuild-counters [--check]
+    python manage.py rebuild-rollups
+"""
+import argparse
+import sys
+
+from database import db
+import migrations
+import models  # noqa: F401 - registers tables on db.Base
+from service import DashboardCounterService, RollupService
+
+
+def migrate(args) -> int:
+    if args.status:
+        version = migrations.current_version(db.engine)
+        print(f"Schema version {version} (latest {migrations.LATEST_VERSION})")
+        for migration in migrations.MIGRATIONS:
+            state = "applied" if migration.version <= version else "pending"
+            print(f"  {migration.version:04d} {migration.name}: {state}")
+        return 0 if version >= migrations.LATEST_VERSION else 1
+
+    applied = migrations.migrate(db.engine, target=args.target)
+    print(f"Applied {len(applied)} migration(s); schema version {migrations.current_version(db.engine)}")
+    return 0
+
+
+def rebuild_counters(args) -> int:
+    session = db.SessionLocal()
+    try:
+        result = DashboardCounterService.rebuild(session, write=not args.check)
+    finally:
+        session.close()
+
+    if result["stored"] is None:
+        print("Dashboard counters row was missing" + ("" if args.check else "; created it"))
+        return 1 if args.check else 0
+
+    if not result["drift"]:
+        print("Dashboard counters verified: no drift")
+        return 0
+
+    for field, values in result["drift"].items():
+        print(f"{field}: stored={values['stored']} expected={values['expected']}")
+    if args.check:
+        print("Dashboard counters have drifted (run without --check to fix)")
+        return 1
+    print("Dashboard counters rebuilt")
+    return 0
+
+
+def rebuild_rollups(args) -> int:
+    session = db.SessionLocal()
+    try:
+        rows = RollupService.rebuild(session)
+    finally:
+        session.close()
+    print(f"Employee monthly rollups rebuilt ({rows} rows)")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="CorePayroll backend maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate_cmd = commands.add_parser("migrate", help="Apply pending schema migrations")
+    migrate_cmd.add_argument("--target", type=int, help="Stop after this version")
+    migrate_cmd.add_argument("--status", action="store_true", help="Show applied and pending migrations only")
+    migrate_cmd.set_defaults(func=migrate)
+
+    rebuild = commands.add_parser("rebuild-counters", help="Recompute dashboard counters from scratch and verify them")
+    rebuild.add_argument("--check", action="store_true", help="Only report drift, do not write")
+    rebuild.set_defaults(func=rebuild_counters)
+
+    rollups = commands.add_parser("rebuild-rollups", help="Recompute employee monthly rollups from transactions")
+    rollups.set_defaults(func=rebuild_rollups)
+
+    args = parser.parse_args()
+    if not db.is_configured:
+        print("DATABASE_URL is not set")
+        return 2
+    if args.func is not migrate:
+        schema_problem = migrations.check(db.engine)
+        if schema_problem:
+            print(schema_problem)
+            return 2
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
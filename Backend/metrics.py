@@ -0,0 +1,408 @@
+"""
+Prometheus text-format metrics, with no client library or push gateway.
+
+Metrics live in process-local objects registered on REGISTRY. When several
+uvicorn workers share a host, set METRICS_DIR: each worker writes its
+snapshot to `<METRICS_DIR>/<pid>-<start time>.json` every
+METRICS_FLUSH_SECONDS (and right before it serves a scrape), and `/metrics`
+on any worker sums every file it finds. The start time in the name tells a
+worker apart from a later process that reuses its pid. At scrape time the
+files of exited workers are folded into `archive.json` and removed, so
+their counters and histograms keep counting toward the totals, as
+Prometheus expects of monotonic series, without the directory growing with
+every restart; gauges only come from workers that are still alive.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, so exited workers' files are left in place
+    fcntl = None
+
+from config import settings
+from telemetry import route_template
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _add_samples(merged: Dict[Tuple[str, ...], object], samples: list) -> None:
+    """Sum snapshot `samples` ([labels, value] pairs) into `merged`."""
+    for labels, value in samples:
+        key = tuple(labels)
+        if isinstance(value, list):
+            current = merged.get(key) or [0] * len(value)
+            merged[key] = [a + b for a, b in zip(current, value)]
+        else:
+            merged[key] = merged.get(key, 0.0) + value
+
+
+_STARTED = str(int(time.time()))
+
+
+def _process_start(pid: int) -> Optional[str]:
+    """Start time of `pid` in clock ticks since boot, from /proc; None where that is unavailable."""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # The command name (field 2) may contain spaces; starttime is field 22
+    return stat[stat.rindex(b")") + 2:].split()[19].decode("ascii")
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels[n]) for n in self.labels)
+
+    def samples(self) -> Dict[Tuple[str, ...], object]:
+        with self._lock:
+            return {k: (list(v) if isinstance(v, list) else v) for k, v in self._values.items()}
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_total(self, value: float, **labels) -> None:
+        """For counters kept elsewhere (e.g. PoolTelemetry); set from a collector at scrape time."""
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """Values are [bucket counts..., +Inf count, sum]; bucket counts are not cumulative until rendered."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            values[index] += 1
+            values[-1] += value
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """`collector()` runs before every snapshot to refresh gauges read from elsewhere."""
+        self.collectors.append(collector)
+
+    def snapshot(self) -> dict:
+        for collector in self.collectors:
+            collector()
+        return {
+            m.name: {"samples": [[list(k), v] for k, v in m.samples().items()]}
+            for m in self.metrics
+        }
+
+    # -------- multi-process --------
+    ARCHIVE = "archive.json"
+
+    @staticmethod
+    def _worker_id() -> str:
+        pid = os.getpid()
+        return f"{pid}-{_process_start(pid) or _STARTED}"
+
+    def flush(self) -> None:
+        path = os.path.join(settings.METRICS_DIR, f"{self._worker_id()}.json")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _alive(worker_id: str) -> bool:
+        pid, _, started = worker_id.partition("-")
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        current = _process_start(int(pid))
+        return not (started and current and current != started)
+
+    @contextmanager
+    def _locked(self, directory: str):
+        """Serialize scrapes across workers, so two never archive the same file."""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(directory, ".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _read(directory: str) -> Dict[str, dict]:
+        files = {}
+        for name in os.listdir(directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(directory, name), encoding="utf-8") as f:
+                    files[name] = json.load(f)
+            except (OSError, ValueError):
+                continue  # a worker mid-write or a stray file
+        return files
+
+    def _archive(self, directory: str, archive: dict, files: Dict[str, dict], dead: List[str]) -> None:
+        """
+        Fold the snapshots of exited workers into ARCHIVE and delete their
+        files. ARCHIVE lists the files already folded in, so a scrape that
+        dies between writing it and deleting them cannot count them twice.
+        """
+        kinds = {m.name: m.kind for m in self.metrics}
+        merged = set(archive["merged"])
+        totals = dict(archive["snapshot"])
+        for name in dead:
+            if name in merged:
+                continue
+            for metric_name, data in files[name].items():
+                if kinds.get(metric_name, "gauge") == "gauge":
+                    continue
+                samples: Dict[Tuple[str, ...], object] = {}
+                _add_samples(samples, totals.get(metric_name, {}).get("samples", []))
+                _add_samples(samples, data.get("samples", []))
+                totals[metric_name] = {"samples": [[list(k), v] for k, v in samples.items()]}
+            merged.add(name)
+
+        path = os.path.join(directory, self.ARCHIVE)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            # Names of files already deleted need no remembering
+            json.dump({"merged": sorted(merged & files.keys()), "snapshot": totals}, f)
+        os.replace(tmp, path)
+        for name in dead:
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+    def _snapshots(self) -> List[Tuple[bool, dict]]:
+        if not settings.METRICS_DIR:
+            return [(True, self.snapshot())]
+        self.flush()
+        directory = settings.METRICS_DIR
+        with self._locked(directory):
+            files = self._read(directory)
+            archive = files.pop(self.ARCHIVE, None)
+            if not isinstance(archive, dict) or not {"merged", "snapshot"} <= archive.keys():
+                archive = {"merged": [], "snapshot": {}}
+
+            snapshots = [(False, archive["snapshot"])]
+            dead = []
+            for name, data in files.items():
+                try:
+                    alive = self._alive(name[:-5])
+                except ValueError:
+                    continue  # not a worker file
+                if not alive:
+                    dead.append(name)
+                if name not in archive["merged"]:
+                    snapshots.append((alive, data))
+
+            if dead and fcntl is not None:
+                try:
+                    self._archive(directory, archive, files, dead)
+                except OSError:
+                    pass  # the files stay, and a later scrape archives them
+        return snapshots
+
+    def render(self) -> str:
+        snapshots = self._snapshots()
+        lines = []
+        for metric in self.metrics:
+            merged: Dict[Tuple[str, ...], object] = {}
+            for alive, snapshot in snapshots:
+                if metric.kind == "gauge" and not alive:
+                    continue
+                _add_samples(merged, snapshot.get(metric.name, {}).get("samples", []))
+
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for key in sorted(merged):
+                value = merged[key]
+                if metric.kind == "histogram":
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets + (float("inf"),), value[:-1]):
+                        cumulative += count
+                        le = f'le="{_format_value(bound)}"'
+                        lines.append(f"{metric.name}_bucket{_format_labels(metric.labels, key, le)} {cumulative}")
+                    labels = _format_labels(metric.labels, key)
+                    lines.append(f"{metric.name}_sum{labels} {_format_value(value[-1])}")
+                    lines.append(f"{metric.name}_count{labels} {cumulative}")
+                else:
+                    lines.append(f"{metric.name}{_format_labels(metric.labels, key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# =====================================================
+# METRICS
+# =====================================================
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by route template and status code.", ("method", "route", "status")))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route")))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served.", ("method",)))
+
+DB_POOL_CHECKOUT_WAIT = REGISTRY.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.", ("pool",)))
+DB_POOL_CHECKOUTS = REGISTRY.register(Counter(
+    "db_pool_checkouts_total", "Successful connection checkouts.", ("pool",)))
+DB_POOL_TIMEOUTS = REGISTRY.register(Counter(
+    "db_pool_checkout_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT_SECONDS.", ("pool",)))
+DB_POOL_IN_USE = REGISTRY.register(Gauge(
+    "db_pool_connections_in_use", "Connections checked out of the pool.", ("pool",)))
+DB_POOL_IDLE = REGISTRY.register(Gauge(
+    "db_pool_connections_idle", "Connections idle in the pool.", ("pool",)))
+DB_POOL_SIZE = REGISTRY.register(Gauge(
+    "db_pool_size", "Configured pool size (excluding overflow).", ("pool",)))
+
+TREASURY_DEBITS = REGISTRY.register(Counter(
+    "treasury_debits_total", "Treasury debit attempts by outcome (counted before the caller commits).",
+    ("outcome",)))
+TREASURY_DEBITED = REGISTRY.register(Counter(
+    "treasury_debited_cents_total", "Cents taken out of the treasury by successful debits."))
+
+
+# =====================================================
+# MIDDLEWARE / FLUSHER
+# =====================================================
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, status and in-flight requests per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = {"code": 500}
+
+        async def send_recording(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc(method=method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_recording)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.dec(method=method)
+            # Templates, never raw paths, so label cardinality stays bounded
+            route_label = route_template(scope) or "(unmatched)"
+            HTTP_LATENCY.observe(elapsed, method=method, route=route_label)
+            HTTP_REQUESTS.inc(method=method, route=route_label, status=str(status["code"]))
+
+
+class MetricsFlusher:
+    _thread: Optional[threading.Thread] = None
+    _stop = threading.Event()
+
+    @classmethod
+    def start(cls) -> None:
+        if not settings.METRICS_DIR or cls._thread is not None:
+            return
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        cls._stop.clear()
+
+        def loop():
+            while not cls._stop.wait(settings.METRICS_FLUSH_SECONDS):
+                try:
+                    REGISTRY.flush()
+                except OSError:
+                    pass
+
+        cls._thread = threading.Thread(target=loop, name="metrics-flush", daemon=True)
+        cls._thread.start()
+
+    @classmethod
+    def stop(cls) -> None:
+        if cls._thread is None:
+            return
+        cls._stop.set()
+        cls._thread = None
+        try:
+            REGISTRY.flush()
+        except OSError:
+            pass
@@ -0,0 +1,404 @@
+"""
+Versioned schema migrations.
+
+Applied versions are recorded in `schema_migrations`. Startup only runs
+`SELECT MAX(version)` against it (see `check`); the migrations themselves
+run out-of-band via `python manage.py migrate`.
+
+0001 is the schema as `create_all` built it on boot before migrations
+existed, frozen below as Core tables so later edits to models.py never
+change what it creates. It skips tables that already exist, so it adopts
+pre-existing databases. Every later migration checks before it changes
+anything, because those databases may already have the column or index.
+Index migrations use `create_index_online`, which builds with CREATE INDEX
+CONCURRENTLY on PostgreSQL and an in-place, non-locking ALTER on MySQL, so
+they can run against a live database.
+
+Data migrations (the one-time rows and backfills startup used to do) go
+through the same frozen tables and touch only columns that exist at their
+version, never the ORM models or services.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Callable, List, Optional
+
+from sqlalchemy import (
+    Boolean, Column, DateTime, ForeignKey, Index, Integer, MetaData, Numeric, String, Table, Text,
+    func, insert, inspect, select, text,
+)
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(200), nullable=False),
+    Column("applied_at", DateTime, default=datetime.utcnow),
+)
+
+# Arbitrary key for pg_advisory_lock so two migrators never interleave
+ADVISORY_LOCK_KEY = 7310452
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable[[Connection], None]
+    # False for steps that cannot run inside a transaction (CREATE INDEX CONCURRENTLY);
+    # they get an autocommit connection and must be safe to re-run.
+    transactional: bool = True
+
+
+# =====================================================
+# BASELINE SCHEMA (frozen at 0001; never edit, add a migration instead)
+# =====================================================
+baseline = MetaData()
+
+employees = Table(
+    "employees", baseline,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String(100), nullable=False),
+    Column("email", String(150), unique=True, nullable=False),
+    Column("role", String(50)),
+    Column("is_streaming", Boolean),
+    Column("use_custom_tax", Boolean),
+    Column("custom_tax_rate", Numeric(5, 2)),
+)
+
+transactions = Table(
+    "transactions", baseline,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("amount", Numeric(12, 2), nullable=False),
+    Column("tax_amount", Numeric(12, 2)),
+    Column("description", String(255)),
+    Column("timestamp", DateTime),
+    Column("employee_id", Integer, ForeignKey("employees.id")),
+)
+
+Table(
+    "bonuses", baseline,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("employee_id", Integer, ForeignKey("employees.id")),
+    Column("amount", Numeric(12, 2), nullable=False),
+    Column("reason", String(255)),
+    Column("tx_hash", String(255)),
+    Column("created_at", DateTime),
+)
+
+company_settings = Table(
+    "company_settings", baseline,
+    Column("id", Integer, primary_key=True),
+    Column("default_tax_rate", Numeric(5, 2)),
+)
+
+Table(
+    "tax_slabs", baseline,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("min_income", Numeric(14, 2), nullable=False),
+    Column("max_income", Numeric(14, 2)),
+    Column("tax_rate", Numeric(5, 2), nullable=False),
+)
+
+treasury = Table(
+    "treasury", baseline,
+    Column("id", Integer, primary_key=True),
+    Column("total_balance", Numeric(14, 2)),
+    Column("onchain_balance", Numeric(14, 2)),
+    Column("last_tx_hash", String(255)),
+    Column("last_synced_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+dashboard_counters = Table(
+    "dashboard_counters", baseline,
+    Column("id", Integer, primary_key=True),
+    Column("total_paid_net", Numeric(16, 2), nullable=False),
+    Column("total_tax_collected", Numeric(16, 2), nullable=False),
+    Column("transaction_count", Integer, nullable=False),
+    Column("active_streams", Integer, nullable=False),
+    Column("updated_at", DateTime),
+)
+
+employee_monthly_rollups = Table(
+    "employee_monthly_rollups", baseline,
+    Column("employee_id", Integer, ForeignKey("employees.id", ondelete="CASCADE"), primary_key=True),
+    Column("month", String(7), primary_key=True),
+    Column("net", Numeric(16, 2), nullable=False),
+    Column("tax", Numeric(16, 2), nullable=False),
+    Column("count", Integer, nullable=False),
+    Index("ix_employee_monthly_rollups_month", "month"),
+    Index("ix_employee_monthly_rollups_net", "net"),
+)
+
+ledger_entries = Table(
+    "ledger_entries", baseline,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("entry_type", String(30), nullable=False),
+    Column("debit_account", String(50), nullable=False),
+    Column("credit_account", String(50), nullable=False),
+    Column("amount", Numeric(14, 2), nullable=False),
+    Column("employee_id", Integer, index=True),
+    Column("description", String(255)),
+    Column("created_at", DateTime, index=True),
+)
+
+treasury_snapshots = Table(
+    "treasury_snapshots", baseline,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("last_entry_id", Integer, nullable=False),
+    Column("balance", Numeric(14, 2), nullable=False),
+    Column("as_of", DateTime, index=True),
+    Column("created_at", DateTime),
+)
+
+Table(
+    "idempotency_keys", baseline,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("key", String(64), unique=True, index=True, nullable=False),
+    Column("fingerprint", String(64), nullable=False),
+    Column("status_code", Integer),
+    Column("response_body", Text),
+    Column("created_at", DateTime),
+    Column("expires_at", DateTime, nullable=False, index=True),
+)
+
+Table(
+    "blockchain_transactions", baseline,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("tx_hash", String(255), unique=True, index=True, nullable=False),
+    Column("tx_type", String(50), nullable=False),
+    Column("status", String(30)),
+    Column("created_at", DateTime),
+)
+
+Table(
+    "users", baseline,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("email", String(150), unique=True, index=True, nullable=False),
+    Column("hashed_password", String(255), nullable=False),
+    Column("role", String(50)),
+)
+
+
+# =====================================================
+# HELPERS
+# =====================================================
+
+def has_column(conn: Connection, table: str, column: str) -> bool:
+    return column in {c["name"] for c in inspect(conn).get_columns(table)}
+
+
+def has_index(conn: Connection, table: str, name: str) -> bool:
+    return name in {i["name"] for i in inspect(conn).get_indexes(table)}
+
+
+def add_column(conn: Connection, table: str, column: str, ddl: str) -> None:
+    if not has_column(conn, table, column):
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def create_index_online(conn: Connection, name: str, table: str, columns: List[str], unique: bool = False) -> None:
+    """Build an index without blocking writes where the database supports it."""
+    dialect = conn.dialect.name
+    cols = ", ".join(columns)
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+
+    if dialect == "postgresql":
+        # A failed CONCURRENTLY build leaves an INVALID index behind; drop it and retry
+        invalid = conn.execute(text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ), {"name": name}).first()
+        if invalid:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        conn.execute(text(f"CREATE {kind} CONCURRENTLY IF NOT EXISTS {name} ON {table} ({cols})"))
+    elif dialect == "mysql":
+        if not has_index(conn, table, name):
+            conn.execute(text(f"ALTER TABLE {table} ADD {kind} {name} ({cols}), ALGORITHM=INPLACE, LOCK=NONE"))
+    else:
+        conn.execute(text(f"CREATE {kind} IF NOT EXISTS {name} ON {table} ({cols})"))
+
+
+# =====================================================
+# MIGRATIONS
+# =====================================================
+
+def _baseline(conn: Connection) -> None:
+    baseline.create_all(bind=conn)
+
+
+def _employee_wallet_address(conn: Connection) -> None:
+    add_column(conn, "employees", "wallet_address", "VARCHAR(42)")
+
+
+def _company_settings_config_version(conn: Connection) -> None:
+    add_column(conn, "company_settings", "config_version", "INTEGER DEFAULT 1")
+
+
+def _dashboard_counters_data_version(conn: Connection) -> None:
+    add_column(conn, "dashboard_counters", "data_version", "INTEGER DEFAULT 0")
+
+
+def _transactions_keyset_index(conn: Connection) -> None:
+    create_index_online(conn, "ix_transactions_employee_timestamp_id", "transactions",
+                        ["employee_id", "timestamp", "id"])
+
+
+def _treasury_and_company_settings_rows(conn: Connection) -> None:
+    now = datetime.utcnow()
+    if conn.execute(select(treasury.c.id).limit(1)).first() is None:
+        conn.execute(insert(treasury).values(
+            total_balance=Decimal("100000.00"), onchain_balance=Decimal("50000.00"), updated_at=now,
+        ))
+    if conn.execute(select(company_settings.c.id).limit(1)).first() is None:
+        conn.execute(insert(company_settings).values(default_tax_rate=Decimal("10.00")))
+
+
+def _ledger_opening_snapshot(conn: Connection) -> None:
+    # Anchor the ledger to the treasury balance recorded before it existed
+    if conn.execute(select(treasury_snapshots.c.id).limit(1)).first() is not None:
+        return
+    balance = conn.execute(select(treasury.c.total_balance).order_by(treasury.c.id).limit(1)).scalar()
+    now = datetime.utcnow()
+    conn.execute(insert(treasury_snapshots).values(
+        last_entry_id=conn.execute(select(func.max(ledger_entries.c.id))).scalar() or 0,
+        balance=balance or Decimal("0.00"),
+        as_of=now,
+        created_at=now,
+    ))
+
+
+def _dashboard_counters_row(conn: Connection) -> None:
+    if conn.execute(select(dashboard_counters.c.id).limit(1)).first() is not None:
+        return
+    net, tax, count = conn.execute(select(
+        func.coalesce(func.sum(transactions.c.amount), 0),
+        func.coalesce(func.sum(transactions.c.tax_amount), 0),
+        func.count(transactions.c.id),
+    )).one()
+    active = conn.execute(
+        select(func.count(employees.c.id)).where(employees.c.is_streaming == True)  # noqa: E712
+    ).scalar()
+    conn.execute(insert(dashboard_counters).values(
+        id=1, total_paid_net=net, total_tax_collected=tax, transaction_count=count,
+        active_streams=active or 0, updated_at=datetime.utcnow(),
+    ))
+
+
+def _month(conn: Connection, column):
+    dialect = conn.dialect.name
+    if dialect in ("mysql", "mariadb"):
+        return func.date_format(column, "%Y-%m")
+    if dialect == "postgresql":
+        return func.to_char(column, "YYYY-MM")
+    return func.strftime("%Y-%m", column)
+
+
+def _employee_monthly_rollups_backfill(conn: Connection) -> None:
+    if conn.execute(select(employee_monthly_rollups.c.employee_id).limit(1)).first() is not None:
+        return
+    month = func.coalesce(_month(conn, transactions.c.timestamp), "0000-00")
+    conn.execute(insert(employee_monthly_rollups).from_select(
+        ["employee_id", "month", "net", "tax", "count"],
+        select(
+            transactions.c.employee_id,
+            month,
+            func.coalesce(func.sum(transactions.c.amount), 0),
+            func.coalesce(func.sum(transactions.c.tax_amount), 0),
+            func.count(transactions.c.id),
+        )
+        .where(transactions.c.employee_id.isnot(None))
+        .group_by(transactions.c.employee_id, month),
+    ))
+
+
+def _idempotency_keys_locked_until(conn: Connection) -> None:
+    add_column(conn, "idempotency_keys", "locked_until", DateTime().compile(dialect=conn.dialect))
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline schema", _baseline),
+    Migration(2, "employees.wallet_address", _employee_wallet_address),
+    Migration(3, "company_settings.config_version", _company_settings_config_version),
+    Migration(4, "dashboard_counters.data_version", _dashboard_counters_data_version),
+    Migration(5, "transactions (employee_id, timestamp, id) index", _transactions_keyset_index, transactional=False),
+    Migration(6, "treasury and company settings rows", _treasury_and_company_settings_rows),
+    Migration(7, "ledger opening snapshot", _ledger_opening_snapshot),
+    Migration(8, "dashboard counters row", _dashboard_counters_row),
+    Migration(9, "employee monthly rollups backfill", _employee_monthly_rollups_backfill),
+    Migration(10, "idempotency_keys.locked_until", _idempotency_keys_locked_until),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+# =====================================================
+# RUNNER
+# =====================================================
+
+def current_version(engine: Engine) -> int:
+    """The one startup query. A database without schema_migrations is version 0."""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(func.max(schema_migrations.c.version))).scalar() or 0
+    except DBAPIError:
+        return 0
+
+
+def check(engine: Engine) -> Optional[str]:
+    """None when the schema is current, otherwise a message saying what to run."""
+    version = current_version(engine)
+    if version >= LATEST_VERSION:
+        return None
+    return (
+        f"Database schema is at version {version}, this code needs {LATEST_VERSION}. "
+        "Run `python manage.py migrate`."
+    )
+
+
+def pending(engine: Engine) -> List[Migration]:
+    version = current_version(engine)
+    return [m for m in MIGRATIONS if m.version > version]
+
+
+def _record(conn: Connection, migration: Migration) -> None:
+    conn.execute(schema_migrations.insert().values(
+        version=migration.version, name=migration.name, applied_at=datetime.utcnow(),
+    ))
+
+
+def migrate(engine: Engine, target: Optional[int] = None, log: Callable[[str], None] = print) -> List[Migration]:
+    """Apply every pending migration up to `target` (default: latest), in order."""
+    metadata.create_all(bind=engine)
+
+    lock_conn = None
+    if engine.dialect.name == "postgresql":
+        lock_conn = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+
+    applied = []
+    try:
+        for migration in pending(engine):
+            if target is not None and migration.version > target:
+                break
+            log(f"Applying {migration.version:04d} {migration.name}")
+            if migration.transactional:
+                with engine.begin() as conn:
+                    migration.upgrade(conn)
+                    _record(conn, migration)
+            else:
+                with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                    migration.upgrade(conn)
+                with engine.begin() as conn:
+                    _record(conn, migration)
+            applied.append(migration)
+    finally:
+        if lock_conn is not None:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+            lock_conn.close()
+    return applied
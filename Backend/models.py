@@ -5,7 +5,9 @@ from sqlalchemy import (
     Numeric,
     ForeignKey,
     DateTime,
-    Boolean
+    Boolean,
+    Text,
+    Index
 )
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -67,6 +69,11 @@ class Transaction(Base):
     employee_id = Column(Integer, ForeignKey("employees.id"))
     employee = relationship("Employee", back_populates="transactions")
 
+    __table_args__ = (
+        # Serves keyset pagination of an employee's history, newest first
+        Index("ix_transactions_employee_timestamp_id", "employee_id", "timestamp", "id"),
+    )
+
     def __repr__(self):
         return f"<Transaction net={self.amount} tax={self.tax_amount} emp={self.employee_id}>"
 
@@ -102,6 +109,10 @@ class CompanySettings(Base):
     id = Column(Integer, primary_key=True)
     default_tax_rate = Column(Numeric(5, 2), default=10.00)
 
+    # Bumped on every tax configuration change (rate or slabs) so each
+    # worker can tell its cached copy is stale with a one-column read.
+    config_version = Column(Integer, default=1)
+
 
 # ===============================
 # TAX SLAB (Progressive Tax)
@@ -136,6 +147,104 @@ class Treasury(Base):
     )
 
 
+# ===============================
+# DASHBOARD COUNTERS (Single summary row)
+# ===============================
+class DashboardCounters(Base):
+    __tablename__ = "dashboard_counters"
+
+    id = Column(Integer, primary_key=True)
+
+    total_paid_net = Column(Numeric(16, 2), nullable=False, default=0)
+    total_tax_collected = Column(Numeric(16, 2), nullable=False, default=0)
+    transaction_count = Column(Integer, nullable=False, default=0)
+    active_streams = Column(Integer, nullable=False, default=0)
+
+    # Bumped on every change to the dashboard's underlying data; used as the overview ETag
+    data_version = Column(Integer, default=0)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# ===============================
+# EMPLOYEE MONTHLY ROLLUP (Pre-aggregated payouts)
+# ===============================
+class EmployeeMonthlyRollup(Base):
+    __tablename__ = "employee_monthly_rollups"
+
+    employee_id = Column(Integer, ForeignKey("employees.id", ondelete="CASCADE"), primary_key=True)
+    month = Column(String(7), primary_key=True)  # "YYYY-MM"
+
+    net = Column(Numeric(16, 2), nullable=False, default=0)
+    tax = Column(Numeric(16, 2), nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_employee_monthly_rollups_month", "month"),
+        Index("ix_employee_monthly_rollups_net", "net"),
+    )
+
+
+# ===============================
+# TREASURY LEDGER (Append-only, double-entry)
+# ===============================
+class LedgerEntry(Base):
+    __tablename__ = "ledger_entries"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    entry_type = Column(String(30), nullable=False)       # deposit / withdrawal / salary / bonus
+    debit_account = Column(String(50), nullable=False)
+    credit_account = Column(String(50), nullable=False)
+    amount = Column(Numeric(14, 2), nullable=False)
+
+    # Plain column, not a foreign key: ledger rows outlive deleted employees.
+    employee_id = Column(Integer, nullable=True, index=True)
+    description = Column(String(255), nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f"<LedgerEntry {self.entry_type} {self.amount} dr={self.debit_account} cr={self.credit_account}>"
+
+
+class TreasurySnapshot(Base):
+    __tablename__ = "treasury_snapshots"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Treasury balance after applying every ledger entry up to last_entry_id
+    last_entry_id = Column(Integer, nullable=False, default=0)
+    balance = Column(Numeric(14, 2), nullable=False)
+
+    as_of = Column(DateTime, default=datetime.utcnow, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+# ===============================
+# IDEMPOTENCY KEYS (Safe retries for payout POSTs)
+# ===============================
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # sha256 of "<user>:<Idempotency-Key header>"
+    key = Column(String(64), unique=True, index=True, nullable=False)
+    fingerprint = Column(String(64), nullable=False)
+
+    # NULL while the first request holding the key is still running
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+
+    # Lease of the request running under the key; once it passes, a retry
+    # may take the key over (the holder likely died before finishing)
+    locked_until = Column(DateTime, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
 # ===============================
 # BLOCKCHAIN TRANSACTION LOG
 # ===============================
@@ -0,0 +1,131 @@
+"""
+Integer minor-unit money for the payroll path.
+
+Amounts travel from the request schemas through the services as whole cents
+and only become `Decimal` at the `Numeric` column boundary. Tax rates are
+carried as integer basis points (10.00% -> 1000), so tax is an integer
+multiply plus a half-up rounding division, with no float round-trips.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+from typing import List
+
+from pydantic_core import core_schema
+
+CENT = Decimal("0.01")
+BP_SCALE = 10000  # basis points in 100%
+
+
+def _round_div(numerator: int, denominator: int) -> int:
+    """Integer division rounding half away from zero."""
+    if numerator >= 0:
+        return (numerator + denominator // 2) // denominator
+    return -((-numerator + denominator // 2) // denominator)
+
+
+def rate_to_bp(rate) -> int:
+    """Percentage (e.g. Decimal("12.5")) to integer basis points (1250)."""
+    if isinstance(rate, int):
+        return rate * 100
+    if not isinstance(rate, Decimal):
+        rate = Decimal(str(rate))
+    return int((rate * 100).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+class Money:
+    __slots__ = ("cents",)
+
+    def __init__(self, cents: int = 0):
+        self.cents = cents
+
+    @classmethod
+    def from_decimal(cls, value) -> "Money":
+        """
+        Whole cents of `value`, rounded half-up. Request input never gets
+        here with sub-cent digits (the schema rejects them); the rounding is
+        for database aggregates that come back as inexact floats.
+        """
+        if isinstance(value, Money):
+            return value
+        if isinstance(value, int):
+            return cls(value * 100)
+        if not isinstance(value, Decimal):
+            value = Decimal(str(value))
+        return cls(int(value.quantize(CENT, rounding=ROUND_HALF_UP).scaleb(2)))
+
+    def to_decimal(self) -> Decimal:
+        return Decimal(self.cents).scaleb(-2)
+
+    def tax(self, rate_bp: int) -> "Money":
+        return Money(_round_div(self.cents * rate_bp, BP_SCALE))
+
+    def __add__(self, other: "Money") -> "Money":
+        return Money(self.cents + other.cents)
+
+    def __sub__(self, other: "Money") -> "Money":
+        return Money(self.cents - other.cents)
+
+    def __neg__(self) -> "Money":
+        return Money(-self.cents)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Money) and self.cents == other.cents
+
+    def __lt__(self, other: "Money") -> bool:
+        return self.cents < other.cents
+
+    def __le__(self, other: "Money") -> bool:
+        return self.cents <= other.cents
+
+    def __gt__(self, other: "Money") -> bool:
+        return self.cents > other.cents
+
+    def __ge__(self, other: "Money") -> bool:
+        return self.cents >= other.cents
+
+    def __hash__(self) -> int:
+        return hash(self.cents)
+
+    def __float__(self) -> float:
+        return self.cents / 100
+
+    def __str__(self) -> str:
+        return str(self.to_decimal())
+
+    def __repr__(self) -> str:
+        return f"Money('{self}')"
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source_type, handler):
+        # Accept anything a Decimal field with at most 2 decimal places accepts (or a Money),
+        # so sub-cent input is a 422 rather than silently rounded; serialize back as a Decimal
+        from_decimal = core_schema.no_info_after_validator_function(
+            cls.from_decimal, core_schema.decimal_schema(decimal_places=2),
+        )
+        return core_schema.json_or_python_schema(
+            json_schema=from_decimal,
+            python_schema=core_schema.no_info_wrap_validator_function(
+                lambda value, validate: value if isinstance(value, cls) else validate(value), from_decimal,
+            ),
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                lambda m: m.to_decimal(),
+                return_schema=core_schema.decimal_schema(),
+            ),
+        )
+
+
+# =====================================================
+# BATCH OPERATIONS
+# =====================================================
+
+def tax_batch(gross_cents: List[int], rate_bp: int) -> List[int]:
+    """Flat-rate tax in cents for a whole list of gross amounts in cents."""
+    half = BP_SCALE // 2
+    return [
+        (g * rate_bp + half) // BP_SCALE if g >= 0 else _round_div(g * rate_bp, BP_SCALE)
+        for g in gross_cents
+    ]
+
+
+def net_batch(gross_cents: List[int], tax_cents: List[int]) -> List[int]:
+    return [g - t for g, t in zip(gross_cents, tax_cents)]
+
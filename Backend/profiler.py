@@ -0,0 +1,437 @@
+"""
+On-demand stack-sampling profiler for individual requests.
+
+A request is profiled when it carries a valid `X-Profile` header (a
+short-lived token signed with SECRET_KEY, minted by an admin through
+POST /api/admin/profiles/token) or when it falls in PROFILE_SAMPLE_RATE.
+At most PROFILE_MAX_CONCURRENT requests are profiled at once; the rest run
+normally. Unprofiled requests pay one header scan and one ContextVar read
+per SQL statement.
+
+While a profile is active, one sampler thread reads `sys._current_frames()`
+every PROFILE_INTERVAL_MS and records the stacks of:
+
+* the event loop thread, but only while it is running the request's own
+  asyncio task (or is suspended inside one of its SQL statements);
+* threadpool threads while they run the request's handler (SessionRoute
+  calls `track_thread` around sync handlers).
+
+SQL executed for the request shows up twice: as a synthetic `[sql] ...`
+leaf frame on samples taken mid-statement, so Python and database time
+share one flamegraph, and as an evented "SQL" timeline in the speedscope
+export. Profiles are kept in memory (PROFILE_KEEP), or in PROFILE_DIR so
+every worker can serve every profile.
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from config import settings
+import query_stats
+from telemetry import route_template
+
+PROFILE_HEADER = b"x-profile"
+MAX_STACK_DEPTH = 128
+
+try:
+    from asyncio.tasks import _current_tasks  # loop -> running task; read-only use
+except ImportError:  # pragma: no cover - other interpreters
+    _current_tasks = None
+
+
+# =====================================================
+# SIGNED TRIGGER TOKENS
+# =====================================================
+def _signature(expires: int) -> str:
+    return hmac.new(settings.SECRET_KEY.encode("utf-8"), f"profile:{expires}".encode("ascii"), hashlib.sha256).hexdigest()
+
+
+def issue_token(ttl_seconds: int) -> Tuple[str, int]:
+    expires = int(time.time()) + max(1, min(ttl_seconds, settings.PROFILE_TOKEN_MAX_TTL_SECONDS))
+    return f"{expires}.{_signature(expires)}", expires
+
+
+def verify_token(token: str) -> bool:
+    expires, _, signature = token.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature, _signature(int(expires)))
+
+
+# =====================================================
+# PROFILE
+# =====================================================
+def _frame_name(code) -> str:
+    path = code.co_filename.replace("\\", "/").rsplit("/", 2)
+    return f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _collapse(frame) -> List[str]:
+    stack = []
+    while frame is not None and len(stack) < MAX_STACK_DEPTH:
+        stack.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+class Profile:
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.route: Optional[str] = None
+        self.started_at = datetime.utcnow()
+        self.started = time.perf_counter()
+        self.duration_ms = 0.0
+        self.interval_ms = settings.PROFILE_INTERVAL_MS
+
+        try:
+            self.loop = asyncio.get_running_loop()
+            self.task = asyncio.current_task()
+        except RuntimeError:
+            self.loop = self.task = None
+        self.loop_thread = threading.get_ident()
+
+        self._lock = threading.Lock()
+        self._threads: Dict[int, int] = {}  # thread id -> nesting depth
+        self._in_sql: Dict[int, Tuple[str, float]] = {}  # thread id -> (fingerprint, started ms)
+        self.samples: Counter = Counter()  # collapsed stack -> sample count
+        self.sql: List[list] = []  # [start_ms, duration_ms, fingerprint]
+
+    def _now_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    # -------- threads and SQL, called from the request's own threads --------
+    def enter_thread(self, thread_id: int) -> None:
+        with self._lock:
+            self._threads[thread_id] = self._threads.get(thread_id, 0) + 1
+
+    def exit_thread(self, thread_id: int) -> None:
+        with self._lock:
+            depth = self._threads.get(thread_id, 0) - 1
+            if depth > 0:
+                self._threads[thread_id] = depth
+            else:
+                self._threads.pop(thread_id, None)
+
+    def sql_begin(self, thread_id: int, statement: str) -> None:
+        with self._lock:
+            self._in_sql[thread_id] = (query_stats.fingerprint(statement), self._now_ms())
+
+    def sql_end(self, thread_id: int) -> None:
+        with self._lock:
+            entry = self._in_sql.pop(thread_id, None)
+            if entry is not None:
+                text, started_ms = entry
+                self.sql.append([round(started_ms, 3), round(self._now_ms() - started_ms, 3), text])
+
+    # -------- sampler thread --------
+    def sample(self, frames: dict) -> None:
+        with self._lock:
+            threads = list(self._threads)
+            in_sql = dict(self._in_sql)
+
+        stacks = []
+        loop_frame = frames.get(self.loop_thread)
+        if loop_frame is not None and self.loop_thread not in threads:
+            running = _current_tasks.get(self.loop) if _current_tasks is not None else self.task
+            if running is self.task:
+                stacks.append((self.loop_thread, _collapse(loop_frame)))
+            elif self.loop_thread in in_sql:
+                # Suspended on an async driver: charge the wait to the statement
+                stacks.append((self.loop_thread, ["(awaiting database)"]))
+        for thread_id in threads:
+            frame = frames.get(thread_id)
+            if frame is not None:
+                stacks.append((thread_id, _collapse(frame)))
+
+        with self._lock:
+            for thread_id, stack in stacks:
+                if thread_id in in_sql:
+                    stack.append(f"[sql] {in_sql[thread_id][0][:200]}".replace(";", ":"))
+                self.samples[";".join(stack)] += 1
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            samples, sql = dict(self.samples), list(self.sql)
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration_ms, 3),
+            "interval_ms": self.interval_ms,
+            "samples": samples,
+            "sql": sql,
+        }
+
+
+_current: ContextVar[Optional[Profile]] = ContextVar("profile", default=None)
+
+
+@contextmanager
+def track_thread():
+    """Sample the calling thread for the current request's profile, if it has one."""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    thread_id = threading.get_ident()
+    profile.enter_thread(thread_id)
+    try:
+        yield
+    finally:
+        profile.exit_thread(thread_id)
+
+
+def attach(engine) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        profile = _current.get()
+        if profile is not None:
+            profile.sql_begin(threading.get_ident(), statement)
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        profile = _current.get()
+        if profile is not None:
+            profile.sql_end(threading.get_ident())
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        profile = _current.get()
+        if profile is not None:
+            profile.sql_end(threading.get_ident())
+
+
+# =====================================================
+# SAMPLER
+# =====================================================
+class Sampler:
+    _active: List[Profile] = []
+    _lock = threading.Lock()
+    _wakeup = threading.Event()
+    _thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def start(cls, profile: Profile) -> bool:
+        with cls._lock:
+            if len(cls._active) >= settings.PROFILE_MAX_CONCURRENT:
+                return False
+            cls._active.append(profile)
+            if cls._thread is None or not cls._thread.is_alive():
+                cls._thread = threading.Thread(target=cls._run, name="request-profiler", daemon=True)
+                cls._thread.start()
+        cls._wakeup.set()
+        return True
+
+    @classmethod
+    def stop(cls, profile: Profile) -> None:
+        with cls._lock:
+            if profile in cls._active:
+                cls._active.remove(profile)
+
+    @classmethod
+    def _run(cls) -> None:
+        while True:
+            with cls._lock:
+                active = list(cls._active)
+                if not active:
+                    cls._wakeup.clear()
+            if not active:
+                cls._wakeup.wait()
+                continue
+            frames = sys._current_frames()
+            for profile in active:
+                profile.sample(frames)
+            del frames
+            time.sleep(settings.PROFILE_INTERVAL_MS / 1000)
+
+
+# =====================================================
+# STORAGE AND EXPORT
+# =====================================================
+class ProfileStore:
+    """Finished profiles: the last PROFILE_KEEP in memory, or as files in PROFILE_DIR when set."""
+
+    _memory: "OrderedDict[str, dict]" = OrderedDict()
+    _lock = threading.Lock()
+
+    @classmethod
+    def save(cls, data: dict) -> None:
+        if settings.PROFILE_DIR:
+            os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+            path = os.path.join(settings.PROFILE_DIR, f"{data['id']}.json")
+            with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(f"{path}.tmp", path)
+            files = sorted(
+                (os.path.join(settings.PROFILE_DIR, n) for n in os.listdir(settings.PROFILE_DIR) if n.endswith(".json")),
+                key=os.path.getmtime,
+            )
+            for stale in files[:-settings.PROFILE_KEEP]:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+            return
+        with cls._lock:
+            cls._memory[data["id"]] = data
+            while len(cls._memory) > settings.PROFILE_KEEP:
+                cls._memory.popitem(last=False)
+
+    @classmethod
+    def get(cls, profile_id: str) -> Optional[dict]:
+        if settings.PROFILE_DIR:
+            if not profile_id.isalnum():
+                return None
+            try:
+                with open(os.path.join(settings.PROFILE_DIR, f"{profile_id}.json"), encoding="utf-8") as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                return None
+        with cls._lock:
+            return cls._memory.get(profile_id)
+
+    @classmethod
+    def list(cls) -> List[dict]:
+        if settings.PROFILE_DIR:
+            profiles = []
+            for name in os.listdir(settings.PROFILE_DIR) if os.path.isdir(settings.PROFILE_DIR) else []:
+                if name.endswith(".json"):
+                    profile = cls.get(name[:-5])
+                    if profile:
+                        profiles.append(profile)
+        else:
+            with cls._lock:
+                profiles = list(cls._memory.values())
+        summaries = [
+            {
+                "id": p["id"],
+                "method": p["method"],
+                "path": p["path"],
+                "route": p["route"],
+                "started_at": p["started_at"],
+                "duration_ms": p["duration_ms"],
+                "samples": sum(p["samples"].values()),
+                "sql_statements": len(p["sql"]),
+                "sql_ms": round(sum(span[1] for span in p["sql"]), 3),
+            }
+            for p in profiles
+        ]
+        summaries.sort(key=lambda s: s["started_at"], reverse=True)
+        return summaries
+
+
+def to_collapsed(profile: dict) -> str:
+    """Brendan Gregg's collapsed-stack format: `frame;frame;frame count` per line."""
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(profile["samples"].items()))
+
+
+def to_speedscope(profile: dict) -> dict:
+    frames: List[dict] = []
+    index: Dict[str, int] = {}
+
+    def frame_id(name: str) -> int:
+        if name not in index:
+            index[name] = len(frames)
+            frames.append({"name": name})
+        return index[name]
+
+    samples, weights = [], []
+    for stack, count in profile["samples"].items():
+        samples.append([frame_id(name) for name in stack.split(";")])
+        weights.append(count * profile["interval_ms"])
+
+    events = []
+    for start_ms, duration_ms, text in sorted(profile["sql"]):
+        fid = frame_id(f"[sql] {text[:200]}")
+        events.append({"type": "O", "frame": fid, "at": start_ms})
+        events.append({"type": "C", "frame": fid, "at": start_ms + duration_ms})
+
+    name = f"{profile['method']} {profile['route'] or profile['path']}"
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "paystream-profiler",
+        "shared": {"frames": frames},
+        "profiles": [
+            {
+                "type": "sampled",
+                "name": f"{name} (Python, sampled every {profile['interval_ms']} ms)",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": profile["duration_ms"],
+                "samples": samples,
+                "weights": weights,
+            },
+            {
+                "type": "evented",
+                "name": f"{name} (SQL)",
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": profile["duration_ms"],
+                "events": events,
+            },
+        ],
+    }
+
+
+# =====================================================
+# MIDDLEWARE
+# =====================================================
+class ProfilerMiddleware:
+    """Pure ASGI middleware that profiles signed-header or sampled requests and tags them with X-Profile-Id."""
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def _requested(scope) -> bool:
+        for key, value in scope["headers"]:
+            if key == PROFILE_HEADER:
+                return verify_token(value.decode("latin-1"))
+        return settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(scope["method"], scope["path"])
+        if not Sampler.start(profile):
+            await self.app(scope, receive, send)
+            return
+        token = _current.set(profile)
+
+        async def send_tagged(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile.id.encode("ascii")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_tagged)
+        finally:
+            _current.reset(token)
+            Sampler.stop(profile)
+            profile.duration_ms = profile._now_ms()
+            profile.route = route_template(scope)
+            ProfileStore.save(profile.to_dict())
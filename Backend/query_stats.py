@@ -0,0 +1,364 @@
+"""
+Per-request SQL accounting.
+
+`attach(engine)` (called for every engine Database builds) times each cursor
+execution and charges it to the request in progress, found through a
+ContextVar that QueryStatsMiddleware sets. The middleware then:
+
+* adds `X-DB-Queries` and `X-DB-Time-ms` to the response (queries issued
+  before the headers went out; a streamed body may run more afterwards),
+* folds the request into a rolling per-route summary (see RouteQueryStats),
+* checks the count against the route's `x-query-budget`, if it declares one,
+* optionally logs statements repeated often enough to look like an N+1.
+
+Independently of requests, every statement is also reduced to a fingerprint
+(literals and placeholders replaced, IN/VALUES lists collapsed) with its
+own latency histogram (see QueryFingerprints). Statements slower than
+SLOW_QUERY_MS are logged, with their EXPLAIN plan fetched on a background
+thread. The hot path is one dict lookup plus a histogram increment: the
+regex normalization only runs the first time a statement text is seen.
+
+The ContextVar holds a mutable RequestQueries, so executions on threadpool
+threads (which run in a copy of the request context) and inside
+AsyncSession.run_sync still land on the same object.
+"""
+import hashlib
+import logging
+import queue
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from sqlalchemy import event
+
+from config import settings
+from telemetry import LatencyHistogram, LatencyWindow, route_template
+
+logger = logging.getLogger(__name__)
+
+
+class RequestQueries:
+    __slots__ = ("count", "elapsed_ms", "exempt", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.elapsed_ms = 0.0
+        self.exempt = 0  # queries outside the route's budget (auth lookups)
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        self.count += 1
+        self.elapsed_ms += elapsed_ms
+        self.statements[statement] += 1
+
+    def repeated(self, threshold: int):
+        return [(statement, n) for statement, n in self.statements.most_common() if n >= threshold]
+
+
+_current: ContextVar[Optional[RequestQueries]] = ContextVar("request_queries", default=None)
+
+
+def current() -> Optional[RequestQueries]:
+    return _current.get()
+
+
+@contextmanager
+def outside_budget():
+    """Queries run inside this block still count in the headers, but not against x-query-budget."""
+    queries = _current.get()
+    before = queries.count if queries is not None else 0
+    try:
+        yield
+    finally:
+        if queries is not None:
+            queries.exempt += queries.count - before
+
+
+def attach(engine) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["query_started"].pop()) * 1000
+        if context is not None and context.execution_options.get("query_stats_skip"):
+            return
+        queries = _current.get()
+        if queries is not None:
+            queries.record(statement, elapsed_ms)
+        QueryFingerprints.record(conn, statement, parameters, executemany, elapsed_ms)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        # after_cursor_execute does not fire for a failed statement
+        stack = exception_context.connection.info.get("query_started") if exception_context.connection else None
+        if stack:
+            stack.pop()
+
+
+# =====================================================
+# STATEMENT FINGERPRINTS
+# =====================================================
+_NORMALIZE = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),                             # string literals
+    (re.compile(r"%\(\w+\)s|%s|\$\d+|(?<![:\w]):\w+"), "?"),             # driver placeholders
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),                            # numeric literals
+    (re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)"), "(?)"),                   # IN (...) / one VALUES row
+    (re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+"), "(?), ..."),                 # multi-row VALUES
+    (re.compile(r"\s+"), " "),
+]
+
+EXPLAIN_PREFIXES = {
+    "sqlite": "EXPLAIN QUERY PLAN ",
+    "postgresql": "EXPLAIN ",
+    "mysql": "EXPLAIN ",
+    "mariadb": "EXPLAIN ",
+}
+READ_STATEMENT = re.compile(r"\s*(?:SELECT|WITH)\b", re.IGNORECASE)
+
+
+def fingerprint(statement: str) -> str:
+    text = statement.strip()
+    for pattern, replacement in _NORMALIZE:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+class StatementStats:
+    __slots__ = ("id", "fingerprint", "histogram", "slow", "plan", "explained_at")
+
+    def __init__(self, text: str):
+        self.id = hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+        self.fingerprint = text
+        self.histogram = LatencyHistogram()
+        self.slow = 0
+        self.plan: Optional[list] = None
+        self.explained_at = 0.0
+
+
+class QueryFingerprints:
+    """
+    Latency histogram per statement fingerprint, for every engine attach()
+    instruments. At most QUERY_FINGERPRINTS_MAX fingerprints are tracked;
+    statements first seen after that are pooled under one "(other)" entry.
+    """
+
+    OTHER = "(other)"
+
+    _by_statement: "OrderedDict[str, StatementStats]" = OrderedDict()
+    _by_fingerprint: Dict[str, StatementStats] = {}
+    _lock = threading.Lock()
+
+    _explain_queue: "queue.Queue" = queue.Queue(maxsize=64)
+    _explainer: Optional[threading.Thread] = None
+
+    @classmethod
+    def _stats_for(cls, statement: str) -> StatementStats:
+        # Raw text -> stats; a plain lookup on the hot path, so eviction is
+        # first-in-first-out rather than LRU
+        stats = cls._by_statement.get(statement)
+        if stats is not None:
+            return stats
+        text = fingerprint(statement)
+        with cls._lock:
+            stats = cls._by_fingerprint.get(text)
+            if stats is None:
+                if len(cls._by_fingerprint) >= settings.QUERY_FINGERPRINTS_MAX:
+                    text = cls.OTHER
+                    stats = cls._by_fingerprint.get(text)
+                if stats is None:
+                    stats = cls._by_fingerprint[text] = StatementStats(text)
+            cls._by_statement[statement] = stats
+            while len(cls._by_statement) > settings.QUERY_FINGERPRINTS_MAX * 4:
+                cls._by_statement.popitem(last=False)
+        return stats
+
+    @classmethod
+    def record(cls, conn, statement: str, parameters, executemany: bool, elapsed_ms: float) -> None:
+        stats = cls._stats_for(statement)
+        stats.histogram.record(elapsed_ms)
+        if settings.SLOW_QUERY_MS <= 0 or elapsed_ms < settings.SLOW_QUERY_MS:
+            return
+
+        stats.slow += 1
+        logger.warning("Slow query %s (%.1f ms): %s", stats.id, elapsed_ms, stats.fingerprint[:500])
+        if cls._explainable(conn, statement, executemany, stats):
+            stats.explained_at = time.monotonic()
+            try:
+                cls._explain_queue.put_nowait((conn.engine, statement, parameters, stats))
+            except queue.Full:
+                return
+            cls._start_explainer()
+
+    @staticmethod
+    def _explainable(conn, statement: str, executemany: bool, stats: StatementStats) -> bool:
+        # Async drivers use their own paramstyle and cannot be driven from a
+        # plain thread; EXPLAIN is only requested for reads, and at most once
+        # per fingerprint per SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS
+        return (
+            settings.SLOW_QUERY_EXPLAIN
+            and not executemany
+            and not getattr(conn.dialect, "is_async", False)
+            and conn.dialect.name in EXPLAIN_PREFIXES
+            and READ_STATEMENT.match(statement) is not None
+            and time.monotonic() - stats.explained_at >= settings.SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS
+        )
+
+    @classmethod
+    def _start_explainer(cls) -> None:
+        with cls._lock:
+            if cls._explainer is None or not cls._explainer.is_alive():
+                cls._explainer = threading.Thread(target=cls._explain_loop, name="slow-query-explain", daemon=True)
+                cls._explainer.start()
+
+    @classmethod
+    def _explain_loop(cls) -> None:
+        while True:
+            engine, statement, parameters, stats = cls._explain_queue.get()
+            try:
+                with engine.connect().execution_options(query_stats_skip=True) as conn:
+                    rows = conn.exec_driver_sql(EXPLAIN_PREFIXES[engine.dialect.name] + statement, parameters).all()
+                stats.plan = [" | ".join(str(v) for v in row) for row in rows]
+                logger.warning("Plan for slow query %s:\n  %s", stats.id, "\n  ".join(stats.plan))
+            except Exception as exc:
+                logger.warning("EXPLAIN failed for slow query %s: %s", stats.id, exc)
+
+    @classmethod
+    def top(cls, limit: int = 20, sort: str = "total") -> dict:
+        keys = {
+            "total": lambda r: r["latency"]["total_ms"],
+            "p99": lambda r: r["latency"]["p99_ms"] or 0,
+            "max": lambda r: r["latency"]["max_ms"] or 0,
+            "count": lambda r: r["latency"]["count"],
+            "slow": lambda r: r["slow"],
+        }
+        if sort not in keys:
+            raise ValueError(f"sort must be one of {', '.join(keys)}")
+        with cls._lock:
+            entries = list(cls._by_fingerprint.values())
+        report = [
+            {
+                "id": s.id,
+                "fingerprint": s.fingerprint,
+                "latency": s.histogram.snapshot(),
+                "slow": s.slow,
+                "plan": s.plan,
+            }
+            for s in entries
+        ]
+        report.sort(key=keys[sort], reverse=True)
+        return {
+            "sort": sort,
+            "fingerprints": len(entries),
+            "slow_query_ms": settings.SLOW_QUERY_MS,
+            "statements": report[:limit],
+        }
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._by_statement.clear()
+            cls._by_fingerprint.clear()
+
+
+# =====================================================
+# PER-ROUTE SUMMARY
+# =====================================================
+class RouteSummary:
+    __slots__ = ("requests", "queries", "db_ms", "budget", "over_budget", "n_plus_one")
+
+    def __init__(self, budget: Optional[int]):
+        self.requests = 0
+        # LatencyWindow is a generic rolling percentile window; here it also holds query counts
+        self.queries = LatencyWindow(settings.QUERY_STATS_WINDOW)
+        self.db_ms = LatencyWindow(settings.QUERY_STATS_WINDOW)
+        self.budget = budget
+        self.over_budget = 0
+        self.n_plus_one = 0
+
+
+class RouteQueryStats:
+    _routes: Dict[str, RouteSummary] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def record(cls, key: str, budget: Optional[int], queries: RequestQueries) -> None:
+        with cls._lock:
+            summary = cls._routes.get(key)
+            if summary is None:
+                summary = cls._routes[key] = RouteSummary(budget)
+            summary.requests += 1
+
+            counted = queries.count - queries.exempt
+            if budget is not None and counted > budget:
+                summary.over_budget += 1
+                logger.warning("%s ran %d queries, budget is %d", key, counted, budget)
+
+            repeated = queries.repeated(settings.N_PLUS_ONE_THRESHOLD)
+            if repeated:
+                summary.n_plus_one += 1
+                if settings.LOG_N_PLUS_ONE:
+                    for statement, n in repeated:
+                        logger.warning("Possible N+1 in %s: %d x %s", key, n, " ".join(statement.split())[:300])
+        summary.queries.record(queries.count)
+        summary.db_ms.record(queries.elapsed_ms)
+
+    @classmethod
+    def stats(cls) -> dict:
+        with cls._lock:
+            routes = list(cls._routes.items())
+        out = []
+        for key, summary in routes:
+            out.append({
+                "route": key,
+                "requests": summary.requests,
+                "budget": summary.budget,
+                "over_budget": summary.over_budget,
+                "n_plus_one": summary.n_plus_one,
+                "queries": summary.queries.snapshot(),
+                "db_ms": summary.db_ms.snapshot(),
+            })
+        out.sort(key=lambda r: (r["db_ms"]["p95"] or 0), reverse=True)
+        return {"window": settings.QUERY_STATS_WINDOW, "routes": out}
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._routes.clear()
+
+
+class QueryStatsMiddleware:
+    """Pure ASGI middleware that scopes query accounting to each HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.QUERY_STATS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries()
+        token = _current.set(queries)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-db-queries", str(queries.count).encode("latin-1")),
+                    (b"x-db-time-ms", f"{queries.elapsed_ms:.2f}".encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current.reset(token)
+            route = scope.get("route")
+            if route is not None and hasattr(route, "methods"):
+                budget = (getattr(route, "openapi_extra", None) or {}).get("x-query-budget")
+                RouteQueryStats.record(f'{scope["method"]} {route_template(scope)}', budget, queries)
@@ -3,13 +3,15 @@ from datetime import datetime
 from typing import List, Optional
 from decimal import Decimal
 
+from money import Money
+
 
 # =====================================================
 # TRANSACTIONS
 # =====================================================
 
 class TransactionBase(BaseModel):
-    amount: Decimal
+    amount: Money
     description: str
 
 
@@ -33,7 +35,7 @@ class TransactionResponse(BaseModel):
 # =====================================================
 
 class BonusCreate(BaseModel):
-    amount: Decimal
+    amount: Money
     reason: str
 
 
@@ -47,12 +49,68 @@ class BonusResponse(BaseModel):
     model_config = {"from_attributes": True}
 
 
+# =====================================================
+# PAYROLL RUN (Bulk salary)
+# =====================================================
+
+PAYROLL_RUN_MAX_ITEMS = 1000  # keeps one run (a single transaction) bounded
+
+
+class PayrollRunItem(BaseModel):
+    employee_id: int
+    amount: Money
+
+
+class PayrollRunCreate(BaseModel):
+    description: str
+    items: List[PayrollRunItem] = Field(max_length=PAYROLL_RUN_MAX_ITEMS)
+
+
+class PayrollRunResult(BaseModel):
+    employee_id: int
+    status: str  # "paid" or "skipped"
+    gross_amount: Money
+    amount: Optional[Money] = None
+    tax_amount: Optional[Money] = None
+    detail: Optional[str] = None
+
+
+class PayrollRunResponse(BaseModel):
+    paid_count: int
+    skipped_count: int
+    total_net: Money
+    total_tax: Money
+    results: List[PayrollRunResult]
+
+
+# =====================================================
+# BULK STREAM ACTION
+# =====================================================
+
+class StreamBulkFilter(BaseModel):
+    role: Optional[str] = None  # at least one field must be set; use `all` to match everyone
+
+
+class StreamBulkAction(BaseModel):
+    action: str  # "start", "pause" or "cancel"
+    employee_ids: Optional[List[int]] = None
+    filter: Optional[StreamBulkFilter] = None
+    all: bool = False  # every employee; must be explicit so a missing filter never means "all"
+
+
+class StreamBulkResponse(BaseModel):
+    action: str
+    affected_count: int
+    affected_ids: List[int]
+    not_found_ids: List[int] = Field(default_factory=list)
+
+
 # =====================================================
 # TREASURY ACTION
 # =====================================================
 
 class TreasuryAction(BaseModel):
-    amount: Decimal
+    amount: Money
 
 
 # =====================================================
@@ -76,11 +134,25 @@ class EmployeeResponse(BaseModel):
     use_custom_tax: bool = False
     custom_tax_rate: Optional[Decimal] = None
 
-    transactions: List[TransactionResponse] = Field(default_factory=list)
-
+    # No embedded history: page it through GET /employees/{id}/transactions
     model_config = {"from_attributes": True}
 
 
+class EmployeeImportResult(BaseModel):
+    row: int  # 1-based position in the uploaded file or array
+    email: Optional[str] = None
+    status: str  # "created" or "error"
+    detail: Optional[str] = None
+
+
+class EmployeeImportResponse(BaseModel):
+    created_count: int
+    error_count: int
+    elapsed_ms: float
+    rows_per_second: float
+    results: List[EmployeeImportResult]
+
+
 # =====================================================
 # EMPLOYEE TAX UPDATE
 # =====================================================
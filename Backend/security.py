@@ -3,12 +3,125 @@ from jose import jwt, JWTError
 from datetime import datetime, timedelta, timezone
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
 from database import db
 from models import User
 from config import settings
+from telemetry import LatencyWindow
+import query_stats
+import asyncio
+import hashlib
+import logging
+import multiprocessing
 import os
 import secrets
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class UserPrincipal:
+    """
+    The authenticated caller: just the columns routes read off `current_user`.
+    Plain object, so it can outlive the request session and be cached.
+    """
+    __slots__ = ("id", "email", "role")
+
+    def __init__(self, id: int, email: str, role: str):
+        self.id = id
+        self.email = email
+        self.role = role
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserPrincipal":
+        return cls(user.id, user.email, user.role)
+
+    def __repr__(self):
+        return f"<UserPrincipal {self.email}>"
+
+
+class PrincipalCache:
+    """
+    Bounded LRU of token digest -> (UserPrincipal, expires_at).
+
+    Entries live for AUTH_CACHE_TTL_SECONDS, never past the token's own
+    expiry. User updates/deletes flushed through the ORM in this process
+    evict that user's entries immediately (see the mapper events below);
+    changes made by other processes are picked up within one TTL.
+    """
+
+    _cache: "OrderedDict[str, tuple]" = OrderedDict()
+    _lock = threading.Lock()
+
+    hits = 0
+    misses = 0
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def get(cls, token: str) -> Optional[UserPrincipal]:
+        key = cls._key(token)
+        with cls._lock:
+            entry = cls._cache.get(key)
+            if entry is None or entry[1] <= time.time():
+                if entry is not None:
+                    del cls._cache[key]
+                cls.misses += 1
+                return None
+            cls._cache.move_to_end(key)
+            cls.hits += 1
+            return entry[0]
+
+    @classmethod
+    def put(cls, token: str, principal: UserPrincipal, token_exp: Optional[float]) -> None:
+        ttl = settings.AUTH_CACHE_TTL_SECONDS
+        if ttl <= 0:
+            return
+        expires_at = time.time() + ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        key = cls._key(token)
+        with cls._lock:
+            cls._cache[key] = (principal, expires_at)
+            cls._cache.move_to_end(key)
+            while len(cls._cache) > settings.AUTH_CACHE_SIZE:
+                cls._cache.popitem(last=False)
+
+    @classmethod
+    def invalidate_email(cls, email: str) -> None:
+        with cls._lock:
+            stale = [k for k, (principal, _) in cls._cache.items() if principal.email == email]
+            for key in stale:
+                del cls._cache[key]
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._cache.clear()
+
+    @classmethod
+    def stats(cls) -> dict:
+        with cls._lock:
+            return {"size": len(cls._cache), "hits": cls.hits, "misses": cls.misses}
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _evict_cached_principal(mapper, connection, target):
+    PrincipalCache.invalidate_email(target.email)
+    # An email change leaves entries under the old address too
+    for old_email in inspect(target).attrs.email.history.deleted:
+        PrincipalCache.invalidate_email(old_email)
 
 
 class SecurityService:
@@ -44,6 +157,14 @@ class SecurityService:
     def verify_password(cls, plain_password: str, hashed_password: str) -> bool:
         return cls.pwd_context.verify(plain_password, hashed_password)
 
+    @staticmethod
+    async def hash_password_async(password: str) -> str:
+        return await PasswordHashPool.run(_hash_password, password)
+
+    @staticmethod
+    async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+        return await PasswordHashPool.run(_verify_password, plain_password, hashed_password)
+
     # ---------------------------
     # JWT token creation
     # ---------------------------
@@ -58,67 +179,254 @@ class SecurityService:
     # Get current user from token
     # ---------------------------
     @staticmethod
-    def get_current_user(
-        token: str = Depends(oauth2_scheme),
-        session: Session = Depends(db.get_db)
-    ) -> User:
-
-        credentials_exception = HTTPException(
+    def _credentials_exception() -> HTTPException:
+        return HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    @staticmethod
+    def _decode_token(token: str) -> dict:
         try:
             payload = jwt.decode(
                 token,
                 SecurityService.SECRET_KEY,
                 algorithms=[SecurityService.ALGORITHM],
             )
-            email: str = payload.get("sub")
-            if email is None:
-                raise credentials_exception
         except JWTError:
-            raise credentials_exception
+            raise SecurityService._credentials_exception()
+        if payload.get("sub") is None:
+            raise SecurityService._credentials_exception()
+        return payload
 
-        user = session.query(User).filter(User.email == email).first()
+    @staticmethod
+    def _principal_for(token: str, payload: dict, user: Optional[User]) -> UserPrincipal:
         if user is None:
-            raise credentials_exception
+            raise SecurityService._credentials_exception()
+        principal = UserPrincipal.from_user(user)
+        PrincipalCache.put(token, principal, payload.get("exp"))
+        return principal
 
-        return user
+    @staticmethod
+    def get_current_user(
+        token: str = Depends(oauth2_scheme),
+        session: Session = Depends(db.get_db)
+    ) -> UserPrincipal:
+        """
+        Resolve the bearer token to a UserPrincipal. A cached principal costs
+        no database round trip (the session is never checked out); otherwise
+        the user row is read once and cached.
+        """
+        principal = PrincipalCache.get(token)
+        if principal is not None:
+            return principal
+
+        payload = SecurityService._decode_token(token)
+        with query_stats.outside_budget():
+            user = session.query(User).filter(User.email == payload["sub"]).first()
+        principal = SecurityService._principal_for(token, payload, user)
+        # End the read so the connection goes back to the pool while the
+        # request waits for a worker thread to run the endpoint
+        session.rollback()
+        return principal
+
+    @staticmethod
+    async def get_current_user_async(
+        token: str = Depends(oauth2_scheme),
+        session: AsyncSession = Depends(db.get_async_db)
+    ) -> UserPrincipal:
+        """get_current_user for async mode; main.py swaps it in as a dependency override."""
+        principal = PrincipalCache.get(token)
+        if principal is not None:
+            return principal
+
+        payload = SecurityService._decode_token(token)
+        with query_stats.outside_budget():
+            user = (await session.execute(select(User).where(User.email == payload["sub"]))).scalars().first()
+        return SecurityService._principal_for(token, payload, user)
 
 
     @staticmethod
-    def require_employer(
-        current_user: User = Depends(get_current_user),
-    ) -> User:
+    async def principal_for_token(token: str) -> UserPrincipal:
+        """
+        get_current_user outside dependency injection, for routes that also
+        accept credentials other than a login token (e.g. /metrics).
+        """
+        if not db.is_configured:
+            raise SecurityService._credentials_exception()
+        if db.is_async:
+            async with db.AsyncSessionLocal() as session:
+                return await SecurityService.get_current_user_async(token, session)
+
+        def resolve() -> UserPrincipal:
+            session = db.SessionLocal()
+            try:
+                return SecurityService.get_current_user(token, session)
+            finally:
+                session.close()
+
+        return await run_in_threadpool(resolve)
+
+
+    # Role checks only read the principal, so they are async: no threadpool hop
+    @staticmethod
+    async def require_employer(
+        current_user: UserPrincipal = Depends(get_current_user),
+    ) -> UserPrincipal:
         if current_user.role != "employer":
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Employer access required")
         return current_user
 
 
     @staticmethod
-    def require_dashboard_user(
-        current_user: User = Depends(get_current_user),
-    ) -> User:
+    async def require_dashboard_user(
+        current_user: UserPrincipal = Depends(get_current_user),
+    ) -> UserPrincipal:
         if current_user.role not in {"admin", "employer"}:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Dashboard access required")
         return current_user
 
 
     @staticmethod
-    def require_admin(
-        current_user: User = Depends(get_current_user),
-    ) -> User:
+    async def require_admin(
+        current_user: UserPrincipal = Depends(get_current_user),
+    ) -> UserPrincipal:
         if current_user.role != "admin":
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
         return current_user
 
 
     @staticmethod
-    def require_employee(
-        current_user: User = Depends(get_current_user),
-    ) -> User:
+    async def require_employee(
+        current_user: UserPrincipal = Depends(get_current_user),
+    ) -> UserPrincipal:
         if current_user.role != "employee":
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Employee access required")
         return current_user
+
+
+# ---------------------------
+# Password hashing pool
+# ---------------------------
+def _hash_password(password: str) -> str:
+    return SecurityService.hash_password(password)
+
+
+def _verify_password(plain_password: str, hashed_password: str) -> bool:
+    return SecurityService.verify_password(plain_password, hashed_password)
+
+
+def _lower_priority(increment: int) -> None:
+    # Hash workers yield the CPU to the API processes when cores are scarce
+    if increment > 0 and hasattr(os, "nice"):
+        os.nice(increment)
+
+
+class PasswordHashPool:
+    """
+    Runs pbkdf2 hashing in a dedicated process pool (HASH_POOL_WORKERS) so a
+    login burst queues there instead of occupying the threadpool shared by
+    every sync route. At most HASH_POOL_MAX_PENDING jobs may be queued or
+    running; beyond that callers get an immediate 429. Latency is measured
+    from submission, so it includes time spent queued.
+    """
+
+    _executor: Optional[ProcessPoolExecutor] = None
+    _unavailable = False  # set once the platform refuses to build the pool
+    _lock = threading.Lock()
+    _pending = 0
+
+    latency = LatencyWindow()
+    completed = 0
+    rejected = 0
+    failed = 0
+
+    @classmethod
+    def _get_executor(cls) -> Optional[ProcessPoolExecutor]:
+        """The process pool, or None to hash on the threadpool (disabled or unsupported here)."""
+        if settings.HASH_POOL_WORKERS <= 0 or cls._unavailable:
+            return None
+        with cls._lock:
+            if cls._executor is None and not cls._unavailable:
+                try:
+                    # spawn: forking a process that already runs threads is unsafe
+                    cls._executor = ProcessPoolExecutor(
+                        max_workers=settings.HASH_POOL_WORKERS,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_lower_priority, initargs=(settings.HASH_POOL_NICE,),
+                    )
+                except (OSError, NotImplementedError, ImportError) as exc:
+                    # Serverless runtimes such as AWS Lambda (Vercel) have no
+                    # /dev/shm, so multiprocessing queues and semaphores cannot
+                    # be created. _admit still bounds the threadpool fallback.
+                    cls._unavailable = True
+                    logger.warning(
+                        "Password hash process pool unavailable (%s); hashing on the threadpool", exc,
+                    )
+            return cls._executor
+
+    @classmethod
+    def _admit(cls) -> None:
+        with cls._lock:
+            if cls._pending >= settings.HASH_POOL_MAX_PENDING:
+                cls.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many logins in progress, retry shortly",
+                    headers={"Retry-After": "1"},
+                )
+            cls._pending += 1
+
+    @classmethod
+    async def run(cls, fn, *args):
+        cls._admit()
+        started = time.perf_counter()
+        try:
+            executor = cls._get_executor()
+            if executor is None:
+                result = await run_in_threadpool(fn, *args)
+            else:
+                result = await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # A worker died; drop the pool so the next call starts a fresh one
+            with cls._lock:
+                cls.failed += 1
+                if cls._executor is executor:
+                    cls._executor = None
+            raise
+        except HTTPException:
+            raise
+        except Exception:
+            with cls._lock:
+                cls.failed += 1
+            raise
+        finally:
+            with cls._lock:
+                cls._pending -= 1
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with cls._lock:
+            cls.completed += 1
+        cls.latency.record(elapsed_ms)
+        return result
+
+    @classmethod
+    def shutdown(cls) -> None:
+        with cls._lock:
+            executor, cls._executor = cls._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @classmethod
+    def stats(cls) -> dict:
+        with cls._lock:
+            stats = {
+                "workers": 0 if cls._unavailable else settings.HASH_POOL_WORKERS,
+                "max_pending": settings.HASH_POOL_MAX_PENDING,
+                "pending": cls._pending,
+                "completed": cls.completed,
+                "rejected": cls.rejected,
+                "failed": cls.failed,
+            }
+        stats["latency_ms"] = cls.latency.snapshot()
+        return stats
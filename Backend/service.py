@@ -1,10 +1,25 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import func
-from datetime import datetime
+from sqlalchemy import and_, case, func, insert, or_, select, text, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from datetime import date, datetime, timedelta
+from collections import Counter, OrderedDict
+from fastapi.encoders import jsonable_encoder
+from pydantic import ValidationError
+import base64
+import bisect
+import csv
+import hashlib
+import io
+import json
+import logging
+import threading
+import time
 from fastapi import HTTPException
 from decimal import Decimal
-from typing import Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from models import (
     Employee,
@@ -12,16 +27,81 @@ from models import (
     Treasury,
     BlockchainTransaction,
     Bonus,
-    CompanySettings
+    CompanySettings,
+    TaxSlab,
+    LedgerEntry,
+    TreasurySnapshot,
+    IdempotencyKey,
+    DashboardCounters,
+    EmployeeMonthlyRollup,
 )
 from config import settings
+from schemas import EmployeeCreate
+import metrics
+import money
+from money import BP_SCALE, Money, rate_to_bp
 
+logger = logging.getLogger(__name__)
 
 def _to_decimal(value) -> Decimal:
     if isinstance(value, Decimal):
         return value
     return Decimal(str(value))
 
+
+def _finish(db: Session, commit: bool, *instances) -> None:
+    """
+    Commit, or with `commit=False` only flush so the caller can commit it
+    together with its own writes; then reload `instances` from the database.
+    """
+    if commit:
+        db.commit()
+    else:
+        db.flush()
+    for instance in instances:
+        db.refresh(instance)
+
+# =====================================================
+# KEYSET PAGINATION
+# =====================================================
+def encode_cursor(*values) -> str:
+    """Opaque cursor for the last row of a page."""
+    payload = json.dumps(jsonable_encoder(list(values)), separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _cursor_value(value, expected: type):
+    if expected is datetime:
+        if not isinstance(value, str):
+            raise ValueError
+        return datetime.fromisoformat(value)
+    if expected is int:
+        # bool is an int subclass; the range keeps the value bindable as BIGINT
+        if isinstance(value, bool) or not isinstance(value, int) or not -2**63 <= value < 2**63:
+            raise ValueError
+        return value
+    raise TypeError(f"Unsupported cursor type {expected!r}")
+
+
+def decode_cursor(cursor: str, *types: type) -> list:
+    """
+    Values of a cursor made by `encode_cursor`, one per entry of `types`
+    (int or datetime). Anything else, including the wrong arity, is a 400.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError
+        return [_cursor_value(value, expected) for value, expected in zip(values, types)]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def clamp_page_size(limit: int, maximum: int = 500) -> int:
+    return max(1, min(limit, maximum))
+
+
 # =====================================================
 # EMPLOYEE SERVICE
 # =====================================================
@@ -45,6 +125,67 @@ class EmployeeService:
             raise
 
 
+    IMPORT_CHUNK_SIZE = 1000  # rows per multi-row INSERT / emails per IN (...) lookup
+
+    @classmethod
+    def bulk_create(cls, db: Session, rows: List[Any]) -> dict:
+        """
+        Create many employees in one transaction.
+
+        Rows are validated against EmployeeCreate, duplicate emails inside the
+        upload are rejected, existing emails are found with set-based
+        `IN (...)` lookups and the survivors are inserted with chunked
+        executemany. Bad rows are reported per row and never abort the rest.
+        """
+        results = []
+        candidates = {}
+        for position, raw in enumerate(rows, start=1):
+            try:
+                data = EmployeeCreate.model_validate(raw)
+            except ValidationError as e:
+                error = e.errors()[0]
+                field = ".".join(str(part) for part in error["loc"]) or "row"
+                email = raw.get("email") if isinstance(raw, dict) else None
+                results.append({"row": position, "email": email, "status": "error",
+                                "detail": f"{field}: {error['msg']}"})
+                continue
+
+            email = data.email.strip()
+            name = data.name.strip()
+            result = {"row": position, "email": email, "status": "created", "detail": None}
+            results.append(result)
+            if not email or not name:
+                result.update(status="error", detail="name and email are required")
+            elif email in candidates:
+                result.update(status="error", detail=f"Duplicate email in upload (row {candidates[email][0]['row']})")
+            else:
+                candidates[email] = (result, {"name": name, "email": email, "role": data.role})
+
+        emails = list(candidates)
+        for i in range(0, len(emails), cls.IMPORT_CHUNK_SIZE):
+            chunk = emails[i:i + cls.IMPORT_CHUNK_SIZE]
+            for (existing,) in db.execute(select(Employee.email).where(Employee.email.in_(chunk))):
+                result, _ = candidates.pop(existing)
+                result.update(status="error", detail="Email already exists")
+
+        new_rows = [row for _, row in candidates.values()]
+        try:
+            for i in range(0, len(new_rows), cls.IMPORT_CHUNK_SIZE):
+                db.execute(insert(Employee), new_rows[i:i + cls.IMPORT_CHUNK_SIZE])
+            db.commit()
+        except IntegrityError:
+            # Another writer took one of these emails between the lookup and the insert
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Email conflict during import; retry the upload")
+
+        created = len(new_rows)
+        return {
+            "created_count": created,
+            "error_count": len(results) - created,
+            "results": results,
+        }
+
+
     @staticmethod
     def get_employee(db: Session, employee_id: int):
         return db.query(Employee).filter(Employee.id == employee_id).first()
@@ -56,28 +197,257 @@ class EmployeeService:
         if not employee:
             raise ValueError("Employee not found")
 
+        # Transactions cascade with the employee, so take them out of the counters too
+        paid = db.query(
+            func.coalesce(func.sum(Transaction.amount), 0),
+            func.coalesce(func.sum(Transaction.tax_amount), 0),
+            func.count(Transaction.id),
+        ).filter(Transaction.employee_id == employee_id).one()
+        DashboardCounterService.apply(
+            db,
+            net=-Money.from_decimal(paid[0]),
+            tax=-Money.from_decimal(paid[1]),
+            count=-paid[2],
+            active_streams=-1 if employee.is_streaming else 0,
+        )
+        db.query(EmployeeMonthlyRollup) \
+          .filter(EmployeeMonthlyRollup.employee_id == employee_id) \
+          .delete(synchronize_session=False)
+
         db.delete(employee)
         db.commit()
 
 
 # =====================================================
-# TAX SERVICE (CUSTOM → COMPANY DEFAULT ONLY)
+# TAX BRACKET INDEX (PROGRESSIVE TAX)
+# =====================================================
+class TaxBracketIndex:
+    """
+    TaxSlab rows compiled into parallel sorted integer arrays.
+
+    `lows[i]` is where bracket i starts (cents), `rates[i]` its marginal rate
+    in basis points and `base_tax[i]` the tax owed on everything below
+    `lows[i]`, kept unrounded in cent-basis-points so brackets add up
+    exactly. Gaps between slabs become zero-rate brackets and overlapping
+    slabs are clipped to the previous slab's upper bound, so a lookup is one
+    bisect, one multiply and one rounding division.
+    """
+
+    __slots__ = ("lows", "rates", "base_tax")
+
+    def __init__(self, slabs: List[TaxSlab]):
+        self.lows: List[int] = []
+        self.rates: List[int] = []
+        self.base_tax: List[int] = []
+
+        position = 0
+        tax_so_far = 0
+        for slab in sorted(slabs, key=lambda s: s.min_income):
+            low = max(Money.from_decimal(slab.min_income).cents, position)
+            high = Money.from_decimal(slab.max_income).cents if slab.max_income is not None else None
+            if high is not None and high <= low:
+                continue
+            if low > position:
+                self._append(position, 0, tax_so_far)
+            rate = rate_to_bp(slab.tax_rate)
+            self._append(low, rate, tax_so_far)
+            if high is None:
+                position = None
+                break
+            position = high
+            tax_so_far += (high - low) * rate
+
+        if self.lows and position is not None:
+            self._append(position, 0, tax_so_far)
+
+    def _append(self, low: int, rate: int, base_tax: int) -> None:
+        self.lows.append(low)
+        self.rates.append(rate)
+        self.base_tax.append(base_tax)
+
+    def tax(self, gross_amount: Money) -> Money:
+        return Money(self.tax_batch([gross_amount.cents])[0])
+
+    def tax_batch(self, gross_cents: List[int]) -> List[int]:
+        lows, rates, base_tax = self.lows, self.rates, self.base_tax
+        bisect_right = bisect.bisect_right
+        half = BP_SCALE // 2
+        out = []
+        for g in gross_cents:
+            i = bisect_right(lows, g) - 1
+            out.append(0 if i < 0 else (base_tax[i] + (g - lows[i]) * rates[i] + half) // BP_SCALE)
+        return out
+
+
+# =====================================================
+# TAX SETTINGS CACHE
+# =====================================================
+class TaxSettingsCache:
+    """
+    Process-local copy of the company default tax rate.
+
+    Loaded on first use and then trusted for TAX_SETTINGS_CHECK_SECONDS.
+    After that a single `SELECT config_version` tells whether another worker
+    changed the tax configuration; only then is the row re-read (and the
+    compiled slab index dropped). Writes in this process go through `store`
+    or `invalidate`, so they are visible immediately.
+    """
+
+    _lock = threading.Lock()
+    _rate_bp: Optional[int] = None
+    _version: Optional[int] = None
+    _checked_at = 0.0
+
+    hits = 0
+    misses = 0
+    version_checks = 0
+
+    @classmethod
+    def _load(cls, db: Session) -> None:
+        row = db.query(CompanySettings.default_tax_rate, CompanySettings.config_version).first()
+        version = (row[1] or 0) if row else 0
+        with cls._lock:
+            cls.misses += 1
+            if cls._version is not None and version < cls._version:
+                return  # a concurrent store() already cached something newer
+            cls._rate_bp = rate_to_bp(row[0] if row and row[0] is not None else settings.TAX_RATE)
+            cls._version = version
+            cls._checked_at = time.monotonic()
+        TaxService.invalidate_slab_index()
+
+    @classmethod
+    def sync(cls, db: Session) -> None:
+        # The lock only guards the cached fields, never a query: in async mode
+        # a query yields to the event loop, and a request blocking on a thread
+        # lock held across that would stall the loop and the holder with it.
+        with cls._lock:
+            loaded = cls._rate_bp is not None
+            if loaded and time.monotonic() - cls._checked_at < settings.TAX_SETTINGS_CHECK_SECONDS:
+                cls.hits += 1
+                return
+
+        if loaded:
+            version = db.query(CompanySettings.config_version).limit(1).scalar() or 0
+            with cls._lock:
+                cls.version_checks += 1
+                if version == cls._version:
+                    cls.hits += 1
+                    cls._checked_at = time.monotonic()
+                    return
+
+        cls._load(db)
+
+    @classmethod
+    def rate_bp(cls, db: Session) -> int:
+        cls.sync(db)
+        return cls._rate_bp
+
+    @classmethod
+    def store(cls, rate: Decimal, version: int) -> None:
+        with cls._lock:
+            cls._rate_bp = rate_to_bp(rate)
+            cls._version = version
+            cls._checked_at = time.monotonic()
+
+    @classmethod
+    def invalidate(cls) -> None:
+        with cls._lock:
+            cls._rate_bp = None
+        TaxService.invalidate_slab_index()
+
+    @classmethod
+    def stats(cls) -> dict:
+        return {
+            "hits": cls.hits,
+            "misses": cls.misses,
+            "version_checks": cls.version_checks,
+            "cached_rate": cls._rate_bp / 100 if cls._rate_bp is not None else None,
+            "version": cls._version,
+        }
+
+
+# =====================================================
+# TAX SERVICE (CUSTOM → TAX SLABS → COMPANY DEFAULT)
 # =====================================================
 class TaxService:
 
+    # Compiled slab index, cached per process. None means "not loaded yet";
+    # an index with no brackets means "no slabs configured".
+    _slab_index: Optional[TaxBracketIndex] = None
+    _slab_generation = 0  # bumped on invalidation, so a build that raced one is not installed
+    _slab_lock = threading.Lock()
+
+    @staticmethod
+    def company_tax_rate_bp(db: Session) -> int:
+        return TaxSettingsCache.rate_bp(db)
+
+    @staticmethod
+    def bump_config_version(db: Session) -> None:
+        """Mark the tax configuration as changed for every worker. The caller owns the commit."""
+        db.execute(
+            update(CompanySettings)
+            .values(config_version=func.coalesce(CompanySettings.config_version, 0) + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+    @classmethod
+    def slab_index(cls, db: Session) -> Optional[TaxBracketIndex]:
+        """Compiled progressive brackets, or None when no tax slabs are configured."""
+        TaxSettingsCache.sync(db)
+        index = cls._slab_index
+        if index is None:
+            # Built outside the lock, as in TaxSettingsCache.sync; concurrent
+            # first requests may each build it, which is only redundant work
+            generation = cls._slab_generation
+            index = TaxBracketIndex(db.query(TaxSlab).all())
+            with cls._slab_lock:
+                if cls._slab_generation == generation and cls._slab_index is None:
+                    cls._slab_index = index
+        return index if index.lows else None
+
+    @classmethod
+    def invalidate_slab_index(cls) -> None:
+        with cls._slab_lock:
+            cls._slab_index = None
+            cls._slab_generation += 1
+
     @staticmethod
-    def calculate_tax(db: Session, employee: Employee, gross_amount: float):
+    def calculate_tax(db: Session, employee: Employee, gross_amount: Money) -> Money:
 
         # 1️⃣ Employee custom override
         if employee.use_custom_tax and employee.custom_tax_rate:
-            rate = float(employee.custom_tax_rate)
-            return (gross_amount * rate) / 100.0
+            return gross_amount.tax(rate_to_bp(employee.custom_tax_rate))
 
-        # 2️⃣ Company default tax
-        company_settings = db.query(CompanySettings).first()
-        rate = float(company_settings.default_tax_rate) if company_settings else float(settings.TAX_RATE)
+        # 2️⃣ Progressive tax slabs
+        index = TaxService.slab_index(db)
+        if index:
+            return index.tax(gross_amount)
 
-        return (gross_amount * rate) / 100.0
+        # 3️⃣ Company default tax
+        return gross_amount.tax(TaxService.company_tax_rate_bp(db))
+
+    @staticmethod
+    def calculate_tax_batch(db: Session, employees: List[Employee], gross_amounts: List[Money]) -> List[Money]:
+        """Tax for many (employee, gross) pairs; slabs and company settings are read at most once."""
+        taxes: List[Optional[Money]] = [None] * len(gross_amounts)
+        default_positions = []
+        for i, (employee, gross_amount) in enumerate(zip(employees, gross_amounts)):
+            if employee.use_custom_tax and employee.custom_tax_rate:
+                taxes[i] = gross_amount.tax(rate_to_bp(employee.custom_tax_rate))
+            else:
+                default_positions.append(i)
+
+        if default_positions:
+            default_cents = [gross_amounts[i].cents for i in default_positions]
+            index = TaxService.slab_index(db)
+            if index:
+                default_taxes = index.tax_batch(default_cents)
+            else:
+                default_taxes = money.tax_batch(default_cents, TaxService.company_tax_rate_bp(db))
+            for i, tax_cents in zip(default_positions, default_taxes):
+                taxes[i] = Money(tax_cents)
+
+        return taxes
 
 
 # =====================================================
@@ -86,48 +456,271 @@ class TaxService:
 class TreasuryService:
 
     @staticmethod
-    def get_or_create(db: Session):
+    def get_or_create(db: Session, commit: bool = True):
         treasury = db.query(Treasury).first()
         if not treasury:
             treasury = Treasury(total_balance=Decimal("0.00"), onchain_balance=Decimal("0.00"))
             db.add(treasury)
-            db.commit()
-            db.refresh(treasury)
+            _finish(db, commit)
         return treasury
 
 
     @staticmethod
-    def deposit_web2(db: Session, amount: float):
-        if amount <= 0:
+    def debit(db: Session, amount: Money) -> None:
+        """
+        Take `amount` out of the treasury in one conditional UPDATE.
+
+        The balance check and the decrement happen in the same statement
+        (`... WHERE total_balance >= :amt`), so concurrent payouts from other
+        sessions or workers can neither overdraw nor lose an update. The row
+        lock taken by the UPDATE does the work on PostgreSQL/MySQL, and SQLite
+        serializes writers, so no dialect-specific locking is needed. The
+        caller owns the commit.
+        """
+        treasury = TreasuryService.get_or_create(db, commit=False)
+        amt = amount.to_decimal()
+        result = db.execute(
+            update(Treasury)
+            .where(Treasury.id == treasury.id, Treasury.total_balance >= amt)
+            .values(total_balance=Treasury.total_balance - amt)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            metrics.TREASURY_DEBITS.inc(outcome="insufficient_funds")
+            raise HTTPException(status_code=400, detail="Insufficient treasury funds")
+        metrics.TREASURY_DEBITS.inc(outcome="ok")
+        metrics.TREASURY_DEBITED.inc(amount.cents)
+
+
+    @staticmethod
+    def credit(db: Session, amount: Money) -> None:
+        """Add `amount` to the treasury in one UPDATE. The caller owns the commit."""
+        treasury = TreasuryService.get_or_create(db, commit=False)
+        db.execute(
+            update(Treasury)
+            .where(Treasury.id == treasury.id)
+            .values(total_balance=Treasury.total_balance + amount.to_decimal())
+            .execution_options(synchronize_session=False)
+        )
+
+
+    @staticmethod
+    def deposit_web2(db: Session, amount: Money, commit: bool = True):
+        if amount.cents <= 0:
             raise HTTPException(status_code=400, detail="Amount must be greater than 0")
 
-        treasury = TreasuryService.get_or_create(db)
-        amt = _to_decimal(amount)
-        treasury.total_balance = _to_decimal(treasury.total_balance) + amt
+        TreasuryService.credit(db, amount)
+        LedgerService.record(db, "deposit", amount.to_decimal())
 
-        db.commit()
-        db.refresh(treasury)
+        treasury = TreasuryService.get_or_create(db, commit=False)
+        _finish(db, commit, treasury)
         return treasury
 
 
     @staticmethod
-    def withdraw_web2(db: Session, amount: float):
-        if amount <= 0:
+    def withdraw_web2(db: Session, amount: Money, commit: bool = True):
+        if amount.cents <= 0:
             raise HTTPException(status_code=400, detail="Amount must be greater than 0")
 
-        treasury = TreasuryService.get_or_create(db)
+        try:
+            TreasuryService.debit(db, amount)
+        except HTTPException:
+            raise HTTPException(status_code=400, detail="Insufficient balance")
+        LedgerService.record(db, "withdrawal", amount.to_decimal())
+
+        treasury = TreasuryService.get_or_create(db, commit=False)
+        _finish(db, commit, treasury)
+        return treasury
 
-        amt = _to_decimal(amount)
-        current = _to_decimal(treasury.total_balance)
 
-        if current < amt:
-            raise HTTPException(status_code=400, detail="Insufficient balance")
+# =====================================================
+# LEDGER SERVICE (APPEND-ONLY TREASURY HISTORY)
+# =====================================================
+TREASURY_ACCOUNT = "treasury"
+
+# entry_type -> (debit account, credit account)
+LEDGER_ACCOUNTS = {
+    "deposit": (TREASURY_ACCOUNT, "external"),
+    "withdrawal": ("external", TREASURY_ACCOUNT),
+    "salary": ("salary_expense", TREASURY_ACCOUNT),
+    "bonus": ("bonus_expense", TREASURY_ACCOUNT),
+}
 
-        treasury.total_balance = current - amt
 
+class LedgerService:
+
+    # Signed effect of an entry on the treasury account
+    treasury_delta = case(
+        (LedgerEntry.debit_account == TREASURY_ACCOUNT, LedgerEntry.amount),
+        (LedgerEntry.credit_account == TREASURY_ACCOUNT, -LedgerEntry.amount),
+        else_=0,
+    )
+
+    @staticmethod
+    def _entry_row(entry_type: str, amount: Decimal, employee_id: Optional[int], description: Optional[str]) -> dict:
+        debit_account, credit_account = LEDGER_ACCOUNTS[entry_type]
+        return {
+            "entry_type": entry_type,
+            "debit_account": debit_account,
+            "credit_account": credit_account,
+            "amount": amount,
+            "employee_id": employee_id,
+            "description": description,
+        }
+
+    @staticmethod
+    def record(db: Session, entry_type: str, amount: Decimal,
+               employee_id: Optional[int] = None, description: Optional[str] = None) -> None:
+        """Append one entry. The caller owns the commit, so it lands with the balance change."""
+        db.execute(insert(LedgerEntry), [LedgerService._entry_row(entry_type, amount, employee_id, description)])
+
+    @staticmethod
+    def record_many(db: Session, entry_type: str, rows: List[dict]) -> None:
+        """Append one entry per {"amount", "employee_id", "description"} row with a single executemany."""
+        if not rows:
+            return
+        db.execute(
+            insert(LedgerEntry),
+            [
+                LedgerService._entry_row(entry_type, r["amount"], r.get("employee_id"), r.get("description"))
+                for r in rows
+            ],
+        )
+
+    @staticmethod
+    def latest_snapshot(db: Session, at: Optional[datetime] = None) -> Optional[TreasurySnapshot]:
+        query = db.query(TreasurySnapshot)
+        if at is not None:
+            query = query.filter(TreasurySnapshot.as_of <= at)
+        return query.order_by(TreasurySnapshot.last_entry_id.desc()).first()
+
+    @staticmethod
+    def balance(db: Session, at: Optional[datetime] = None) -> dict:
+        """
+        Treasury balance at `at` (default: now): the latest snapshot taken at
+        or before that time plus the entries appended after it. The compactor
+        keeps the tail short, so this is one indexed snapshot lookup and one
+        small SUM regardless of how long the ledger grows.
+        """
+        snapshot = LedgerService.latest_snapshot(db, at)
+        base = _to_decimal(snapshot.balance) if snapshot else Decimal("0.00")
+        last_entry_id = snapshot.last_entry_id if snapshot else 0
+
+        query = db.query(func.sum(LedgerService.treasury_delta)).filter(LedgerEntry.id > last_entry_id)
+        if at is not None:
+            query = query.filter(LedgerEntry.created_at <= at)
+        tail = query.scalar() or 0
+
+        return {
+            "balance": base + _to_decimal(tail),
+            "as_of": at or datetime.utcnow(),
+            "snapshot_id": snapshot.id if snapshot else None,
+        }
+
+    COMPACTOR_LOCK_KEY = 0x6C656467  # PostgreSQL advisory lock id
+    COMPACTOR_LOCK_NAME = "ledger_compactor"  # MySQL named lock
+
+    @staticmethod
+    def _claim_compaction(db: Session) -> bool:
+        """
+        Whether this worker may compact now; every worker runs the compactor
+        thread, and one at a time does the work while the rest skip the round.
+        PostgreSQL's lock ends with the transaction; MySQL's is released by
+        `_release_compaction`. SQLite has no advisory locks but serializes
+        writers, so taking the write lock up front makes a second compactor
+        wait and then find nothing left to fold.
+        """
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            return bool(db.execute(
+                text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": LedgerService.COMPACTOR_LOCK_KEY}
+            ).scalar())
+        if dialect in ("mysql", "mariadb"):
+            return db.execute(
+                text("SELECT GET_LOCK(:name, 0)"), {"name": LedgerService.COMPACTOR_LOCK_NAME}
+            ).scalar() == 1
+        if dialect == "sqlite":
+            db.execute(update(Treasury).values(id=Treasury.id).execution_options(synchronize_session=False))
+        return True
+
+    @staticmethod
+    def _release_compaction(db: Session) -> None:
+        # A MySQL named lock belongs to the connection, which outlives the
+        # session in the pool, so it is released explicitly (before the
+        # commit hands the connection back)
+        if db.get_bind().dialect.name in ("mysql", "mariadb"):
+            db.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": LedgerService.COMPACTOR_LOCK_NAME})
+
+    @staticmethod
+    def compact(db: Session) -> Optional[TreasurySnapshot]:
+        """
+        Fold the entries after the latest snapshot into a new snapshot, or
+        return None if there are none or another worker is compacting.
+
+        Ledger ids are allocated before commit, so an entry with a lower id
+        can become visible after a higher one. Every ledger writer updates the
+        treasury row before appending its entry, in the same transaction, so
+        locking that row first waits out in-flight writers: the tail read
+        below cannot miss an entry that later commits under a folded id.
+        """
+        if not LedgerService._claim_compaction(db):
+            db.rollback()
+            return None
+        try:
+            new_snapshot = LedgerService._fold_tail(db)
+        finally:
+            LedgerService._release_compaction(db)
         db.commit()
-        db.refresh(treasury)
-        return treasury
+        return new_snapshot
+
+    @staticmethod
+    def _fold_tail(db: Session) -> Optional[TreasurySnapshot]:
+        db.execute(select(Treasury.id).with_for_update())
+        snapshot = LedgerService.latest_snapshot(db)
+        last_entry_id = snapshot.last_entry_id if snapshot else 0
+
+        tail = (
+            db.query(
+                func.max(LedgerEntry.id),
+                func.max(LedgerEntry.created_at),
+                func.sum(LedgerService.treasury_delta),
+            )
+            .filter(LedgerEntry.id > last_entry_id)
+            .one()
+        )
+        if tail[0] is None:
+            return None
+
+        base = _to_decimal(snapshot.balance) if snapshot else Decimal("0.00")
+        new_snapshot = TreasurySnapshot(
+            last_entry_id=tail[0],
+            balance=base + _to_decimal(tail[2] or 0),
+            as_of=tail[1],
+        )
+        db.add(new_snapshot)
+        return new_snapshot
+
+    @staticmethod
+    def start_compactor(session_factory, interval_seconds: int) -> Optional[threading.Thread]:
+        """Run `compact` every `interval_seconds` on a daemon thread."""
+        if interval_seconds <= 0:
+            return None
+
+        def loop():
+            while True:
+                time.sleep(interval_seconds)
+                session = session_factory()
+                try:
+                    LedgerService.compact(session)
+                except Exception:
+                    session.rollback()
+                    logger.exception("Ledger compaction failed")
+                finally:
+                    session.close()
+
+        thread = threading.Thread(target=loop, name="ledger-compactor", daemon=True)
+        thread.start()
+        return thread
 
 
 # =====================================================
@@ -136,7 +729,8 @@ class TreasuryService:
 class TransactionService:
 
     @staticmethod
-    def create_transaction(db: Session, employee_id: int, gross_amount: float, description: str):
+    def create_transaction(db: Session, employee_id: int, gross_amount: Money, description: str,
+                           commit: bool = True):
 
         employee = db.query(Employee).filter(Employee.id == employee_id).first()
         if not employee:
@@ -145,88 +739,597 @@ class TransactionService:
         if not employee.is_streaming:
             raise HTTPException(status_code=400, detail="Stream is not active")
 
-        if gross_amount <= 0:
+        if gross_amount.cents <= 0:
             raise HTTPException(status_code=400, detail="Amount must be positive")
 
-        treasury = TreasuryService.get_or_create(db)
-
         tax_amount = TaxService.calculate_tax(db, employee, gross_amount)
         net_amount = gross_amount - tax_amount
 
-        net_amt_dec = _to_decimal(net_amount)
-        tax_amt_dec = _to_decimal(tax_amount)
-        treasury_balance = _to_decimal(treasury.total_balance)
-
-        if treasury_balance < net_amt_dec:
-            raise HTTPException(status_code=400, detail="Insufficient treasury funds")
+        net_amt_dec = net_amount.to_decimal()
+        tax_amt_dec = tax_amount.to_decimal()
 
-        treasury.total_balance = treasury_balance - net_amt_dec
+        TreasuryService.debit(db, net_amount)
+        LedgerService.record(db, "salary", net_amt_dec, employee_id=employee_id, description=description)
 
+        now = datetime.utcnow()
         transaction = Transaction(
             employee_id=employee_id,
             amount=net_amt_dec,
             tax_amount=tax_amt_dec,
-            description=description
+            description=description,
+            timestamp=now,
         )
 
         db.add(transaction)
-        db.commit()
-        db.refresh(transaction)
+        DashboardCounterService.apply(db, net=net_amount, tax=tax_amount, count=1)
+        RollupService.apply(db, [(employee_id, now, net_amount, tax_amount)])
+        _finish(db, commit, transaction)
 
         return transaction
 
 
+# =====================================================
+# READ MODELS (COLUMN PROJECTIONS)
+# =====================================================
+# List and detail endpoints select only the columns their response needs and
+# hand the rows (named tuples) straight to the response model: no ORM
+# identity map, no lazy relationships, no per-row attribute instrumentation.
+# Each method is exactly one SELECT unless its docstring says otherwise; the
+# routes declare the resulting per-request totals as `x-query-budget`.
+
+EMPLOYEE_COLUMNS = (
+    Employee.id,
+    Employee.name,
+    Employee.email,
+    Employee.role,
+    func.coalesce(Employee.is_streaming, False).label("is_streaming"),
+    Employee.wallet_address,
+    func.coalesce(Employee.use_custom_tax, False).label("use_custom_tax"),
+    Employee.custom_tax_rate,
+)
+
+TRANSACTION_COLUMNS = (
+    Transaction.id,
+    Transaction.employee_id,
+    Transaction.amount,
+    Transaction.tax_amount,
+    func.coalesce(Transaction.description, "").label("description"),
+    Transaction.timestamp,
+)
+
+LEDGER_COLUMNS = (
+    LedgerEntry.id,
+    LedgerEntry.entry_type,
+    LedgerEntry.debit_account,
+    LedgerEntry.credit_account,
+    LedgerEntry.amount,
+    LedgerEntry.employee_id,
+    LedgerEntry.description,
+    LedgerEntry.created_at,
+)
+
+
+class EmployeeReadModel:
+
+    @staticmethod
+    def get(db: Session, employee_id: int):
+        return db.execute(select(*EMPLOYEE_COLUMNS).where(Employee.id == employee_id)).first()
+
+    @staticmethod
+    def page(db: Session, limit: int, after: Optional[str] = None):
+        """One page of employees by id; returns (rows, next_cursor)."""
+        stmt = select(*EMPLOYEE_COLUMNS)
+        if after:
+            (last_id,) = decode_cursor(after, int)
+            stmt = stmt.where(Employee.id > last_id)
+        rows = db.execute(stmt.order_by(Employee.id).limit(limit + 1)).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].id)
+        return rows, next_cursor
+
+    @staticmethod
+    def profile(db: Session, email: str):
+        """The employee row for `email` plus its lifetime net pay, as one row (or None)."""
+        total_earned = (
+            select(func.coalesce(func.sum(Transaction.amount), 0))
+            .where(Transaction.employee_id == Employee.id)
+            .correlate(Employee)
+            .scalar_subquery()
+            .label("total_earned")
+        )
+        return db.execute(select(*EMPLOYEE_COLUMNS, total_earned).where(Employee.email == email)).first()
+
+
+class TransactionReadModel:
+
+    @staticmethod
+    def _page(db: Session, stmt, limit: int, after: Optional[str]):
+        """
+        Newest-first keyset page keyed on (timestamp, id), so each page is an
+        index range scan on ix_transactions_employee_timestamp_id no matter
+        how deep it is. Returns (rows, next_cursor).
+        """
+        if after:
+            last_ts, last_id = decode_cursor(after, datetime, int)
+            stmt = stmt.where(or_(
+                Transaction.timestamp < last_ts,
+                and_(Transaction.timestamp == last_ts, Transaction.id < last_id),
+            ))
+        rows = db.execute(
+            stmt.order_by(Transaction.timestamp.desc(), Transaction.id.desc()).limit(limit + 1)
+        ).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].timestamp, rows[-1].id)
+        return rows, next_cursor
+
+    @staticmethod
+    def page_for_employee(db: Session, employee_id: int, limit: int, after: Optional[str] = None):
+        """
+        One page of an employee's transactions. A non-empty page proves the
+        employee exists; only an empty one costs a second, primary-key query
+        to tell "no history" from 404.
+        """
+        stmt = select(*TRANSACTION_COLUMNS).where(Transaction.employee_id == employee_id)
+        rows, next_cursor = TransactionReadModel._page(db, stmt, limit, after)
+        if not rows and db.execute(select(Employee.id).where(Employee.id == employee_id)).first() is None:
+            raise HTTPException(status_code=404, detail="Employee not found")
+        return rows, next_cursor
+
+    @staticmethod
+    def page_for_email(db: Session, email: str, limit: int, after: Optional[str] = None):
+        """One page of the transactions of the employee with `email` (empty when there is none)."""
+        stmt = (
+            select(*TRANSACTION_COLUMNS)
+            .join(Employee, Employee.id == Transaction.employee_id)
+            .where(Employee.email == email)
+        )
+        return TransactionReadModel._page(db, stmt, limit, after)
+
+
+class LedgerReadModel:
+
+    @staticmethod
+    def recent(db: Session, limit: int):
+        return db.execute(select(*LEDGER_COLUMNS).order_by(LedgerEntry.id.desc()).limit(limit)).all()
+
+
+# =====================================================
+# TRANSACTION EXPORT (STREAMED)
+# =====================================================
+class ExportService:
+    COLUMNS = ["id", "employee_id", "employee_name", "employee_email",
+               "amount", "tax_amount", "description", "timestamp"]
+    FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+    @staticmethod
+    def _statement(employee_id: Optional[int], start: Optional[date], end: Optional[date]):
+        stmt = (
+            select(
+                Transaction.id,
+                Transaction.employee_id,
+                Employee.name,
+                Employee.email,
+                Transaction.amount,
+                Transaction.tax_amount,
+                Transaction.description,
+                Transaction.timestamp,
+            )
+            .join(Employee, Employee.id == Transaction.employee_id)
+            .order_by(Transaction.id)
+        )
+        if employee_id is not None:
+            stmt = stmt.where(Transaction.employee_id == employee_id)
+        if start is not None:
+            stmt = stmt.where(Transaction.timestamp >= datetime.combine(start, datetime.min.time()))
+        if end is not None:
+            # `end` is inclusive of the whole day
+            stmt = stmt.where(Transaction.timestamp < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+        return stmt
+
+    @staticmethod
+    def _json_default(value):
+        return value.isoformat() if isinstance(value, datetime) else str(value)
+
+    @classmethod
+    def _csv_line(cls, row) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(["" if value is None else cls._json_default(value) for value in row])
+        return buffer.getvalue()
+
+    @classmethod
+    def stream(cls, session_factory, fmt: str, employee_id: Optional[int] = None,
+               start: Optional[date] = None, end: Optional[date] = None):
+        """
+        Generator of export chunks. It owns its session (the request-scoped
+        one is closed before a streamed body is sent) and reads through a
+        server-side cursor in `EXPORT_BATCH_SIZE` partitions, so memory stays
+        at one batch regardless of table size.
+        """
+        batch_size = max(1, settings.EXPORT_BATCH_SIZE)
+        session = session_factory()
+        try:
+            result = session.execute(
+                cls._statement(employee_id, start, end),
+                execution_options={"stream_results": True, "yield_per": batch_size},
+            )
+            if fmt == "csv":
+                yield cls._csv_line(cls.COLUMNS)
+            for partition in result.partitions():
+                if fmt == "csv":
+                    yield "".join(cls._csv_line(row) for row in partition)
+                else:
+                    yield "".join(
+                        json.dumps(dict(zip(cls.COLUMNS, row)), default=cls._json_default) + "\n"
+                        for row in partition
+                    )
+        finally:
+            session.close()
+
+
+# =====================================================
+# PAYROLL RUN SERVICE (BULK SALARY)
+# =====================================================
+class PayrollRunService:
+
+    @staticmethod
+    def run(db: Session, items: List[dict], description: str, commit: bool = True) -> dict:
+        """
+        Pay many employees in a single database transaction.
+
+        `items` is a list of {"employee_id", "amount"} dicts. Employees are
+        loaded in one query, tax is computed for the whole batch, the treasury
+        is checked once and all Transaction rows are inserted with one
+        executemany. Rows that cannot be paid (unknown employee, inactive
+        stream, non-positive amount) are skipped and reported; if the treasury
+        cannot cover the total net the whole run is rejected, as is a run
+        that lists an employee more than once.
+        """
+        if not items:
+            raise HTTPException(status_code=400, detail="Payroll run has no items")
+
+        employee_ids = {item["employee_id"] for item in items}
+        if len(employee_ids) != len(items):
+            counts = Counter(item["employee_id"] for item in items)
+            duplicates = sorted(employee_id for employee_id, n in counts.items() if n > 1)
+            raise HTTPException(status_code=422, detail=f"Employees listed more than once: {duplicates}")
+        employees = {
+            e.id: e
+            for e in db.query(Employee).filter(Employee.id.in_(employee_ids)).all()
+        }
+
+        results = []
+        payable = []
+        for item in items:
+            employee_id = item["employee_id"]
+            gross_amount = item["amount"]
+            employee = employees.get(employee_id)
+
+            detail = None
+            if not employee:
+                detail = "Employee not found"
+            elif not employee.is_streaming:
+                detail = "Stream is not active"
+            elif gross_amount.cents <= 0:
+                detail = "Amount must be positive"
+
+            result = {
+                "employee_id": employee_id,
+                "status": "skipped" if detail else "paid",
+                "gross_amount": gross_amount,
+                "amount": None,
+                "tax_amount": None,
+                "detail": detail,
+            }
+            results.append(result)
+            if not detail:
+                payable.append((result, employee, gross_amount))
+
+        taxes = TaxService.calculate_tax_batch(
+            db,
+            [employee for _, employee, _ in payable],
+            [gross_amount for _, _, gross_amount in payable],
+        )
+
+        gross_cents = [gross_amount.cents for _, _, gross_amount in payable]
+        tax_cents = [tax_amount.cents for tax_amount in taxes]
+        net_cents = money.net_batch(gross_cents, tax_cents)
+
+        now = datetime.utcnow()
+        rows = []
+        for (result, employee, _), net, tax in zip(payable, net_cents, tax_cents):
+            result["amount"] = Money(net)
+            result["tax_amount"] = Money(tax)
+            rows.append({
+                "employee_id": employee.id,
+                "amount": result["amount"].to_decimal(),
+                "tax_amount": result["tax_amount"].to_decimal(),
+                "description": description,
+                "timestamp": now,
+            })
+        total_net = Money(sum(net_cents))
+        total_tax = Money(sum(tax_cents))
+
+        if rows:
+            TreasuryService.debit(db, total_net)
+            LedgerService.record_many(db, "salary", rows)
+            db.execute(insert(Transaction), rows)
+            DashboardCounterService.apply(db, net=total_net, tax=total_tax, count=len(rows))
+            RollupService.apply(db, [
+                (employee.id, now, result["amount"], result["tax_amount"])
+                for result, employee, _ in payable
+            ])
+            _finish(db, commit)
+
+        return {
+            "paid_count": len(rows),
+            "skipped_count": len(results) - len(rows),
+            "total_net": total_net,
+            "total_tax": total_tax,
+            "results": results,
+        }
+
+
 # =====================================================
 # BONUS SERVICE
 # =====================================================
 class BonusService:
 
     @staticmethod
-    def give_bonus(db: Session, employee_id: int, gross_amount: float, reason: str):
+    def give_bonus(db: Session, employee_id: int, gross_amount: Money, reason: str, commit: bool = True):
 
-        if gross_amount <= 0:
+        if gross_amount.cents <= 0:
             raise HTTPException(status_code=400, detail="Bonus must be positive")
 
         employee = db.query(Employee).filter(Employee.id == employee_id).first()
         if not employee:
             raise HTTPException(status_code=404, detail="Employee not found")
 
-        treasury = TreasuryService.get_or_create(db)
-
         tax_amount = TaxService.calculate_tax(db, employee, gross_amount)
         net_amount = gross_amount - tax_amount
 
-        net_amt_dec = _to_decimal(net_amount)
-        tax_amt_dec = _to_decimal(tax_amount)
-        treasury_balance = _to_decimal(treasury.total_balance)
-
-        if treasury_balance < net_amt_dec:
-            raise HTTPException(status_code=400, detail="Insufficient treasury funds")
+        net_amt_dec = net_amount.to_decimal()
+        tax_amt_dec = tax_amount.to_decimal()
 
-        treasury.total_balance = treasury_balance - net_amt_dec
+        TreasuryService.debit(db, net_amount)
+        LedgerService.record(db, "bonus", net_amt_dec, employee_id=employee_id, description=reason)
 
         bonus = Bonus(
             employee_id=employee_id,
-            amount=_to_decimal(gross_amount),
+            amount=gross_amount.to_decimal(),
             reason=reason
         )
 
+        now = datetime.utcnow()
         transaction = Transaction(
             employee_id=employee_id,
             amount=net_amt_dec,
             tax_amount=tax_amt_dec,
-            description=f"Bonus: {reason}"
+            description=f"Bonus: {reason}",
+            timestamp=now,
         )
 
         db.add(bonus)
         db.add(transaction)
+        DashboardCounterService.apply(db, net=net_amount, tax=tax_amount, count=1)
+        RollupService.apply(db, [(employee_id, now, net_amount, tax_amount)])
 
-        db.commit()
-        db.refresh(bonus)
+        _finish(db, commit, bonus)
 
         return bonus
 
 
+# =====================================================
+# DASHBOARD COUNTER SERVICE (INCREMENTAL AGGREGATES)
+# =====================================================
+class DashboardCounterService:
+    """
+    Keeps the single `dashboard_counters` row in step with `transactions`
+    and `employees.is_streaming`. Every writer calls `apply` inside its own
+    database transaction, so the counters commit (or roll back) together
+    with the rows they summarize, and the dashboard reads one row instead of
+    scanning history. `rebuild` recomputes everything from scratch.
+    """
+
+    COUNTERS_ID = 1
+
+    @staticmethod
+    def compute(db: Session) -> dict:
+        net, tax, count = db.query(
+            func.coalesce(func.sum(Transaction.amount), 0),
+            func.coalesce(func.sum(Transaction.tax_amount), 0),
+            func.count(Transaction.id),
+        ).one()
+        active = db.query(func.count(Employee.id)).filter(Employee.is_streaming == True).scalar() or 0
+        return {
+            "total_paid_net": Money.from_decimal(net).to_decimal(),
+            "total_tax_collected": Money.from_decimal(tax).to_decimal(),
+            "transaction_count": int(count),
+            "active_streams": int(active),
+        }
+
+    @staticmethod
+    def apply(db: Session, net: Money = Money(), tax: Money = Money(),
+              count: int = 0, active_streams: int = 0) -> None:
+        """Add deltas to the counters. The caller owns the commit."""
+        result = db.execute(
+            update(DashboardCounters)
+            .where(DashboardCounters.id == DashboardCounterService.COUNTERS_ID)
+            .values(
+                total_paid_net=DashboardCounters.total_paid_net + net.to_decimal(),
+                total_tax_collected=DashboardCounters.total_tax_collected + tax.to_decimal(),
+                transaction_count=DashboardCounters.transaction_count + count,
+                active_streams=DashboardCounters.active_streams + active_streams,
+                data_version=func.coalesce(DashboardCounters.data_version, 0) + 1,
+                updated_at=datetime.utcnow(),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            # No counters row yet: build it from the tables, including this
+            # transaction's own pending rows.
+            db.flush()
+            db.add(DashboardCounters(id=DashboardCounterService.COUNTERS_ID, **DashboardCounterService.compute(db)))
+            db.flush()
+
+    @staticmethod
+    def get(db: Session) -> DashboardCounters:
+        """
+        The counters row. Dashboard GETs run on the read replica, so a missing
+        row (migration 0008 creates it) is computed into a transient object
+        rather than written; the first `apply` persists it.
+        """
+        counters = db.get(DashboardCounters, DashboardCounterService.COUNTERS_ID)
+        if counters is None:
+            counters = DashboardCounters(
+                id=DashboardCounterService.COUNTERS_ID, data_version=0, **DashboardCounterService.compute(db)
+            )
+        return counters
+
+    @staticmethod
+    def rebuild(db: Session, write: bool = True) -> dict:
+        """
+        Recompute the counters from scratch and compare them with the stored
+        row. Returns {"expected", "stored", "drift"}; with `write` the stored
+        row is replaced by the recomputed values.
+        """
+        expected = DashboardCounterService.compute(db)
+        counters = db.get(DashboardCounters, DashboardCounterService.COUNTERS_ID)
+        stored = None
+        drift = {}
+        if counters is not None:
+            stored = {field: getattr(counters, field) for field in expected}
+            drift = {
+                field: {"stored": stored[field], "expected": value}
+                for field, value in expected.items()
+                if stored[field] != value
+            }
+
+        if write and (counters is None or drift):
+            if counters is None:
+                db.add(DashboardCounters(id=DashboardCounterService.COUNTERS_ID, data_version=1, **expected))
+            else:
+                for field, value in expected.items():
+                    setattr(counters, field, value)
+                counters.data_version = (counters.data_version or 0) + 1
+            db.commit()
+
+        return {"expected": expected, "stored": stored, "drift": drift}
+
+
+# =====================================================
+# ROLLUP SERVICE (PER-EMPLOYEE MONTHLY TOTALS)
+# =====================================================
+class RollupService:
+    """
+    Maintains `employee_monthly_rollups` alongside every Transaction insert
+    so monthly_summary and top_earners group a few rows per employee-month
+    instead of the whole transactions table.
+    """
+
+    @staticmethod
+    def month_key(value) -> str:
+        return value.strftime("%Y-%m")
+
+    @staticmethod
+    def month_expr(db: Session, column):
+        dialect = (db.bind.dialect.name if db.bind else "sqlite").lower()
+        if dialect in ("mysql", "mariadb"):
+            return func.date_format(column, "%Y-%m")
+        if dialect in ("postgresql", "postgres"):
+            return func.to_char(column, "YYYY-MM")
+        return func.strftime("%Y-%m", column)
+
+    @staticmethod
+    def apply(db: Session, payouts: List[Tuple[int, datetime, Money, Money]]) -> None:
+        """
+        Add (employee_id, timestamp, net, tax) payouts to their employee-month
+        rows with one upsert statement. The caller owns the commit.
+        """
+        totals: Dict[Tuple[int, str], List[int]] = {}
+        for employee_id, timestamp, net, tax in payouts:
+            bucket = totals.setdefault((employee_id, RollupService.month_key(timestamp)), [0, 0, 0])
+            bucket[0] += net.cents
+            bucket[1] += tax.cents
+            bucket[2] += 1
+        if not totals:
+            return
+
+        rows = [
+            {
+                "employee_id": employee_id,
+                "month": month,
+                "net": Money(net).to_decimal(),
+                "tax": Money(tax).to_decimal(),
+                "count": count,
+            }
+            for (employee_id, month), (net, tax, count) in totals.items()
+        ]
+
+        table = EmployeeMonthlyRollup.__table__
+        dialect = db.bind.dialect.name if db.bind else "sqlite"
+        if dialect in ("sqlite", "postgresql"):
+            stmt = (sqlite_insert if dialect == "sqlite" else postgresql_insert)(table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.employee_id, table.c.month],
+                set_={
+                    "net": table.c.net + stmt.excluded.net,
+                    "tax": table.c.tax + stmt.excluded.tax,
+                    "count": table.c.count + stmt.excluded.count,
+                },
+            )
+            db.execute(stmt, rows)
+        elif dialect in ("mysql", "mariadb"):
+            stmt = mysql_insert(table)
+            stmt = stmt.on_duplicate_key_update(
+                net=table.c.net + stmt.inserted.net,
+                tax=table.c.tax + stmt.inserted.tax,
+                count=table.c.count + stmt.inserted.count,
+            )
+            db.execute(stmt, rows)
+        else:
+            for row in rows:
+                result = db.execute(
+                    update(table)
+                    .where(table.c.employee_id == row["employee_id"], table.c.month == row["month"])
+                    .values(
+                        net=table.c.net + row["net"],
+                        tax=table.c.tax + row["tax"],
+                        count=table.c.count + row["count"],
+                    )
+                )
+                if result.rowcount == 0:
+                    db.execute(insert(table), [row])
+
+    @staticmethod
+    def rebuild(db: Session) -> int:
+        """Recompute every rollup row from `transactions`. Returns the number of rows written."""
+        month = func.coalesce(RollupService.month_expr(db, Transaction.timestamp), "0000-00")
+        db.query(EmployeeMonthlyRollup).delete(synchronize_session=False)
+        result = db.execute(
+            insert(EmployeeMonthlyRollup).from_select(
+                ["employee_id", "month", "net", "tax", "count"],
+                select(
+                    Transaction.employee_id,
+                    month,
+                    func.coalesce(func.sum(Transaction.amount), 0),
+                    func.coalesce(func.sum(Transaction.tax_amount), 0),
+                    func.count(Transaction.id),
+                )
+                .where(Transaction.employee_id.isnot(None))
+                .group_by(Transaction.employee_id, month),
+            )
+        )
+        DashboardCounterService.apply(db)  # bump the dashboard data version
+        db.commit()
+        return result.rowcount
+
+
 # =====================================================
 # DASHBOARD SERVICE
 # =====================================================
@@ -234,52 +1337,63 @@ class DashboardService:
 
     @staticmethod
     def total_payout(db: Session):
-        total_net = db.query(func.sum(Transaction.amount)).scalar() or 0
-        return {"total_paid_net": float(total_net)}
+        counters = DashboardCounterService.get(db)
+        return {"total_paid_net": float(counters.total_paid_net)}
 
     @staticmethod
     def total_tax_collected(db: Session):
-        total_tax = db.query(func.sum(Transaction.tax_amount)).scalar() or 0
-        return {"total_tax_collected": float(total_tax)}
+        counters = DashboardCounterService.get(db)
+        return {"total_tax_collected": float(counters.total_tax_collected)}
 
     @staticmethod
     def active_streams(db: Session):
-        count = db.query(func.count(Employee.id)) \
-                  .filter(Employee.is_streaming == True) \
-                  .scalar() or 0
-        return {"active_streams": int(count)}
+        counters = DashboardCounterService.get(db)
+        return {"active_streams": int(counters.active_streams)}
 
     @staticmethod
-    def top_earners(db: Session):
+    def top_earners(db: Session, limit: int = 10, start: Optional[date] = None, end: Optional[date] = None):
+        """Highest total net pay per employee, optionally within [start, end] (month granularity)."""
+        total_net = func.sum(EmployeeMonthlyRollup.net)
+        query = (
+            db.query(Employee.name, total_net)
+            .join(Employee, Employee.id == EmployeeMonthlyRollup.employee_id)
+        )
+        if start is not None:
+            query = query.filter(EmployeeMonthlyRollup.month >= RollupService.month_key(start))
+        if end is not None:
+            query = query.filter(EmployeeMonthlyRollup.month <= RollupService.month_key(end))
         results = (
-            db.query(Employee.name, func.sum(Transaction.amount))
-            .join(Transaction)
-            .group_by(Employee.id)
-            .order_by(func.sum(Transaction.amount).desc())
+            query.group_by(EmployeeMonthlyRollup.employee_id, Employee.name)
+            .order_by(total_net.desc())
+            .limit(limit)
             .all()
         )
 
         return [{"name": r[0], "total_net": float(r[1] or 0)} for r in results]
 
+    @staticmethod
+    def overview(db: Session, counters: DashboardCounters) -> dict:
+        """Every dashboard metric from the already-loaded counters row plus two rollup queries."""
+        return {
+            "total_paid_net": float(counters.total_paid_net),
+            "total_tax_collected": float(counters.total_tax_collected),
+            "active_streams": int(counters.active_streams),
+            "transaction_count": int(counters.transaction_count),
+            "top_earners": DashboardService.top_earners(db),
+            "monthly_summary": DashboardService.monthly_summary(db),
+            "data_version": counters.data_version or 0,
+        }
+
     @staticmethod
     def monthly_summary(db: Session):
-        dialect = (db.bind.dialect.name if db.bind else "sqlite").lower()
-        if dialect in ("sqlite"):
-            month_expr = func.strftime("%Y-%m", Transaction.timestamp)
-        elif dialect in ("mysql", "mariadb"):
-            month_expr = func.date_format(Transaction.timestamp, "%Y-%m")
-        elif dialect in ("postgresql", "postgres"):
-            month_expr = func.to_char(Transaction.timestamp, "YYYY-MM")
-        else:
-            month_expr = func.strftime("%Y-%m", Transaction.timestamp)
         results = (
             db.query(
-                month_expr.label("month"),
-                func.sum(Transaction.amount).label("income"),
-                func.sum(Transaction.tax_amount).label("tax"),
+                EmployeeMonthlyRollup.month,
+                func.sum(EmployeeMonthlyRollup.net),
+                func.sum(EmployeeMonthlyRollup.tax),
             )
-            .group_by(month_expr)
-            .order_by("month")
+            .group_by(EmployeeMonthlyRollup.month)
+            .order_by(EmployeeMonthlyRollup.month)
             .all()
         )
         out = []
@@ -301,6 +1415,81 @@ class DashboardService:
 # =====================================================
 class StreamingService:
 
+    @staticmethod
+    def _set_streaming(db: Session, employee: Employee, streaming: bool) -> None:
+        """Flip is_streaming with a conditional UPDATE so only a real change moves the counter."""
+        unchanged = Employee.is_streaming.is_(True) if not streaming else Employee.is_streaming.isnot(True)
+        result = db.execute(
+            update(Employee)
+            .where(Employee.id == employee.id, unchanged)
+            .values(is_streaming=streaming)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            DashboardCounterService.apply(db, active_streams=1 if streaming else -1)
+
+    BULK_ACTIONS = {"start": True, "pause": False, "cancel": False}
+    BULK_CHUNK_SIZE = 1000  # ids per IN (...) list
+
+    @classmethod
+    def bulk_set(cls, db: Session, action: str, employee_ids: Optional[List[int]] = None,
+                 role: Optional[str] = None, match_all: bool = False) -> dict:
+        """
+        Start/pause/cancel many streams in one transaction. Targets are either
+        explicit ids or a filter (role, or every employee); only rows whose
+        state actually changes are updated and reported, and the dashboard's
+        active_streams moves by exactly that many.
+        """
+        if action not in cls.BULK_ACTIONS:
+            raise HTTPException(status_code=400, detail="action must be start, pause or cancel")
+        streaming = cls.BULK_ACTIONS[action]
+        unchanged = Employee.is_streaming.is_(True) if not streaming else Employee.is_streaming.isnot(True)
+
+        if employee_ids is not None:
+            ids = list(dict.fromkeys(employee_ids))
+            scopes = [Employee.id.in_(ids[i:i + cls.BULK_CHUNK_SIZE])
+                      for i in range(0, len(ids), cls.BULK_CHUNK_SIZE)]
+        elif role is not None:
+            scopes = [Employee.role == role]
+        elif match_all:
+            scopes = [True]
+        else:
+            raise HTTPException(status_code=400, detail="Provide employee_ids or a filter")
+
+        affected_ids = []
+        found = set()
+        for scope in scopes:
+            rows = db.execute(
+                select(Employee.id, Employee.is_streaming).where(scope).with_for_update()
+            ).all()
+            found.update(r.id for r in rows)
+            targets = [r.id for r in rows if bool(r.is_streaming) != streaming]
+            for i in range(0, len(targets), cls.BULK_CHUNK_SIZE):
+                chunk = targets[i:i + cls.BULK_CHUNK_SIZE]
+                result = db.execute(
+                    update(Employee)
+                    .where(Employee.id.in_(chunk), unchanged)
+                    .values(is_streaming=streaming)
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount != len(chunk):
+                    # Rows are locked above, so this only trips on databases without row locks
+                    db.rollback()
+                    raise HTTPException(status_code=409, detail="Streams changed concurrently; retry")
+                affected_ids.extend(chunk)
+
+        if affected_ids:
+            delta = len(affected_ids)
+            DashboardCounterService.apply(db, active_streams=delta if streaming else -delta)
+        db.commit()
+
+        return {
+            "action": action,
+            "affected_count": len(affected_ids),
+            "affected_ids": affected_ids,
+            "not_found_ids": [i for i in ids if i not in found] if employee_ids is not None else [],
+        }
+
     @staticmethod
     def start_stream(db: Session, employee_id: int):
         employee = db.query(Employee).filter(Employee.id == employee_id).first()
@@ -308,7 +1497,7 @@ class StreamingService:
         if not employee:
             raise HTTPException(status_code=404, detail="Employee not found")
 
-        employee.is_streaming = True
+        StreamingService._set_streaming(db, employee, True)
 
         db.commit()
         db.refresh(employee)
@@ -328,7 +1517,7 @@ class StreamingService:
         if not employee:
             raise HTTPException(status_code=404, detail="Employee not found")
 
-        employee.is_streaming = False
+        StreamingService._set_streaming(db, employee, False)
 
         db.commit()
         db.refresh(employee)
@@ -347,7 +1536,7 @@ class StreamingService:
         if not employee:
             raise HTTPException(status_code=404, detail="Employee not found")
 
-        employee.is_streaming = False
+        StreamingService._set_streaming(db, employee, False)
 
         db.commit()
         db.refresh(employee)
@@ -360,6 +1549,203 @@ class StreamingService:
         }
 
 
+# =====================================================
+# IDEMPOTENCY SERVICE (SAFE RETRIES)
+# =====================================================
+class IdempotencyService:
+    """
+    `Idempotency-Key` support for payout POSTs.
+
+    The first request with a key reserves it in `idempotency_keys` (unique
+    index, so concurrent duplicates collide), runs, and stores its JSON
+    response. Replays with the same request fingerprint get that response
+    back without running the handler; a different payload under the same
+    key is rejected. The handler is called with `commit=False`, so the
+    services only flush, and the response is written to the key row in that
+    same transaction: the payout and its stored response commit together or
+    not at all. A request
+    that fails before that commit releases the key so it can be retried.
+
+    A running request holds the key on a lease (`locked_until`); retries
+    within it get 409. A request that outlives its lease, typically because
+    its worker died, is taken over by the next retry, and the late holder
+    stores nothing: every write to the key row is fenced on the holder's
+    own lease, so exactly one of them commits.
+    Completed responses are also kept in a small per-process LRU so hot
+    retries skip the database entirely.
+    """
+
+    _cache: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (fingerprint, body, expires_at)
+    _lock = threading.Lock()
+    _begins = 0
+
+    PURGE_EVERY = 500
+
+    @staticmethod
+    def _hash(value: str) -> str:
+        return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def fingerprint(request_signature: Any) -> str:
+        return IdempotencyService._hash(json.dumps(jsonable_encoder(request_signature), sort_keys=True, separators=(",", ":")))
+
+    @classmethod
+    def _cache_get(cls, key: str):
+        with cls._lock:
+            entry = cls._cache.get(key)
+            if entry is None:
+                return None
+            if entry[2] <= datetime.utcnow():
+                del cls._cache[key]
+                return None
+            cls._cache.move_to_end(key)
+            return entry
+
+    @classmethod
+    def _cache_put(cls, key: str, fingerprint: str, body: Any, expires_at: datetime) -> None:
+        with cls._lock:
+            cls._cache[key] = (fingerprint, body, expires_at)
+            cls._cache.move_to_end(key)
+            while len(cls._cache) > settings.IDEMPOTENCY_CACHE_SIZE:
+                cls._cache.popitem(last=False)
+
+    @staticmethod
+    def _conflict(fingerprint: str, stored_fingerprint: str) -> None:
+        if fingerprint != stored_fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+
+    @staticmethod
+    def _lease(now: datetime) -> datetime:
+        # Whole seconds, so the fencing comparison survives DATETIME columns without fractions
+        return now.replace(microsecond=0) + timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS)
+
+    @staticmethod
+    def _held(key: str, lease: datetime):
+        """Filter for the key row while it is still in progress under `lease`."""
+        return and_(
+            IdempotencyKey.key == key,
+            IdempotencyKey.status_code.is_(None),
+            IdempotencyKey.locked_until == lease,
+        )
+
+    @classmethod
+    def _reserve(cls, db: Session, key: str, fingerprint: str) -> Tuple[Any, Optional[datetime]]:
+        """
+        Reserve `key` and return `(None, lease)`, or `(body, None)` with the
+        stored response body if it already completed.
+        """
+        now = datetime.utcnow()
+        lease = cls._lease(now)
+
+        cls._begins += 1
+        if cls._begins % cls.PURGE_EVERY == 0:
+            db.query(IdempotencyKey).filter(IdempotencyKey.expires_at <= now).delete(synchronize_session=False)
+            db.commit()
+
+        for _ in range(2):
+            db.add(IdempotencyKey(
+                key=key,
+                fingerprint=fingerprint,
+                locked_until=lease,
+                expires_at=now + timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS),
+            ))
+            try:
+                db.commit()
+                return None, lease
+            except IntegrityError:
+                db.rollback()
+
+            existing = db.query(IdempotencyKey).filter(IdempotencyKey.key == key).first()
+            if existing is None:
+                continue
+            if existing.expires_at <= now:
+                db.delete(existing)
+                db.commit()
+                continue
+
+            cls._conflict(fingerprint, existing.fingerprint)
+            if existing.status_code is None:
+                # Conditional on the lease having run out, so of several
+                # retries racing for an abandoned key only one gets it
+                taken = db.query(IdempotencyKey).filter(
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.status_code.is_(None),
+                    or_(IdempotencyKey.locked_until.is_(None), IdempotencyKey.locked_until <= now),
+                ).update({IdempotencyKey.locked_until: lease}, synchronize_session=False)
+                db.commit()
+                if taken == 1:
+                    return None, lease
+                raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+            body = json.loads(existing.response_body)
+            cls._cache_put(key, existing.fingerprint, body, existing.expires_at)
+            return body, None
+
+        raise HTTPException(status_code=409, detail="Could not reserve Idempotency-Key, retry the request")
+
+    @classmethod
+    def execute(cls, db: Session, idempotency_key: Optional[str], scope: str,
+                request_signature: Any, handler: Callable[..., Any]) -> Any:
+        """
+        Run `handler` at most once per (scope, idempotency_key) and return its
+        JSON-ready result. `handler` takes a `commit` keyword: True when it
+        runs on its own, False under a key, where this commits for it.
+        """
+        if not idempotency_key:
+            return handler(commit=True)
+
+        key = cls._hash(f"{scope}:{idempotency_key}")
+        fingerprint = cls.fingerprint(request_signature)
+
+        cached = cls._cache_get(key)
+        if cached is not None:
+            cls._conflict(fingerprint, cached[0])
+            return cached[1]
+
+        stored, lease = cls._reserve(db, key, fingerprint)
+        if lease is None:
+            return stored
+
+        try:
+            body = jsonable_encoder(handler(commit=False), custom_encoder={Money: str})
+            expires_at = db.query(IdempotencyKey.expires_at).filter(IdempotencyKey.key == key).scalar()
+            fenced = db.query(IdempotencyKey).filter(cls._held(key, lease)).update(
+                {IdempotencyKey.status_code: 200, IdempotencyKey.response_body: json.dumps(body)},
+                synchronize_session=False,
+            )
+        except Exception:
+            cls._release(db, key, lease)
+            raise
+        if fenced != 1:
+            # The lease ran out and a retry took the key over; it owns the payout now
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Idempotency-Key lease expired before the request finished")
+
+        try:
+            db.commit()
+        except Exception:
+            # The COMMIT may have landed even though it reported an error
+            # (e.g. the connection dropped on the way back); only release a
+            # key whose response row is provably not there
+            db.rollback()
+            stored = db.query(IdempotencyKey.response_body).filter(
+                IdempotencyKey.key == key, IdempotencyKey.status_code.isnot(None)
+            ).scalar()
+            if stored is None:
+                cls._release(db, key, lease)
+                raise
+            body = json.loads(stored)
+
+        cls._cache_put(key, fingerprint, body, expires_at)
+        return body
+
+    @classmethod
+    def _release(cls, db: Session, key: str, lease: datetime) -> None:
+        """Undo everything the handler did and free `key` for a retry, unless it was taken over."""
+        db.rollback()
+        db.query(IdempotencyKey).filter(cls._held(key, lease)).delete(synchronize_session=False)
+        db.commit()
+
+
 # =====================================================
 # BLOCKCHAIN TX SERVICE (On-chain status tracking)
 # =====================================================
@@ -0,0 +1,180 @@
+"""
+Route class that owns how sync handlers use their database session.
+
+Routers opt in with `APIRouter(route_class=SessionRoute)`. It applies to sync
+handlers that take `session: Session = Depends(db.get_db)` (primary) or
+`Depends(db.get_read_db)` (replica when configured):
+
+* Sync mode: the handler's result is run through its response model and the
+  session is closed on the worker thread before returning. FastAPI validates
+  sync responses on a second threadpool hop, so otherwise every finished
+  request keeps a pooled connection while it queues for a thread. Under a
+  burst the threads then wait on connections held by requests that are in
+  turn waiting for threads, until the pool times out.
+* Async mode (DATABASE_ASYNC): the handler is served by an async endpoint
+  that opens an AsyncSession and runs the unchanged handler through
+  `AsyncSession.run_sync`. Its database I/O is awaited on the event loop via
+  the async driver instead of blocking a threadpool thread, so request
+  concurrency is bounded by the connection pool, not the ~40 workers.
+"""
+import functools
+import inspect
+import math
+from typing import Any, Callable, Optional
+
+from fastapi import Depends, params
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import Response
+
+from config import settings
+from database import ReadPins, db
+import profiler
+
+
+# Sync session dependency -> its AsyncSession counterpart
+ASYNC_SESSION_DEPENDENCIES = {
+    db.get_db: db.get_async_db,
+    db.get_read_db: db.get_async_read_db,
+}
+
+
+def _session_params(endpoint: Callable) -> dict:
+    """Parameter name -> sync session dependency, for every session the handler takes."""
+    return {
+        name: param.default.dependency
+        for name, param in inspect.signature(endpoint).parameters.items()
+        if isinstance(param.default, params.Depends) and param.default.dependency in ASYNC_SESSION_DEPENDENCIES
+    }
+
+
+def _response_adapter(response_model: Any) -> Optional[Callable]:
+    if response_model is None:
+        return None
+    adapter = TypeAdapter(response_model)
+
+    def apply(result):
+        if isinstance(result, Response):
+            return result
+        return adapter.validate_python(result, from_attributes=True)
+
+    return apply
+
+
+def release_session_endpoint(endpoint: Callable, response_model: Any = None) -> Callable:
+    """Sync mode: materialize the response and close the session while still on the worker thread."""
+    session_names = _session_params(endpoint)
+    apply_model = _response_adapter(response_model)
+
+    @functools.wraps(endpoint)
+    def endpoint_released(**kwargs):
+        try:
+            with profiler.track_thread():
+                result = endpoint(**kwargs)
+                return apply_model(result) if apply_model else result
+        finally:
+            for name in session_names:
+                kwargs[name].close()
+
+    endpoint_released.__signature__ = inspect.signature(endpoint)
+    return endpoint_released
+
+
+def run_sync_endpoint(endpoint: Callable, response_model: Any = None) -> Callable:
+    """
+    Async mode: async stand-in for a sync handler. Its signature swaps each
+    sync session dependency for its async counterpart, so FastAPI injects
+    an AsyncSession. The response model is applied inside `run_sync`, so lazy
+    loads and post-commit refreshes happen while the sync bridge is active.
+    """
+    session_names = _session_params(endpoint)
+    signature = inspect.signature(endpoint)
+    async_signature = signature.replace(parameters=[
+        param.replace(annotation=AsyncSession, default=Depends(ASYNC_SESSION_DEPENDENCIES[session_names[name]]))
+        if name in session_names else param
+        for name, param in signature.parameters.items()
+    ])
+    apply_model = _response_adapter(response_model)
+
+    @functools.wraps(endpoint)
+    async def endpoint_async(**kwargs):
+        names = list(session_names)
+        async_sessions = [kwargs[name] for name in names]
+
+        def call(sync_session):
+            # run_sync bridges one session; any other injected session is
+            # used through its own sync facade (same greenlet context)
+            kwargs[names[0]] = sync_session
+            for name, async_session in zip(names[1:], async_sessions[1:]):
+                kwargs[name] = async_session.sync_session
+            result = endpoint(**kwargs)
+            return apply_model(result) if apply_model else result
+
+        return await async_sessions[0].run_sync(call)
+
+    endpoint_async.__signature__ = async_signature
+    return endpoint_async
+
+
+class SessionRoute(APIRoute):
+    """APIRoute that manages the database session of sync, session-using handlers."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        if not inspect.iscoroutinefunction(endpoint) and _session_params(endpoint):
+            response_model = kwargs.get("response_model")
+            if isinstance(response_model, DefaultPlaceholder):
+                response_model = None
+            wrap = run_sync_endpoint if db.is_async else release_session_endpoint
+            endpoint = wrap(endpoint, response_model)
+        super().__init__(path, endpoint, **kwargs)
+
+
+class ReadYourWritesMiddleware:
+    """
+    Pure ASGI middleware: after a successful non-GET request, pin that
+    client's reads to the primary for READ_YOUR_WRITES_SECONDS (see
+    ReadPins), both in this worker and through a signed X-Primary-Until
+    header and cookie that any worker accepts. A no-op when no replicas
+    are configured.
+    """
+
+    SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] in self.SAFE_METHODS
+            or not (len(db.replicas) or len(db.async_replicas))
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        authorization = next(
+            (value.decode("latin-1") for key, value in scope["headers"] if key == b"authorization"),
+            None,
+        )
+        key = ReadPins.key_for(authorization)
+
+        async def send_pinning(message):
+            if key and message["type"] == "http.response.start" and message["status"] < 400:
+                db.read_pins.pin(key)
+                token = ReadPins.issue(key)
+                if token:
+                    max_age = int(math.ceil(settings.READ_YOUR_WRITES_SECONDS))
+                    cookie = f"{ReadPins.COOKIE}={token}; Max-Age={max_age}; Path=/; HttpOnly; SameSite=Lax"
+                    message = {
+                        **message,
+                        "headers": [
+                            *message.get("headers", []),
+                            (ReadPins.HEADER.encode("latin-1"), token.encode("latin-1")),
+                            (b"set-cookie", cookie.encode("latin-1")),
+                        ],
+                    }
+            await send(message)
+
+        await self.app(scope, receive, send_pinning)
@@ -0,0 +1,122 @@
+"""
+Small in-process measurement helpers shared by the pools and caches.
+"""
+import threading
+from collections import deque
+from typing import Optional
+
+
+def route_template(scope) -> Optional[str]:
+    """
+    Path template of the route that served an ASGI request (e.g.
+    "/api/employees/{employee_id}"), or None if nothing matched. Newer
+    FastAPI leaves the router's own, unprefixed route in scope["route"] and
+    keeps the full template on its effective route context.
+    """
+    context = (scope.get("fastapi") or {}).get("effective_route_context")
+    template = getattr(context, "path_format", None)
+    if template:
+        return template
+    return getattr(scope.get("route"), "path", None)
+
+
+class LatencyWindow:
+    """Rolling window of the most recent latency samples (ms) with percentile snapshots."""
+
+    def __init__(self, maxlen: int = 2048):
+        self._samples: deque = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def record(self, elapsed_ms: float) -> None:
+        with self._lock:
+            self._samples.append(elapsed_ms)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            samples = sorted(self._samples)
+
+        def percentile(p: float) -> Optional[float]:
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))], 2)
+
+        return {
+            "samples": len(samples),
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "max": round(samples[-1], 2) if samples else None,
+        }
+
+
+class LatencyHistogram:
+    """
+    HDR-style log-linear histogram of latencies, recorded in microseconds.
+
+    Values below 2 * SUB_BUCKETS us get one bucket each; above that every
+    power of two is split into SUB_BUCKETS equal buckets, so any recorded
+    value is reported within ~1/SUB_BUCKETS (about 6%) of its true value
+    from a few hundred counters at most, however long it runs.
+    Percentiles report the top of the bucket, i.e. they never understate.
+    """
+
+    SUB_BUCKET_BITS = 4
+    SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+    def __init__(self):
+        self._counts: dict = {}
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+
+    @classmethod
+    def _index(cls, value: int) -> int:
+        if value < 2 * cls.SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - cls.SUB_BUCKET_BITS - 1
+        return cls.SUB_BUCKETS * shift + (value >> shift)
+
+    @classmethod
+    def _upper(cls, index: int) -> int:
+        if index < 2 * cls.SUB_BUCKETS:
+            return index
+        shift = index // cls.SUB_BUCKETS - 1
+        sub = index % cls.SUB_BUCKETS + cls.SUB_BUCKETS
+        return ((sub + 1) << shift) - 1
+
+    def record(self, elapsed_ms: float) -> None:
+        value = int(elapsed_ms * 1000)
+        index = self._index(value)
+        with self._lock:
+            self._counts[index] = self._counts.get(index, 0) + 1
+            self.count += 1
+            self.total_us += value
+            if value > self.max_us:
+                self.max_us = value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = sorted(self._counts.items())
+            count, total_us, max_us = self.count, self.total_us, self.max_us
+
+        def percentile(p: float) -> Optional[float]:
+            if not count:
+                return None
+            rank = max(1, int(p * count + 0.5))
+            seen = 0
+            for index, n in counts:
+                seen += n
+                if seen >= rank:
+                    return round(min(self._upper(index), max_us) / 1000, 3)
+            return round(max_us / 1000, 3)
+
+        return {
+            "count": count,
+            "total_ms": round(total_us / 1000, 3),
+            "mean_ms": round(total_us / count / 1000, 3) if count else None,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(max_us / 1000, 3) if count else None,
+        }
@@ -0,0 +1,122 @@
+"""
+Payout POSTs with an Idempotency-Key run at most once: a replay gets the
+stored response, a different payload under the key is a 422, a request
+that fails frees the key for a retry, and a key whose holder died (its
+lease ran out) is taken over by the next retry.
+"""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import db
+from models import IdempotencyKey
+from service import IdempotencyService
+
+EMPLOYER = "employer@test.com"
+
+
+@pytest.fixture
+def key() -> str:
+    return f"test-{uuid.uuid4()}"
+
+
+@pytest.fixture(autouse=True)
+def streaming_employee(client, employer_headers):
+    response = client.post("/api/stream/start/1", headers=employer_headers)
+    assert response.status_code == 200, response.text
+
+
+def _balance(client, headers) -> float:
+    response = client.get("/api/treasury", headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()["total_balance"]
+
+
+def _pay(client, headers, key: str, amount: str = "10.00"):
+    return client.post(
+        "/api/transactions/",
+        json={"employee_id": 1, "amount": amount, "description": "idempotency test"},
+        headers={**headers, "Idempotency-Key": key},
+    )
+
+
+def _key_row(key: str):
+    session = db.SessionLocal()
+    try:
+        return session.query(IdempotencyKey).filter(
+            IdempotencyKey.key == IdempotencyService._hash(f"{EMPLOYER}:{key}")
+        ).one_or_none()
+    finally:
+        session.close()
+
+
+def _set_in_progress(key: str, locked_until: datetime) -> None:
+    session = db.SessionLocal()
+    try:
+        session.query(IdempotencyKey).filter(
+            IdempotencyKey.key == IdempotencyService._hash(f"{EMPLOYER}:{key}")
+        ).update({
+            IdempotencyKey.status_code: None,
+            IdempotencyKey.response_body: None,
+            IdempotencyKey.locked_until: locked_until,
+        }, synchronize_session=False)
+        session.commit()
+    finally:
+        session.close()
+    IdempotencyService._cache.clear()
+
+
+def test_replay_returns_stored_response_without_paying_again(client, employer_headers, key):
+    first = _pay(client, employer_headers, key)
+    assert first.status_code == 200, first.text
+    balance = _balance(client, employer_headers)
+
+    cached = _pay(client, employer_headers, key)
+    IdempotencyService._cache.clear()
+    stored = _pay(client, employer_headers, key)
+
+    assert cached.json() == first.json()
+    assert stored.status_code == 200
+    assert stored.json() == first.json()
+    assert _balance(client, employer_headers) == balance
+
+
+def test_different_payload_under_same_key_is_rejected(client, employer_headers, key):
+    assert _pay(client, employer_headers, key, "10.00").status_code == 200
+    balance = _balance(client, employer_headers)
+
+    response = _pay(client, employer_headers, key, "11.00")
+
+    assert response.status_code == 422
+    assert _balance(client, employer_headers) == balance
+
+
+def test_failed_request_releases_key(client, employer_headers, key):
+    balance = _balance(client, employer_headers)
+    too_much = f"{balance * 2 + 1000:.2f}"  # the net after tax still exceeds the balance
+
+    failed = _pay(client, employer_headers, key, too_much)
+
+    assert failed.status_code == 400, failed.text
+    assert _key_row(key) is None
+    assert _balance(client, employer_headers) == balance
+
+    deposit = client.post("/api/treasury/deposit", json={"amount": too_much}, headers=employer_headers)
+    assert deposit.status_code == 200, deposit.text
+    retried = _pay(client, employer_headers, key, too_much)
+    assert retried.status_code == 200, retried.text
+
+
+def test_in_progress_key_is_409_until_its_lease_runs_out(client, employer_headers, key):
+    first = _pay(client, employer_headers, key)
+    assert first.status_code == 200, first.text
+
+    _set_in_progress(key, datetime.utcnow() + timedelta(minutes=5))
+    assert _pay(client, employer_headers, key).status_code == 409
+
+    _set_in_progress(key, datetime.utcnow() - timedelta(seconds=1))
+    taken_over = _pay(client, employer_headers, key)
+
+    assert taken_over.status_code == 200, taken_over.text
+    assert _key_row(key).status_code == 200
@@ -0,0 +1,86 @@
+"""
+Money carries whole cents. Request input is parsed by the pydantic schema,
+which rejects sub-cent digits instead of rounding them, and arithmetic
+stays in integers with half-up rounding only where tax is taken.
+"""
+from decimal import Decimal
+
+import pytest
+from pydantic import ValidationError
+
+import money
+from money import Money
+from schemas import TransactionCreate
+
+
+def _parse(amount) -> Money:
+    return TransactionCreate(employee_id=1, amount=amount, description="test").amount
+
+
+@pytest.mark.parametrize("amount, cents", [
+    ("10", 1000),
+    ("10.5", 1050),
+    ("10.50", 1050),
+    ("10.500", 1050),
+    ("0.01", 1),
+    ("-3.25", -325),
+    ("1e2", 10000),
+    (7, 700),
+    (10.07, 1007),
+    (Decimal("99999999.99"), 9999999999),
+])
+def test_parses_to_whole_cents(amount, cents):
+    assert _parse(amount).cents == cents
+
+
+@pytest.mark.parametrize("amount", ["10.005", "0.001", 1.005, "NaN", "inf", "ten"])
+def test_rejects_sub_cent_and_non_numeric_input(amount):
+    with pytest.raises(ValidationError):
+        _parse(amount)
+
+
+def test_json_round_trip_keeps_two_places():
+    parsed = TransactionCreate.model_validate_json('{"employee_id": 1, "amount": "12.30", "description": "x"}')
+
+    assert parsed.amount == Money(1230)
+    assert parsed.model_dump(mode="json")["amount"] == "12.30"
+
+
+def test_from_decimal_rounds_aggregates_half_up():
+    assert Money.from_decimal(Decimal("0.005")) == Money(1)
+    assert Money.from_decimal(Decimal("-0.005")) == Money(-1)
+    assert Money.from_decimal(0.1 + 0.2) == Money(30)
+
+
+def test_arithmetic_and_ordering():
+    a, b = Money(1050), Money(325)
+
+    assert a + b == Money(1375)
+    assert a - b == Money(725)
+    assert -b == Money(-325)
+    assert b < a and a > b and a >= Money(1050) and b <= Money(325)
+    assert str(a - b) == "7.25"
+    assert float(a) == 10.5
+    assert {Money(5), Money(5)} == {Money(5)}
+
+
+@pytest.mark.parametrize("cents, rate_bp, tax", [
+    (1000, 1000, 100),     # 10% of 10.00
+    (5, 1000, 1),          # 0.005 rounds half-up
+    (4, 1000, 0),
+    (-5, 1000, -1),        # half away from zero for refunds
+    (333, 1250, 42),       # 12.5% of 3.33 = 0.41625
+])
+def test_tax_rounds_half_away_from_zero(cents, rate_bp, tax):
+    assert Money(cents).tax(rate_bp) == Money(tax)
+    assert money.tax_batch([cents], rate_bp) == [tax]
+
+
+def test_rate_to_bp():
+    assert money.rate_to_bp(10) == 1000
+    assert money.rate_to_bp(Decimal("12.5")) == 1250
+    assert money.rate_to_bp("0.015") == 2
+
+
+def test_net_batch():
+    assert money.net_batch([1000, 333], [100, 42]) == [900, 291]
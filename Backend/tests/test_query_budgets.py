@@ -0,0 +1,90 @@
+"""
+Every read route declares how many queries it may run (`x-query-budget` in
+its OpenAPI extra, see api_routes._budget). This runs each of them against
+SQLite with a before_cursor_execute counter and fails if one goes over, so
+an N+1 or a stray lazy load cannot ship unnoticed.
+"""
+import contextlib
+
+import pytest
+from sqlalchemy import event
+
+from database import db
+from main import app
+from service import BlockchainTxService
+
+TX_HASH = "0x" + "ab" * 32
+PATH_PARAMS = {"employee_id": 1, "tx_hash": TX_HASH}
+
+# Read from the published schema, so the documented budget is the one enforced
+BUDGETED_ROUTES = sorted(
+    (path, operations["get"]["x-query-budget"])
+    for path, operations in app.openapi()["paths"].items()
+    if "x-query-budget" in operations.get("get", {})
+)
+
+
+@contextlib.contextmanager
+def counted_queries():
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", count)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+
+
+@pytest.fixture(scope="module")
+def payroll_data(client, employer_headers):
+    """A few streaming employees with several payouts each, so list routes return many rows."""
+    employee_ids = [1, 2]
+    for i in range(3):
+        response = client.post(
+            "/api/employees/",
+            json={"name": f"Budget {i}", "email": f"budget{i}@test.com", "role": "Developer"},
+            headers=employer_headers,
+        )
+        assert response.status_code == 200, response.text
+        employee_ids.append(response.json()["id"])
+
+    for employee_id in employee_ids:
+        client.post(f"/api/stream/start/{employee_id}", headers=employer_headers)
+        for amount in ("100", "250", "75.50"):
+            response = client.post(
+                "/api/transactions/",
+                json={"employee_id": employee_id, "amount": amount, "description": "budget"},
+                headers=employer_headers,
+            )
+            assert response.status_code == 200, response.text
+
+    session = db.SessionLocal()
+    try:
+        BlockchainTxService.upsert_tx(session, TX_HASH, "salary")
+    finally:
+        session.close()
+
+
+def test_read_routes_declare_budgets():
+    assert len(BUDGETED_ROUTES) >= 15
+
+
+@pytest.mark.parametrize("path,budget", BUDGETED_ROUTES, ids=[path for path, _ in BUDGETED_ROUTES])
+def test_route_stays_within_query_budget(client, payroll_data, employer_headers, employee_headers, path, budget):
+    url = path.format(**PATH_PARAMS)
+    headers = employee_headers if path.startswith("/api/me/") else employer_headers
+
+    # The first call warms the auth cache, whose lookup the budget excludes
+    warm = client.get(url, headers=headers)
+    assert warm.status_code == 200, warm.text
+
+    with counted_queries() as statements:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.text
+
+    assert len(statements) <= budget, (
+        f"{path} ran {len(statements)} queries, budget is {budget}:\n" + "\n".join(statements)
+    )
@@ -0,0 +1,36 @@
+"""
+POST /api/stream/bulk must never widen to every employee by accident: an
+empty filter is rejected, and matching everyone takes an explicit
+`"all": true`.
+"""
+import pytest
+
+
+def _streaming(client, headers) -> dict:
+    response = client.get("/api/employees/", headers=headers)
+    assert response.status_code == 200, response.text
+    return {e["id"]: e["is_streaming"] for e in response.json()}
+
+
+@pytest.mark.parametrize("body", [
+    {"action": "cancel", "filter": {}},
+    {"action": "cancel", "filter": {"role": None}},
+    {"action": "cancel"},
+    {"action": "cancel", "all": False},
+    {"action": "cancel", "filter": {"role": "Developer"}, "all": True},
+    {"action": "cancel", "employee_ids": [1], "all": True},
+])
+def test_ambiguous_targets_are_rejected(client, employer_headers, body):
+    before = _streaming(client, employer_headers)
+
+    response = client.post("/api/stream/bulk", json=body, headers=employer_headers)
+
+    assert response.status_code == 400, response.text
+    assert _streaming(client, employer_headers) == before
+
+
+def test_explicit_all_targets_every_employee(client, employer_headers):
+    response = client.post("/api/stream/bulk", json={"action": "start", "all": True}, headers=employer_headers)
+
+    assert response.status_code == 200, response.text
+    assert all(_streaming(client, employer_headers).values())
@@ -0,0 +1,95 @@
+"""
+TaxBracketIndex is marginal: each slab taxes only the part of the gross
+inside [min_income, max_income), so the tax is continuous across bracket
+edges. These pin the edges, gaps and overlaps against a plain Decimal
+reference.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+import pytest
+
+from models import TaxSlab
+from money import Money
+from service import TaxBracketIndex
+
+CENT = Decimal("0.01")
+
+SLABS = [
+    ("0", "10000", "0"),
+    ("10000", "40000", "10"),
+    ("40000", "100000", "20"),
+    ("100000", None, "30"),
+]
+
+
+def _slabs(rows):
+    return [
+        TaxSlab(
+            min_income=Decimal(low),
+            max_income=Decimal(high) if high is not None else None,
+            tax_rate=Decimal(rate),
+        )
+        for low, high, rate in rows
+    ]
+
+
+def _reference(rows, gross: Decimal) -> Decimal:
+    tax = Decimal(0)
+    for low, high, rate in rows:
+        top = gross if high is None else min(gross, Decimal(high))
+        if top > Decimal(low):
+            tax += (top - Decimal(low)) * Decimal(rate) / 100
+    return tax.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+@pytest.mark.parametrize("gross, expected", [
+    ("0", "0.00"),
+    ("10000.00", "0.00"),
+    ("10000.01", "0.00"),
+    ("10000.05", "0.01"),  # 0.005 rounds half-up
+    ("40000.00", "3000.00"),
+    ("40000.01", "3000.00"),
+    ("100000.00", "15000.00"),
+    ("100000.01", "15000.00"),
+    ("250000.00", "60000.00"),
+])
+def test_tax_at_bracket_edges(gross, expected):
+    index = TaxBracketIndex(_slabs(SLABS))
+
+    assert index.tax(Money.from_decimal(Decimal(gross))) == Money.from_decimal(Decimal(expected))
+
+
+def test_batch_matches_reference_around_every_edge():
+    index = TaxBracketIndex(_slabs(SLABS))
+    grosses = [
+        Decimal(low) + Decimal(delta) / 100
+        for low, _, _ in SLABS
+        for delta in range(-3, 4)
+        if Decimal(low) + Decimal(delta) / 100 >= 0
+    ]
+
+    taxes = index.tax_batch([Money.from_decimal(g).cents for g in grosses])
+
+    assert [Money(t).to_decimal() for t in taxes] == [_reference(SLABS, g) for g in grosses]
+
+
+def test_gap_between_slabs_is_untaxed():
+    rows = [("0", "1000", "10"), ("2000", None, "20")]
+    index = TaxBracketIndex(_slabs(rows))
+
+    assert index.tax(Money.from_decimal(Decimal("1500"))) == Money.from_decimal(Decimal("100.00"))
+    assert index.tax(Money.from_decimal(Decimal("2000"))) == Money.from_decimal(Decimal("100.00"))
+    assert index.tax(Money.from_decimal(Decimal("3000"))) == Money.from_decimal(Decimal("300.00"))
+
+
+def test_overlapping_slab_is_clipped_to_previous_upper_bound():
+    index = TaxBracketIndex(_slabs([("0", "1000", "10"), ("500", "2000", "20")]))
+
+    # 1000 at 10% plus 500 at 20%: the second slab starts where the first ends
+    assert index.tax(Money.from_decimal(Decimal("1500"))) == Money.from_decimal(Decimal("200.00"))
+    # Above the last bounded slab nothing more is taxed
+    assert index.tax(Money.from_decimal(Decimal("5000"))) == Money.from_decimal(Decimal("300.00"))
+
+
+def test_no_slabs_means_no_tax():
+    assert TaxBracketIndex([]).tax(Money.from_decimal(Decimal("1234.56"))) == Money(0)
@@ -22,6 +22,8 @@ export default function App() {
   const [activeTab, setActiveTab] = useState('overview');
   const [profile, setProfile] = useState<any>(null);
   const [transactions, setTransactions] = useState<any[]>([]);
+  const [transactionsCursor, setTransactionsCursor] = useState<string | null>(null);
+  const [loadingMoreTransactions, setLoadingMoreTransactions] = useState(false);
   const [loading, setLoading] = useState(true);
   const [walletAddress, setWalletAddress] = useState<string | null>(null);
   const [contractAddress, setContractAddress] = useState<string | null>(null);
@@ -49,7 +51,8 @@ export default function App() {
     Promise.all([getMyProfile(), getMyTransactions(), getBlockchainConfig()])
       .then(([p, t, cfg]: [any, any, any]) => {
         setProfile(p);
-        setTransactions(t || []);
+        setTransactions(t?.items || []);
+        setTransactionsCursor(t?.nextCursor || null);
         const addr = cfg?.contract_address || null;
         if (addr) setContractAddress(addr);
 
@@ -69,6 +72,20 @@ export default function App() {
       .finally(() => setLoading(false));
   }, []);
 
+  async function loadMoreTransactions() {
+    if (!transactionsCursor) return;
+    setLoadingMoreTransactions(true);
+    try {
+      const page = await getMyTransactions(transactionsCursor);
+      setTransactions((current) => [...current, ...page.items]);
+      setTransactionsCursor(page.nextCursor);
+    } catch {
+      // keep what is loaded; the button stays available to retry
+    } finally {
+      setLoadingMoreTransactions(false);
+    }
+  }
+
   async function loadClaimable(addr?: string) {
     const targetAddress = addr ?? walletAddress;
     if (!contractAddress || !targetAddress) return;
@@ -444,11 +461,21 @@ export default function App() {
         return (
           <div className="space-y-6">
             <TransactionGraph transactions={transactions} />
-            <TransactionHistory transactions={transactions} />
+            <TransactionHistory
+              transactions={transactions}
+              onLoadMore={transactionsCursor ? loadMoreTransactions : undefined}
+              loadingMore={loadingMoreTransactions}
+            />
           </div>
         );
       case 'history':
-        return <TransactionHistory transactions={transactions} />;
+        return (
+          <TransactionHistory
+            transactions={transactions}
+            onLoadMore={transactionsCursor ? loadMoreTransactions : undefined}
+            loadingMore={loadingMoreTransactions}
+          />
+        );
       default:
         return null;
     }
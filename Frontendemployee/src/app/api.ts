@@ -3,19 +3,25 @@
 const BASE = (import.meta as any).env?.VITE_API_BASE || "";
 const EMPLOYEE_LOGIN_URL = (import.meta as any).env?.VITE_EMPLOYEE_LOGIN_URL || "/employee-login";
 
+// Signed read-your-writes pin from the last write; echoing it keeps our reads
+// on the primary database (not a lagging replica) on whichever worker serves them
+let primaryUntil: string | null = null;
+
 function getAuthHeaders() {
   const token = localStorage.getItem("token");
   return {
     "Content-Type": "application/json",
     Authorization: token ? `Bearer ${token}` : "",
+    ...(primaryUntil ? { "X-Primary-Until": primaryUntil } : {}),
   };
 }
 
-async function apiRequest(path: string, options: RequestInit = {}) {
+async function apiFetch(path: string, options: RequestInit = {}) {
   const res = await fetch(`${BASE}${path}`, {
     headers: getAuthHeaders(),
     ...options,
   });
+  primaryUntil = res.headers.get("X-Primary-Until") || primaryUntil;
   if (res.status === 401) {
     localStorage.removeItem("token");
     if (window.location.pathname !== "/employee-login") {
@@ -27,15 +33,33 @@ async function apiRequest(path: string, options: RequestInit = {}) {
     const err = await res.json().catch(() => ({}));
     throw new Error(err.detail || "Request failed");
   }
-  return res.json();
+  return res;
+}
+
+async function apiRequest(path: string, options: RequestInit = {}) {
+  return (await apiFetch(path, options)).json();
+}
+
+// List endpoints return one keyset page; X-Next-Cursor points at the next one.
+// Fetch one page per call and the next only when the user asks ("Load more"),
+// so a long history is never pulled in all at once.
+export type Page<T = any> = { items: T[]; nextCursor: string | null };
+
+const PAGE_SIZE = 50;
+
+async function apiRequestPage(path: string, after?: string | null): Promise<Page> {
+  const separator = path.includes("?") ? "&" : "?";
+  const cursor = after ? `&after=${encodeURIComponent(after)}` : "";
+  const res = await apiFetch(`${path}${separator}limit=${PAGE_SIZE}${cursor}`);
+  return { items: await res.json(), nextCursor: res.headers.get("X-Next-Cursor") };
 }
 
 export async function getMyProfile() {
   return apiRequest("/api/me/profile");
 }
 
-export async function getMyTransactions() {
-  return apiRequest("/api/me/transactions");
+export async function getMyTransactions(after?: string | null) {
+  return apiRequestPage("/api/me/transactions", after);
 }
 
 export async function getBlockchainConfig() {
@@ -30,7 +30,18 @@ function toDisplay(api: ApiTransaction[]): Transaction[] {
   }));
 }
 
-export const TransactionHistory = React.memo(function TransactionHistory({ transactions: apiTransactions = [] }: { transactions?: ApiTransaction[] }) {
+interface TransactionHistoryProps {
+  transactions?: ApiTransaction[];
+  // Set when older transactions exist on the server; loads the next page
+  onLoadMore?: () => void;
+  loadingMore?: boolean;
+}
+
+export const TransactionHistory = React.memo(function TransactionHistory({
+  transactions: apiTransactions = [],
+  onLoadMore,
+  loadingMore = false,
+}: TransactionHistoryProps) {
   const [searchTerm, setSearchTerm] = useState('');
   const [filterType, setFilterType] = useState<'all' | 'income' | 'expense'>('all');
   const transactions = useMemo(() => toDisplay(apiTransactions), [apiTransactions]);
@@ -150,6 +161,18 @@ export const TransactionHistory = React.memo(function TransactionHistory({ trans
           </tbody>
         </table>
       </div>
+
+      {onLoadMore && (
+        <div className="mt-4 text-center">
+          <button
+            onClick={onLoadMore}
+            disabled={loadingMore}
+            className="px-4 py-2 rounded-lg border border-gray-300 text-sm text-gray-700 hover:bg-gray-50 disabled:opacity-50"
+          >
+            {loadingMore ? 'Loading...' : 'Load older transactions'}
+          </button>
+        </div>
+      )}
     </div>
   );
 });
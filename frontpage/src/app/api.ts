@@ -4,23 +4,29 @@ const BASE_URL = (import.meta as any).env?.VITE_API_BASE || "";
 /* =========================
    AUTH HEADER
 ========================= */
+// Signed read-your-writes pin from the last write; echoing it keeps our reads
+// on the primary database (not a lagging replica) on whichever worker serves them
+let primaryUntil: string | null = null;
+
 function getAuthHeaders() {
   const token = localStorage.getItem("token");
 
   return {
     "Content-Type": "application/json",
     Authorization: token ? `Bearer ${token}` : "",
+    ...(primaryUntil ? { "X-Primary-Until": primaryUntil } : {}),
   };
 }
 
 /* =========================
    GENERIC FETCH WRAPPER
 ========================= */
-async function apiRequest(path: string, options: RequestInit = {}) {
+async function apiFetch(path: string, options: RequestInit = {}) {
   const res = await fetch(`${BASE_URL}${path}`, {
     headers: getAuthHeaders(),
     ...options,
   });
+  primaryUntil = res.headers.get("X-Primary-Until") || primaryUntil;
 
   if (!res.ok) {
     let errorMessage = "Request failed";
@@ -31,7 +37,29 @@ async function apiRequest(path: string, options: RequestInit = {}) {
     throw new Error(errorMessage);
   }
 
-  return res.json();
+  return res;
+}
+
+async function apiRequest(path: string, options: RequestInit = {}) {
+  return (await apiFetch(path, options)).json();
+}
+
+/* =========================
+   PAGED LISTS
+   List endpoints return one keyset page and put the
+   cursor for the next one in the X-Next-Cursor header
+========================= */
+export type Page<T = any> = { items: T[]; nextCursor: string | null };
+
+const PAGE_SIZE = 50;
+
+// One page per call; screens ask for the next one only when the user does
+// ("Load more"), so a long history is never pulled in all at once
+async function apiRequestPage(path: string, after?: string | null): Promise<Page> {
+  const separator = path.includes("?") ? "&" : "?";
+  const cursor = after ? `&after=${encodeURIComponent(after)}` : "";
+  const res = await apiFetch(`${path}${separator}limit=${PAGE_SIZE}${cursor}`);
+  return { items: await res.json(), nextCursor: res.headers.get("X-Next-Cursor") };
 }
 
 /* =========================
@@ -84,8 +112,8 @@ export function getAuthRole(): string | null {
 /* =========================
    EMPLOYEES
 ========================= */
-export async function getEmployees() {
-  return apiRequest("/api/employees/");
+export async function getEmployees(after?: string | null) {
+  return apiRequestPage("/api/employees/", after);
 }
 
 export async function getEmployee(id: number) {
@@ -99,8 +127,8 @@ export async function createEmployee(name: string, email: string, role: string =
   });
 }
 
-export async function getEmployeeTransactions(id: number) {
-  return apiRequest(`/api/employees/${id}/transactions`);
+export async function getEmployeeTransactions(id: number, after?: string | null) {
+  return apiRequestPage(`/api/employees/${id}/transactions`, after);
 }
 
 export async function setEmployeeTax(
@@ -4,6 +4,7 @@ import { giveBonus, getEmployees } from "../../app/api";
 export default function Bonuses() {
 
   const [employees, setEmployees] = useState<any[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [selectedEmployee, setSelectedEmployee] = useState("");
   const [amount, setAmount] = useState("");
   const [reason, setReason] = useState("");
@@ -15,9 +16,10 @@ export default function Bonuses() {
     loadEmployees();
   }, []);
 
-  async function loadEmployees() {
-    const data = await getEmployees();
-    setEmployees(data);
+  async function loadEmployees(after?: string | null) {
+    const page = await getEmployees(after);
+    setEmployees((current) => (after ? [...current, ...page.items] : page.items));
+    setNextCursor(page.nextCursor);
   }
 
   // 🔥 Simple preview calculation (client-side estimate)
@@ -80,6 +82,15 @@ export default function Bonuses() {
             </option>
           ))}
         </select>
+        {nextCursor && (
+          <button
+            type="button"
+            onClick={() => loadEmployees(nextCursor)}
+            className="text-sm text-blue-600 hover:underline"
+          >
+            Load more employees
+          </button>
+        )}
 
         {/* Gross Amount */}
         <input
@@ -9,6 +9,8 @@ function Employees() {
   const [search, setSearch] = useState("");
   const [employees, setEmployees] = useState<any[]>([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [showAddModal, setShowAddModal] = useState(false);
   const [addName, setAddName] = useState("");
   const [addEmail, setAddEmail] = useState("");
@@ -21,8 +23,9 @@ function Employees() {
 
   async function loadEmployees() {
     try {
-      const data = await getEmployees();
-      setEmployees(data);
+      const page = await getEmployees();
+      setEmployees(page.items);
+      setNextCursor(page.nextCursor);
     } catch (err) {
       console.error(err);
     } finally {
@@ -30,6 +33,20 @@ function Employees() {
     }
   }
 
+  async function loadMoreEmployees() {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await getEmployees(nextCursor);
+      setEmployees((current) => [...current, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (err) {
+      console.error(err);
+    } finally {
+      setLoadingMore(false);
+    }
+  }
+
   const filteredEmployees = useMemo(
     () =>
       employees.filter((emp) =>
@@ -207,6 +224,17 @@ function Employees() {
           </tbody>
         </table>
         )}
+        {!loading && nextCursor && (
+          <div className="p-4 border-t text-center">
+            <button
+              onClick={loadMoreEmployees}
+              disabled={loadingMore}
+              className="px-5 py-2 rounded-lg border border-slate-300 text-slate-700 hover:bg-slate-50 disabled:opacity-50"
+            >
+              {loadingMore ? "Loading..." : "Load more"}
+            </button>
+          </div>
+        )}
       </div>
     </motion.div>
   );
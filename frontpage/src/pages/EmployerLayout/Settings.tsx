@@ -21,6 +21,7 @@ export default function Settings() {
   const [companyTax, setCompanyTax] = useState(0);
   const [slabs, setSlabs] = useState<any[]>([]);
   const [employees, setEmployees] = useState<any[]>([]);
+  const [employeesCursor, setEmployeesCursor] = useState<string | null>(null);
   const [contractAddress, setContractAddress] = useState<string | null>(null);
   const [contractAdmin, setContractAdmin] = useState<string | null>(null);
   const [contractEmployer, setContractEmployer] = useState<string | null>(null);
@@ -47,7 +48,15 @@ export default function Settings() {
     setSlabs(slabData);
 
     const emp = await getEmployees();
-    setEmployees(emp);
+    setEmployees(emp.items);
+    setEmployeesCursor(emp.nextCursor);
+  }
+
+  async function loadMoreEmployees() {
+    if (!employeesCursor) return;
+    const emp = await getEmployees(employeesCursor);
+    setEmployees((current) => [...current, ...emp.items]);
+    setEmployeesCursor(emp.nextCursor);
   }
 
   useEffect(() => {
@@ -289,6 +298,15 @@ export default function Settings() {
             </option>
           ))}
         </select>
+        {employeesCursor && (
+          <button
+            type="button"
+            onClick={loadMoreEmployees}
+            className="text-sm text-blue-600 hover:underline mb-3"
+          >
+            Load more employees
+          </button>
+        )}
 
         <div className="flex items-center gap-2 mb-3">
           <input